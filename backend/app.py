@@ -9,7 +9,16 @@ def create_app(config_class=Config):
 
     # Initialize extensions
     cors.init_app(app, resources={r"/api/*": {"origins": app.config.get('FRONTEND_URL', '*')}})
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*", message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    # A participant's connection joins its private room (async verdicts are only sent there)
+    @socketio.on('connect')
+    def socket_connect(auth=None):
+        from flask_socketio import join_room
+        from utils.submission_service import user_room_for_token
+        room = user_room_for_token(auth.get('token') if isinstance(auth, dict) else None)
+        if room:
+            join_room(room)
 
     # --- PERFORMANCE MIDDLEWARE ---
     import time
@@ -69,6 +78,10 @@ def create_app(config_class=Config):
     from routes.participant import bp as participant_bp
     app.register_blueprint(participant_bp, url_prefix='/api/participant')
 
+    # Judge warm-up (precompiled C/C++ headers) - runs in the background
+    from utils.logic import start_judge_warmup
+    start_judge_warmup()
+
     # Health Check Endpoint for AWS Load Balancer
     @app.route('/api/health')
     def health_check():
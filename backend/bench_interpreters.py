@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-run latency of Python/Node execution, cold interpreters vs warm zygotes.
+Usage: python bench_interpreters.py [--runs 30] [--gap-ms 200]
+
+--gap-ms is idle time between runs (participants do not click Run back-to-back);
+it gives the single-use Node spares time to be replenished.
+"""
+
+import argparse
+import statistics
+import time
+
+from utils import logic
+from utils.zygote import InterpreterPool
+
+PROGRAMS = {
+    'python': ('n = int(input())\nprint(sum(range(n)))', '1000'),
+    'javascript': (
+        "let d='';process.stdin.on('data',c=>d+=c);"
+        "process.stdin.on('end',()=>{const n=parseInt(d);let s=0;for(let i=0;i<n;i++)s+=i;console.log(s);});",
+        '1000'
+    ),
+}
+
+def measure(fn, runs, gap):
+    samples = []
+    for _ in range(runs):
+        time.sleep(gap)
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        if not result.get('success'):
+            raise RuntimeError(f"Benchmark program failed: {result.get('error')}")
+    samples.sort()
+    return {
+        'mean': statistics.mean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold vs zygote interpreter latency')
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--gap-ms', type=int, default=200)
+    args = parser.parse_args()
+
+    pool = InterpreterPool(2)
+    runners = {
+        'python': (logic.run_python, pool.run_python),
+        'javascript': (logic.run_node, pool.run_node),
+    }
+
+    # Force the cold path regardless of INTERPRETER_MODE
+    logic.interpreter_pool = None
+
+    print(f"{'language':<12}{'mode':<8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for lang, (code, inp) in PROGRAMS.items():
+        cold_fn, warm_fn = runners[lang]
+        warm_fn(code, inp, logic.TIMEOUT_SEC) # Boot the pool outside the measurement
+        for mode, fn in (('cold', cold_fn), ('zygote', warm_fn)):
+            try:
+                r = measure(lambda: fn(code, inp, logic.TIMEOUT_SEC), args.runs, args.gap_ms / 1000.0)
+            except Exception as e:
+                print(f"{lang:<12}{mode:<8}  skipped ({e})")
+                continue
+            print(f"{lang:<12}{mode:<8}{r['mean']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Benchmark: judge throughput per language at several concurrency levels.
+Usage: python bench_judge.py [--languages python,c,cpp,java,javascript] [--concurrency 1,2,4,8]
+                             [--requests 40] [--output results.json] [--compare previous.json]
+
+Drives execute_code_internal (security check + local_secure dispatch, as a Run request does)
+with the seed questions' templates and test inputs. Each request is one program x one input.
+The seed programs are taken from seed_data.py without importing it (no database needed):
+  - c / python: the templates as seeded (C gets <stdio.h>, which it relies on implicitly)
+  - cpp: the C templates compiled as C++
+  - java: the template classes plus a Main entry point reading the input
+  - javascript: ports of the level 1 questions (no JavaScript round is seeded)
+Programs that do not compile are reported and left out.
+
+Reported per language/concurrency: throughput, p50/p95/p99 latency, the compile vs run
+split (run = the runner's own 'duration', compile = the rest of the request) and CPU usage
+(program CPU from the judge's results, plus this process and all its reaped children).
+Runs honour the usual env settings (INTERPRETER_MODE, JAVA_MODE, COMPILE_CACHE, ...);
+pass --no-compile-cache to pay the full compile on every request.
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from utils import logic
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed_data.py')
+
+LANGUAGES = ['python', 'c', 'cpp', 'java', 'javascript']
+
+JAVA_MAIN = (
+    '\n\npublic class Main {\n'
+    '    public static void main(String[] args) {\n'
+    '        java.util.Scanner in = new java.util.Scanner(System.in);\n'
+    '        int tokens = 0;\n'
+    '        while (in.hasNext()) { in.next(); tokens++; }\n'
+    '        System.out.println(tokens);\n'
+    '    }\n'
+    '}\n'
+)
+
+# Level 1 questions, bugs included
+JAVASCRIPT_PORTS = {
+    'Fix the Sum': (
+        "let d = '';\nprocess.stdin.on('data', c => d += c);\n"
+        "process.stdin.on('end', () => {\n    const [a, b] = d.trim().split(/\\s+/).map(Number);\n    console.log(add(a, b));\n});\n"
+        "function add(a, b) {\n    return a - b;  // Bug: should be a + b\n}"
+    ),
+    'Fix Factorial': (
+        "let d = '';\nprocess.stdin.on('data', c => d += c);\n"
+        "process.stdin.on('end', () => console.log(factorial(parseInt(d))));\n"
+        "function factorial(n) {\n    let fact = 1;\n    for (let i = 1; i < n; i++) {  // Bug: should be i <= n\n"
+        "        fact *= i;\n    }\n    return fact;\n}"
+    ),
+    'Find Maximum': (
+        "let d = '';\nprocess.stdin.on('data', c => d += c);\n"
+        "process.stdin.on('end', () => {\n    const [a, b] = d.trim().split(/\\s+/).map(Number);\n    console.log(max(a, b));\n});\n"
+        "function max(a, b) {\n    return (a < b) ? a : b;  // Bug: should be a > b\n}"
+    ),
+}
+
+def load_seed_levels(path=SEED_FILE):
+    """The `levels` literal of seed_data.py, read with ast so nothing is executed."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'levels' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError(f"No 'levels' list found in {path}")
+
+def seed_programs(levels):
+    """{language: [(title, code, [inputs])]} for every benchmarked language."""
+    by_lang = {lang: [] for lang in LANGUAGES}
+    for level in levels:
+        for q in level['questions']:
+            inputs = [tc['input'] for tc in q.get('test_cases') or []] or [q.get('test_input', '')]
+            seeded = level['language'].lower()
+            if seeded == 'c':
+                if 'main(' not in q['buggy']:
+                    continue # Function-only template, nothing to run
+                by_lang['c'].append((q['title'], '#include <stdio.h>\n\n' + q['buggy'], inputs))
+                by_lang['cpp'].append((q['title'], '#include <cstdio>\n\n' + q['buggy'], inputs))
+                if q['title'] in JAVASCRIPT_PORTS:
+                    by_lang['javascript'].append((q['title'], JAVASCRIPT_PORTS[q['title']], inputs))
+            elif seeded == 'python':
+                by_lang['python'].append((q['title'], q['buggy'], inputs))
+            elif seeded == 'java':
+                # Only Main may be public in Main.java
+                code = q['buggy'].replace('public class ', 'class ', 1) + JAVA_MAIN
+                by_lang['java'].append((q['title'], code, inputs))
+    return by_lang
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * pct / 100))]
+
+def summarize(samples):
+    samples = sorted(samples)
+    if not samples:
+        return None
+    return {
+        'mean': round(statistics.mean(samples), 2),
+        'p50': round(percentile(samples, 50), 2),
+        'p95': round(percentile(samples, 95), 2),
+        'p99': round(percentile(samples, 99), 2),
+        'max': round(samples[-1], 2),
+    }
+
+def cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+def one_request(code, language, input_str):
+    start = time.perf_counter()
+    result = logic.execute_code_internal(code, language, input_str)
+    latency = time.perf_counter() - start
+    return latency, result
+
+def run_level(language, programs, concurrency, requests):
+    """Fires `requests` requests, `concurrency` at a time, round-robin over program x input."""
+    work = [(code, inp) for _, code, inputs in programs for inp in inputs]
+    jobs = [work[i % len(work)] for i in range(requests)]
+
+    self_before, children_before = cpu_seconds(resource.RUSAGE_SELF), cpu_seconds(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda job: one_request(job[0], language, job[1]), jobs))
+    wall = time.perf_counter() - start
+    self_cpu = cpu_seconds(resource.RUSAGE_SELF) - self_before
+    children_cpu = cpu_seconds(resource.RUSAGE_CHILDREN) - children_before
+
+    latencies, compile_ms, run_ms, program_cpu, errors = [], [], [], 0.0, 0
+    for latency, result in outcomes:
+        latencies.append(latency * 1000)
+        if result.get('error') and result['error'].startswith(('Time Limit', 'Output Limit', 'Internal', 'Compilation')):
+            errors += 1
+        if result.get('duration') is not None:
+            run_ms.append(result['duration'] * 1000)
+            compile_ms.append(max(0.0, latency - result['duration']) * 1000)
+        program_cpu += result.get('cpu_time') or 0.0
+
+    return {
+        'language': language,
+        'concurrency': concurrency,
+        'requests': requests,
+        'judge_errors': errors,
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(requests / wall, 2) if wall else None,
+        'latency_ms': summarize(latencies),
+        'compile_ms': summarize(compile_ms), # None when the runner reports no per-run duration (Java helper)
+        'run_ms': summarize(run_ms),
+        'cpu': {
+            'program_s': round(program_cpu, 3),
+            'children_s': round(children_cpu, 3), # Compilers, runtimes and launchers reaped by this process
+            'self_s': round(self_cpu, 3), # Judge overhead in this process (threads, pipes, helpers' IPC)
+            'utilization': round((self_cpu + children_cpu) / (wall * (os.cpu_count() or 1)), 3) if wall else None,
+        },
+    }
+
+def preflight(language, programs):
+    """Keeps the programs that compile and run; the untimed pass also warms caches and pools."""
+    usable = []
+    for title, code, inputs in programs:
+        result = logic.execute_code_internal(code, language, inputs[0])
+        error = result.get('error') or ''
+        if result.get('success') or not error.startswith(('Compilation', 'Security', 'Language', 'Internal', 'Java Compiler', 'Compiler', 'Node.js')):
+            usable.append((title, code, inputs))
+        else:
+            print(f"  {language}: '{title}' skipped ({error.splitlines()[0][:60]})")
+    return usable
+
+def metadata(args):
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(SEED_FILE)).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'settings': {
+            'EXECUTION_MODE': logic.EXECUTION_MODE,
+            'INTERPRETER_MODE': 'zygote' if logic.interpreter_pool else 'cold',
+            'JAVA_MODE': 'service' if logic.java_service else 'process',
+            'COMPILE_CACHE': logic.compile_cache is not None,
+            'JUDGE_CASE_PARALLELISM': logic.CASE_PARALLELISM,
+            'TIMEOUT_SEC': logic.TIMEOUT_SEC,
+        },
+        'requests_per_level': args.requests,
+    }
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r['language'], r['concurrency']): r for r in json.load(f)['results']}
+    print(f"\nvs {previous_path}")
+    print(f"{'language':<12}{'conc':>5}{'rps':>10}{'Δ rps':>9}{'p95 ms':>10}{'Δ p95':>9}")
+    for r in results:
+        old = previous.get((r['language'], r['concurrency']))
+        if not old or not old['throughput_rps'] or not r['throughput_rps']:
+            continue
+        d_rps = (r['throughput_rps'] / old['throughput_rps'] - 1) * 100
+        d_p95 = (r['latency_ms']['p95'] / old['latency_ms']['p95'] - 1) * 100 if old['latency_ms']['p95'] else 0
+        print(f"{r['language']:<12}{r['concurrency']:>5}{r['throughput_rps']:>10.1f}{d_rps:>+8.0f}%"
+              f"{r['latency_ms']['p95']:>10.1f}{d_p95:>+8.0f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description='Judge throughput per language and concurrency')
+    parser.add_argument('--languages', default=','.join(LANGUAGES))
+    parser.add_argument('--concurrency', default='1,2,4,8', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=40, help='Requests per language and concurrency level')
+    parser.add_argument('--no-compile-cache', action='store_true', help='Compile on every request')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON of an earlier run to diff against')
+    args = parser.parse_args()
+
+    if args.no_compile_cache:
+        logic.compile_cache = None
+
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    programs = seed_programs(load_seed_levels())
+    results = []
+
+    print(f"{'language':<12}{'conc':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'compile':>10}{'run':>10}{'cpu s':>8}{'util':>7}")
+    for language in [l.strip() for l in args.languages.split(',') if l.strip()]:
+        usable = preflight(language, programs.get(language, []))
+        if not usable:
+            print(f"{language:<12}  skipped (no runnable programs)")
+            continue
+        for concurrency in levels:
+            r = run_level(language, usable, concurrency, args.requests)
+            results.append(r)
+            lat, comp, run = r['latency_ms'], r['compile_ms'], r['run_ms']
+            print(f"{language:<12}{concurrency:>5}{r['throughput_rps']:>10.1f}{lat['p50']:>10.1f}{lat['p95']:>10.1f}{lat['p99']:>10.1f}"
+                  f"{(comp['p50'] if comp else float('nan')):>10.1f}{(run['p50'] if run else float('nan')):>10.1f}"
+                  f"{r['cpu']['children_s'] + r['cpu']['self_s']:>8.2f}{r['cpu']['utilization']:>7.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(args), 'results': results}, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: C/C++ compile time with and without the precompiled headers.
+Usage: python bench_pch.py [--runs 10]
+
+Calls the compiler directly, so the compile artifact cache is not involved.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from utils import pch
+from utils.logic import CPP_FLAGS
+
+PROGRAMS = {
+    'c': (
+        'gcc',
+        '#include <stdio.h>\n#include <stdlib.h>\n#include <string.h>\n\n'
+        'int main() {\n    int n;\n    scanf("%d", &n);\n    printf("%d\\n", n * 2);\n    return 0;\n}\n'
+    ),
+    'cpp': (
+        'g++',
+        '#include <bits/stdc++.h>\nusing namespace std;\n\n'
+        'int main() {\n    vector<int> v;\n    int n;\n    cin >> n;\n    for (int i = 0; i < n; i++) v.push_back(i);\n'
+        '    sort(v.rbegin(), v.rend());\n    cout << v[0] << endl;\n    return 0;\n}\n'
+    ),
+}
+
+def measure(compiler, flags, src, exe, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([compiler] + flags + [src, '-o', exe], capture_output=True, text=True)
+        samples.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip()[:200])
+    samples.sort()
+    return {'mean': statistics.mean(samples), 'p50': samples[len(samples) // 2]}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile time with and without precompiled headers')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'language':<10}{'mode':<8}{'mean ms':>10}{'p50 ms':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for lang, (compiler, code) in PROGRAMS.items():
+            src = os.path.join(workdir, 'main.c' if lang == 'c' else 'main.cpp')
+            exe = os.path.join(workdir, 'main')
+            with open(src, 'w') as f:
+                f.write(code)
+
+            header = pch.build_pch(compiler, lang, CPP_FLAGS, pch.leading_system_includes(code))
+            modes = [('plain', CPP_FLAGS)]
+            if header:
+                modes.append(('pch', CPP_FLAGS + ['-include', header]))
+            else:
+                print(f"{lang:<10}pch     skipped (PCH build failed)")
+
+            for mode, flags in modes:
+                try:
+                    r = measure(compiler, flags, src, exe, args.runs)
+                except Exception as e:
+                    print(f"{lang:<10}{mode:<8}  skipped ({e})")
+                    continue
+                print(f"{lang:<10}{mode:<8}{r['mean']:>10.1f}{r['p50']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,10 @@ class Config:
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY')
     
+    # Shared Socket.IO message queue (e.g. redis://...): lets judge_worker.py processes and
+    # other web nodes push events to clients connected elsewhere
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+
     # Frontend URL for CORS
     FRONTEND_URL = os.getenv('ALLOWED_ORIGINS', os.getenv('FRONTEND_URL', '*'))
     
@@ -134,7 +134,7 @@ CREATE TABLE IF NOT EXISTS `submissions` (
   `score_awarded` DECIMAL(5,2) DEFAULT 0.00,
   `test_results` JSON DEFAULT NULL,
   
-  `status` ENUM('pending', 'evaluated', 'failed') NOT NULL DEFAULT 'pending',
+  `status` ENUM('pending', 'queued', 'running', 'evaluated', 'failed') NOT NULL DEFAULT 'pending',
   `time_taken_seconds` INT(11) DEFAULT NULL,
   `submission_timestamp` DATETIME DEFAULT CURRENT_TIMESTAMP,
   
@@ -147,6 +147,25 @@ CREATE TABLE IF NOT EXISTS `submissions` (
   CONSTRAINT `fk_sub_contest` FOREIGN KEY (`contest_id`) REFERENCES `contests` (`contest_id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- --------------------------------------------------------
+-- 5b. Judge Jobs (shared queue for judge_worker.py, JUDGE_QUEUE_BACKEND=db)
+-- --------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `judge_jobs` (
+  `job_id` INT(11) NOT NULL AUTO_INCREMENT,
+  `submission_id` INT(11) DEFAULT NULL,
+  `priority` INT(11) NOT NULL DEFAULT 0,
+  `payload` LONGTEXT NOT NULL,
+  `status` ENUM('queued', 'claimed', 'failed') NOT NULL DEFAULT 'queued',
+  `worker_id` VARCHAR(255) DEFAULT NULL,
+  `attempts` INT(11) NOT NULL DEFAULT 0,
+  `error` TEXT DEFAULT NULL,
+  `enqueued_at` DOUBLE NOT NULL,
+  `claimed_at` DOUBLE DEFAULT NULL,
+
+  PRIMARY KEY (`job_id`),
+  KEY `idx_judge_jobs_claim` (`status`, `priority`, `job_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- --------------------------------------------------------
 -- 6. Participant Level Stats (Progress)
 -- --------------------------------------------------------
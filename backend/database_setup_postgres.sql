@@ -133,7 +133,7 @@ CREATE TABLE IF NOT EXISTS submissions (
   score_awarded DECIMAL(5,2) DEFAULT 0.00,
   test_results JSONB DEFAULT NULL,
   
-  status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'evaluated', 'failed')),
+  status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'queued', 'running', 'evaluated', 'failed')),
   time_taken_seconds INTEGER DEFAULT NULL,
   submission_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   
@@ -146,6 +146,24 @@ CREATE TABLE IF NOT EXISTS submissions (
 CREATE INDEX idx_submissions_user_contest ON submissions(user_id, contest_id);
 CREATE INDEX idx_submissions_perf ON submissions(user_id, contest_id, round_id, is_correct, submission_timestamp);
 
+-- --------------------------------------------------------
+-- 5b. Judge Jobs (shared queue for judge_worker.py, JUDGE_QUEUE_BACKEND=db)
+-- --------------------------------------------------------
+CREATE TABLE IF NOT EXISTS judge_jobs (
+  job_id SERIAL PRIMARY KEY,
+  submission_id INTEGER DEFAULT NULL,
+  priority INTEGER NOT NULL DEFAULT 0,
+  payload TEXT NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'claimed', 'failed')),
+  worker_id VARCHAR(255) DEFAULT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  error TEXT DEFAULT NULL,
+  enqueued_at DOUBLE PRECISION NOT NULL,
+  claimed_at DOUBLE PRECISION DEFAULT NULL
+);
+
+CREATE INDEX idx_judge_jobs_claim ON judge_jobs(status, priority, job_id);
+
 -- --------------------------------------------------------
 -- 6. Participant Level Stats (Progress)
 -- --------------------------------------------------------
@@ -5,7 +5,11 @@
 
 import logging
 import os
+import time
+import threading
 import configparser
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,6 +27,13 @@ logger = logging.getLogger("DatabaseManager")
 DATABASE_URL = os.getenv('DATABASE_URL') or os.getenv('INTERNAL_DATABASE_URL') or os.getenv('DB_URL')
 USE_POSTGRES = DATABASE_URL and (DATABASE_URL.startswith('postgres') or DATABASE_URL.startswith('postgresql'))
 USE_SQLITE = os.getenv('USE_SQLITE', 'False') == 'True'
+BULK_BATCH_SIZE = int(os.getenv('DB_BULK_BATCH_SIZE', 500)) # Rows per multi-row statement (execute_many / bulk_upsert)
+
+# --- POOL SETTINGS (per gunicorn worker) ---
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10)) # Seconds a checkout waits when every connection is busy
+DB_POOL_PING_IDLE_SECONDS = float(os.getenv('DB_POOL_PING_IDLE_SECONDS', 30)) # Only connections idle longer are pinged
+DB_POOL_RESET_SESSION = os.getenv('DB_POOL_RESET_SESSION', 'False') == 'True' # Full session reset on every return
 
 if not USE_POSTGRES:
     logger.info(f"PostgreSQL not detected (DATABASE_URL is {'empty' if not DATABASE_URL else 'invalid'}).")
@@ -31,17 +42,162 @@ if not USE_POSTGRES:
 try:
     if USE_POSTGRES:
         import psycopg2
-        from psycopg2.extras import RealDictCursor
+        from psycopg2.extras import RealDictCursor, execute_batch
         from psycopg2 import pool
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
         logger.info("🐘 PostgreSQL driver (psycopg2) loaded successfully.")
     else:
         import mysql.connector
-        from mysql.connector import pooling, Error
+        from mysql.connector import Error
+        from mysql.connector.errors import PoolError
 except ImportError as e:
     logger.warning(f"❌ DB driver not found ({e}). Falling back to SQLite.")
     USE_POSTGRES = False # Force fallback if driver is missing
     USE_SQLITE = True
 
+class PostgreSQLPool:
+    """
+    Thread-safe replacement for psycopg2's SimpleConnectionPool, which must not be shared
+    between threads. When all `maxconn` connections are busy, getconn() waits up to `timeout`
+    seconds instead of failing at once. Waiters are served strictly first come, first served:
+    a returned connection is handed straight to the longest-waiting thread. Idle connections
+    are only pinged after `ping_idle` seconds, like MySQLPool.
+    """
+
+    def __init__(self, dsn, minconn, maxconn, timeout, ping_idle):
+        self.dsn = dsn
+        self.maxconn = max(1, maxconn)
+        self.timeout = timeout
+        self.ping_idle = ping_idle
+        self._idle = [] # (connection, released_at), most recently used last
+        self._waiters = deque() # FIFO of {'event', 'conn'}: conn is a connection, or None = open a new one
+        self._open = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'checkouts': 0, 'waits': 0, 'wait_time': 0.0, 'wait_max': 0.0, 'exhausted': 0, 'timeouts': 0,
+            'created': 0, 'pings': 0, 'reconnects': 0, 'rollbacks': 0, 'failures': 0, 'discarded': 0
+        }
+        for _ in range(min(minconn, self.maxconn)):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._open += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._lock:
+            self._metrics['created'] += 1
+        return conn
+
+    def getconn(self):
+        started = time.monotonic()
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            if self._idle and not self._waiters:
+                conn, released_at = self._idle.pop()
+            elif self._open < self.maxconn and not self._waiters:
+                self._open += 1
+                conn, released_at = None, None
+            else:
+                self._metrics['exhausted'] += 1
+                waiter = {'event': threading.Event(), 'conn': None}
+                self._waiters.append(waiter)
+                conn = released_at = False # Decided below
+
+        if conn is False:
+            granted = waiter['event'].wait(self.timeout)
+            with self._lock:
+                if not granted and not waiter['event'].is_set():
+                    self._waiters.remove(waiter)
+                    self._metrics['timeouts'] += 1
+                    raise pool.PoolError(f"connection pool exhausted: all {self.maxconn} connections busy for {self.timeout}s")
+                wait = time.monotonic() - started
+                self._metrics['waits'] += 1
+                self._metrics['wait_time'] += wait
+                self._metrics['wait_max'] = max(self._metrics['wait_max'], wait)
+            conn, released_at = waiter['conn'], time.monotonic()
+
+        try:
+            if conn is None or conn.closed:
+                if conn is not None:
+                    with self._lock:
+                        self._metrics['reconnects'] += 1
+                conn = self._connect()
+            elif time.monotonic() - released_at > self.ping_idle:
+                conn = self._validate(conn)
+        except Exception:
+            with self._lock:
+                self._metrics['failures'] += 1
+            self._free_slot()
+            raise
+        return conn
+
+    def _validate(self, conn):
+        with self._lock:
+            self._metrics['pings'] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return conn
+        except Exception:
+            # Dropped by the server: replace it (raises if the server is still unreachable)
+            with self._lock:
+                self._metrics['reconnects'] += 1
+            try: conn.close()
+            except Exception: pass
+            return self._connect()
+
+    def putconn(self, conn, close=False):
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == TRANSACTION_STATUS_UNKNOWN:
+                    close = True # Connection is broken
+                elif status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                    with self._lock:
+                        self._metrics['rollbacks'] += 1
+            except Exception:
+                close = True
+        if close or conn.closed:
+            try: conn.close()
+            except Exception: pass
+            with self._lock:
+                self._metrics['discarded'] += 1
+            self._free_slot()
+            return
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter['conn'] = conn
+                waiter['event'].set()
+            else:
+                self._idle.append((conn, time.monotonic()))
+
+    def _free_slot(self):
+        """A connection is gone: let the next waiter open a new one, or shrink the pool."""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft()['event'].set() # conn stays None
+            else:
+                self._open -= 1
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            try: conn.close()
+            except Exception: pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.maxconn, 'open': self._open, 'idle': len(self._idle), 'in_use': self._open - len(self._idle),
+                'waiting': len(self._waiters), 'ping_idle_seconds': self.ping_idle, **self._metrics,
+                'wait_time': round(self._metrics['wait_time'], 4), 'wait_max': round(self._metrics['wait_max'], 4)
+            }
+
 class PostgreSQLManager:
     """PostgreSQL Database Manager for Railway/Render deployments"""
     _instance = None
@@ -53,30 +209,107 @@ class PostgreSQLManager:
         return cls._instance
 
     def _initialize_pool(self):
+        self.pid = os.getpid()
         try:
             # Handle Render/Railway 'postgres://' vs 'postgresql://'
             conn_url = DATABASE_URL
             if conn_url.startswith('postgres://'):
                 conn_url = conn_url.replace('postgres://', 'postgresql://', 1)
                 
-            self.pool = psycopg2.pool.SimpleConnectionPool(
-                1, 20, # min and max connections
-                conn_url
-            )
-            logger.info("✅ PostgreSQL connection pool initialized (1-20 connections)")
+            self._local = threading.local() # Per-thread unit of work
+            self.pool = PostgreSQLPool(conn_url, 1, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_IDLE_SECONDS)
+            logger.info(f"✅ PostgreSQL connection pool initialized (1-{DB_POOL_SIZE} connections)")
         except Exception as e:
             logger.error(f"❌ Failed to initialize PostgreSQL pool: {e}")
             raise
 
     def get_connection(self):
+        if getattr(self, 'pid', None) != os.getpid():
+            self._initialize_pool() # Connections must not be shared with the parent process
         try:
             return self.pool.getconn()
         except Exception as e:
             logger.error(f"Failed to get PostgreSQL connection: {e}")
             return None
 
-    def execute_query(self, query, params=None):
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def _checkout(self):
+        """(connection, owned): the open unit of work's connection, else a fresh pooled one we must release."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn, False
+        return self.get_connection(), True
+
+    def _statement_failed(self, conn, owned):
+        if owned: conn.rollback()
+        else: self._local.failed = True # The unit of work rolls back on exit
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        `with db_manager.unit_of_work():` - every execute_* call this thread makes inside the block
+        shares one pooled connection and one transaction, committed once when the block exits.
+        Rolled back instead if the block raises or any statement failed. Nested blocks join the outer one.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self
+            return
         conn = self.get_connection()
+        if not conn:
+            yield self # No connection now: each call checks out its own, as outside a unit
+            return
+        self._local.conn, self._local.failed = conn, False
+        try:
+            yield self
+            if self._local.failed: conn.rollback()
+            else: conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self.pool.putconn(conn)
+
+    @contextmanager
+    def savepoint(self, name='sp'):
+        """
+        `with db_manager.savepoint() as sp:` inside a unit of work - if a statement of the block fails,
+        only the block is rolled back (sp['ok'] becomes False) and the rest of the unit still commits.
+        Outside a unit every statement commits on its own, so the block just runs.
+        """
+        state = {'ok': True}
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            yield state
+            return
+        failed_before, self._local.failed = self._local.failed, False
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {name}")
+            active = True
+        except psycopg2.Error as e:
+            logger.error(f"PostgreSQL SAVEPOINT failed: {e}")
+            active, failed_before = False, True
+        try:
+            yield state
+        except psycopg2.Error as e:
+            logger.error(f"PostgreSQL statement inside savepoint failed: {e}")
+            self._local.failed = True
+        finally:
+            state['ok'] = active and not self._local.failed
+            if active:
+                try:
+                    cursor.execute(f"RELEASE SAVEPOINT {name}" if state['ok'] else f"ROLLBACK TO SAVEPOINT {name}")
+                except psycopg2.Error as e:
+                    logger.error(f"PostgreSQL savepoint rollback failed: {e}")
+                    state['ok'], failed_before = False, True
+            self._local.failed = failed_before
+            cursor.close()
+
+    def execute_query(self, query, params=None):
+        conn, owned = self._checkout()
         if not conn: return None
         
         cursor = None
@@ -87,30 +320,155 @@ class PostgreSQLManager:
             return [dict(row) for row in result]
         except Exception as e:
             logger.error(f"PostgreSQL SELECT failed: {e}\nQuery: {query}")
+            self._statement_failed(conn, owned)
             return None
         finally:
             if cursor: cursor.close()
-            if conn: self.pool.putconn(conn)
+            if conn and owned: self.pool.putconn(conn)
 
     def execute_update(self, query, params=None):
-        conn = self.get_connection()
+        conn, owned = self._checkout()
         if not conn: return False
         
         cursor = None
         try:
             cursor = conn.cursor()
             cursor.execute(query, params or ())
-            conn.commit()
+            if owned: conn.commit()
             # PostgreSQL doesn't have lastrowid in the same way, but often returns it via RETURNING
             # This is a generic wrapper, so we do our best
             return {"last_id": None, "affected": cursor.rowcount}
         except Exception as e:
-            if conn: conn.rollback()
             logger.error(f"PostgreSQL UPDATE failed: {e}\nQuery: {query}")
+            self._statement_failed(conn, owned)
+            return False
+        finally:
+            if cursor: cursor.close()
+            if conn and owned: self.pool.putconn(conn)
+
+    def execute_insert(self, query, params, id_column):
+        """Runs a single-row INSERT and returns the new row's `id_column` (via RETURNING), or None on failure."""
+        conn, owned = self._checkout()
+        if not conn: return None
+        
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"{query.strip().rstrip(';')} RETURNING {id_column}", params or ())
+            new_id = cursor.fetchone()[0]
+            if owned: conn.commit()
+            return new_id
+        except Exception as e:
+            logger.error(f"PostgreSQL INSERT failed: {e}\nQuery: {query}")
+            self._statement_failed(conn, owned)
+            return None
+        finally:
+            if cursor: cursor.close()
+            if conn and owned: self.pool.putconn(conn)
+
+    def execute_transaction(self, queries_list):
+        """Runs [(query, params), ...] on one connection and commits once: all or nothing."""
+        return self._execute_batch(queries_list) is not False
+
+    def execute_many(self, query, params_list):
+        """
+        Runs `query` once per params tuple, in one transaction. The statements are sent in
+        pages of BULK_BATCH_SIZE (psycopg2 execute_batch: one round trip per page).
+        psycopg2 cannot count the rows of a page, so this returns the number of params tuples
+        run, or False (nothing applied) on failure.
+        """
+        params_list = list(params_list)
+        conn, owned = self._checkout()
+        if not conn: return False
+        
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            execute_batch(cursor, query, params_list, page_size=BULK_BATCH_SIZE)
+            if owned: conn.commit()
+            return len(params_list)
+        except Exception as e:
+            logger.error(f"PostgreSQL batch failed: {e}\nQuery: {query}")
+            self._statement_failed(conn, owned)
             return False
         finally:
             if cursor: cursor.close()
-            if conn: self.pool.putconn(conn)
+            if conn and owned: self.pool.putconn(conn)
+
+    def bulk_upsert(self, table, columns, rows, conflict_keys, update_columns=None):
+        """
+        Inserts `rows` (tuples ordered like `columns`) with multi-row INSERT ... ON CONFLICT statements
+        of up to BULK_BATCH_SIZE rows, in one transaction. On conflict, `update_columns` (default: every
+        non-key column) take the new values; an empty list keeps the existing row.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_keys]
+        if update_columns:
+            on_conflict = f"DO UPDATE SET {', '.join(f'{c}=EXCLUDED.{c}' for c in update_columns)}"
+        else:
+            on_conflict = "DO NOTHING"
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        rows = list(rows)
+        statements = []
+        for i in range(0, len(rows), BULK_BATCH_SIZE):
+            batch = rows[i:i + BULK_BATCH_SIZE]
+            statements.append((
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT ({', '.join(conflict_keys)}) {on_conflict}",
+                tuple(v for row in batch for v in row)
+            ))
+        return self._execute_batch(statements)
+
+    def bulk_update(self, table, key_column, column, values):
+        """
+        Sets `column` of every row from the {key: value} map `values` with UPDATE ... CASE statements
+        of up to BULK_BATCH_SIZE keys, in one transaction.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        items = list(values.items())
+        statements = []
+        for i in range(0, len(items), BULK_BATCH_SIZE):
+            batch = items[i:i + BULK_BATCH_SIZE]
+            statements.append((
+                f"UPDATE {table} SET {column} = CASE {key_column} {' '.join(['WHEN %s THEN %s'] * len(batch))} "
+                f"ELSE {column} END WHERE {key_column} IN ({', '.join(['%s'] * len(batch))})",
+                tuple(v for item in batch for v in item) + tuple(key for key, _ in batch)
+            ))
+        return self._execute_batch(statements)
+
+    @staticmethod
+    def increment_upsert_sql(table, key_columns, increment_columns, rows=1):
+        """
+        INSERT of `rows` rows (values ordered key_columns + increment_columns) that, when the key
+        already exists, adds the new values to the stored increment_columns instead.
+        """
+        columns = list(key_columns) + list(increment_columns)
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        updates = ', '.join(f"{c} = COALESCE({table}.{c}, 0) + EXCLUDED.{c}" for c in increment_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * rows)} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+    def _execute_batch(self, statements):
+        conn, owned = self._checkout()
+        if not conn: return False
+        
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            affected = 0
+            for query, params in statements:
+                cursor.execute(query, params or ())
+                affected += max(cursor.rowcount, 0)
+            if owned: conn.commit()
+            return affected
+        except Exception as e:
+            logger.error(f"PostgreSQL transaction failed: {e}")
+            self._statement_failed(conn, owned)
+            return False
+        finally:
+            if cursor: cursor.close()
+            if conn and owned: self.pool.putconn(conn)
 
     def init_database(self, schema_file):
         conn = self.get_connection()
@@ -129,6 +487,130 @@ class PostgreSQLManager:
             cursor.close()
             self.pool.putconn(conn)
 
+class PooledConnection:
+    """A MySQLPool connection: behaves like the driver connection, close() returns it to the pool."""
+
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool.release(cnx)
+
+class MySQLPool:
+    """
+    Connection pool for MySQLManager. A checkout costs no round trip: a connection is only
+    pinged when it sat idle longer than `ping_idle` seconds, and reconnected if that ping fails.
+    Returned connections get a rollback when a transaction is still open (the full session
+    reset is opt-in). When every connection is busy, checkouts wait up to `timeout` seconds.
+    """
+
+    def __init__(self, config, size, timeout, ping_idle, reset_session):
+        self.config = config
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.ping_idle = ping_idle
+        self.reset_session = reset_session
+        self._idle = [] # (connection, released_at), most recently used last
+        self._open = 0
+        self._cond = threading.Condition()
+        self._metrics = {
+            'checkouts': 0, 'waits': 0, 'wait_time': 0.0, 'wait_max': 0.0, 'timeouts': 0,
+            'created': 0, 'pings': 0, 'reconnects': 0, 'resets': 0, 'rollbacks': 0, 'failures': 0, 'discarded': 0
+        }
+
+    def _count(self, name, n=1):
+        with self._cond:
+            self._metrics[name] += n
+
+    def warm(self):
+        """Opens the first connection now, so a bad configuration fails at startup rather than on first use."""
+        self.get_connection().close()
+
+    def get_connection(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    cnx, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    cnx, released_at = None, None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolError(f"Failed getting connection; all {self.size} connections busy for {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            self._metrics['checkouts'] += 1
+            if waited:
+                wait = time.monotonic() - started
+                self._metrics['waits'] += 1
+                self._metrics['wait_time'] += wait
+                self._metrics['wait_max'] = max(self._metrics['wait_max'], wait)
+
+        try:
+            if cnx is None:
+                cnx = mysql.connector.connect(**self.config)
+                self._count('created')
+            elif time.monotonic() - released_at > self.ping_idle:
+                self._validate(cnx)
+        except Error:
+            with self._cond:
+                self._open -= 1
+                self._metrics['failures'] += 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, cnx)
+
+    def _validate(self, cnx):
+        self._count('pings')
+        try:
+            cnx.ping(reconnect=False)
+        except Error:
+            # Dropped by the server (wait_timeout, failover): reconnect once, else the checkout fails
+            self._count('reconnects')
+            cnx.reconnect(attempts=1)
+
+    def release(self, cnx):
+        healthy = True
+        try:
+            if self.reset_session:
+                cnx.reset_session()
+                self._count('resets')
+            elif cnx.in_transaction:
+                # Also ends a read snapshot (autocommit is off), so the next user sees fresh data
+                cnx.rollback()
+                self._count('rollbacks')
+        except Error:
+            healthy = False
+        with self._cond:
+            if healthy:
+                self._idle.append((cnx, time.monotonic()))
+            else:
+                self._open -= 1
+                self._metrics['discarded'] += 1
+            self._cond.notify()
+        if not healthy:
+            try: cnx.close()
+            except Error: pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size, 'open': self._open, 'idle': len(self._idle), 'in_use': self._open - len(self._idle),
+                'ping_idle_seconds': self.ping_idle, 'reset_session': self.reset_session, **self._metrics,
+                'wait_time': round(self._metrics['wait_time'], 4), 'wait_max': round(self._metrics['wait_max'], 4)
+            }
+
 class MySQLManager:
     """MySQL Database Manager for local/AWS deployments"""
     _instance = None
@@ -141,6 +623,7 @@ class MySQLManager:
 
     def _initialize_pool(self, database=None):
         self.pid = os.getpid()
+        self._local = threading.local() # Per-thread unit of work
         try:
             config = configparser.ConfigParser()
             config_path = os.path.join(os.path.dirname(__file__), 'db_config.ini')
@@ -172,24 +655,17 @@ class MySQLManager:
             try:
                 full_config = base_config.copy()
                 full_config['database'] = target_db
-                self.pool = mysql.connector.pooling.MySQLConnectionPool(
-                    pool_name=f"marathon_pool_{self.pid}",
-                    pool_size=20,
-                    pool_reset_session=True,
-                    connection_timeout=10,
-                    autocommit=False,
-                    use_pure=False,
-                    **full_config
+                self.pool = MySQLPool(
+                    dict(connection_timeout=10, autocommit=False, use_pure=False, **full_config),
+                    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_IDLE_SECONDS, DB_POOL_RESET_SESSION
                 )
-                logger.info(f"✅ MySQL pool initialized with database '{target_db}'")
+                self.pool.warm()
+                logger.info(f"✅ MySQL pool initialized with database '{target_db}' ({DB_POOL_SIZE} connections max)")
             except Error as e:
                 if e.errno == 1049:
                     logger.warning(f"Database '{target_db}' not found. Connecting to server.")
-                    self.pool = mysql.connector.pooling.MySQLConnectionPool(
-                        pool_name=f"marathon_pool_{self.pid}",
-                        pool_size=20,
-                        **base_config
-                    )
+                    self.pool = MySQLPool(base_config, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_IDLE_SECONDS, DB_POOL_RESET_SESSION)
+                    self.pool.warm()
                 else: raise
         except Error as e:
             logger.error(f"Error initializing MySQL pool: {e}")
@@ -199,15 +675,90 @@ class MySQLManager:
         if getattr(self, 'pid', None) != os.getpid():
             self._initialize_pool()
         try:
-            conn = self.pool.get_connection()
-            if conn.is_connected():
-                conn.ping(reconnect=True)
-                return conn
+            return self.pool.get_connection()
+        except Error as e:
+            logger.error(f"MySQL checkout failed: {e}")
             return None
-        except Error: return None
 
-    def execute_query(self, query, params=None):
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def _checkout(self):
+        """(connection, owned): the open unit of work's connection, else a fresh pooled one we must release."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn, False
+        return self.get_connection(), True
+
+    def _statement_failed(self, conn, owned):
+        if owned: conn.rollback()
+        else: self._local.failed = True # The unit of work rolls back on exit
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        `with db_manager.unit_of_work():` - every execute_* call this thread makes inside the block
+        shares one pooled connection (one checkout, one ping) and one transaction, committed once
+        when the block exits. Rolled back instead if the block raises or any statement failed.
+        Nested blocks join the outer one.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self
+            return
         conn = self.get_connection()
+        if not conn:
+            yield self # No connection now: each call checks out its own, as outside a unit
+            return
+        self._local.conn, self._local.failed = conn, False
+        try:
+            yield self
+            if self._local.failed: conn.rollback()
+            else: conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    @contextmanager
+    def savepoint(self, name='sp'):
+        """
+        `with db_manager.savepoint() as sp:` inside a unit of work - if a statement of the block fails,
+        only the block is rolled back (sp['ok'] becomes False) and the rest of the unit still commits.
+        Outside a unit every statement commits on its own, so the block just runs.
+        """
+        state = {'ok': True}
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            yield state
+            return
+        failed_before, self._local.failed = self._local.failed, False
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {name}")
+            active = True
+        except Error as e:
+            logger.error(f"MySQL SAVEPOINT failed: {e}")
+            active, failed_before = False, True
+        try:
+            yield state
+        except Error as e:
+            logger.error(f"MySQL statement inside savepoint failed: {e}")
+            self._local.failed = True
+        finally:
+            state['ok'] = active and not self._local.failed
+            if active:
+                try:
+                    cursor.execute(f"RELEASE SAVEPOINT {name}" if state['ok'] else f"ROLLBACK TO SAVEPOINT {name}")
+                except Error as e:
+                    logger.error(f"MySQL savepoint rollback failed: {e}")
+                    state['ok'], failed_before = False, True
+            self._local.failed = failed_before
+            cursor.close()
+
+    def execute_query(self, query, params=None):
+        conn, owned = self._checkout()
         if not conn: return None
         cursor = conn.cursor(dictionary=True)
         try:
@@ -215,26 +766,118 @@ class MySQLManager:
             return cursor.fetchall()
         except Error as e:
             logger.error(f"MySQL SELECT failed: {e}")
+            self._statement_failed(conn, owned)
             return None
         finally:
             if cursor: cursor.close()
-            if conn: conn.close()
+            if conn and owned: conn.close()
 
     def execute_update(self, query, params=None):
-        conn = self.get_connection()
+        conn, owned = self._checkout()
         if not conn: return False
         cursor = conn.cursor()
         try:
             cursor.execute(query, params or ())
-            conn.commit()
+            if owned: conn.commit()
             return {"last_id": cursor.lastrowid, "affected": cursor.rowcount}
         except Error as e:
-            if conn: conn.rollback()
             logger.error(f"MySQL UPDATE failed: {e}")
+            self._statement_failed(conn, owned)
+            return False
+        finally:
+            if cursor: cursor.close()
+            if conn and owned: conn.close()
+
+    def execute_insert(self, query, params, id_column):
+        """Runs a single-row INSERT and returns the new row's `id_column` (AUTO_INCREMENT), or None on failure."""
+        res = self.execute_update(query, params)
+        return res['last_id'] if res else None
+
+    def execute_transaction(self, queries_list):
+        """Runs [(query, params), ...] on one connection and commits once: all or nothing."""
+        return self._execute_batch(queries_list) is not False
+
+    def execute_many(self, query, params_list):
+        """
+        Runs `query` for every params tuple in one transaction (executemany: an INSERT ... VALUES
+        is sent as multi-row statements of up to BULK_BATCH_SIZE rows; any other statement is
+        sent once per row - use bulk_update to batch UPDATEs).
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        params_list = list(params_list)
+        return self._execute_batch([
+            (query, params_list[i:i + BULK_BATCH_SIZE]) for i in range(0, len(params_list), BULK_BATCH_SIZE)
+        ], many=True)
+
+    def bulk_upsert(self, table, columns, rows, conflict_keys, update_columns=None):
+        """
+        Inserts `rows` (tuples ordered like `columns`) with multi-row INSERT ... ON DUPLICATE KEY UPDATE
+        statements of up to BULK_BATCH_SIZE rows, in one transaction. On conflict, `update_columns`
+        (default: every non-key column) take the new values; an empty list keeps the existing row.
+        Returns the total affected row count (MySQL counts an updated row twice), or False on failure.
+        """
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_keys]
+        insert = "INSERT" if update_columns else "INSERT IGNORE"
+        on_duplicate = f" ON DUPLICATE KEY UPDATE {', '.join(f'{c}=VALUES({c})' for c in update_columns)}" if update_columns else ""
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        rows = list(rows)
+        statements = []
+        for i in range(0, len(rows), BULK_BATCH_SIZE):
+            batch = rows[i:i + BULK_BATCH_SIZE]
+            statements.append((
+                f"{insert} INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(batch))}{on_duplicate}",
+                tuple(v for row in batch for v in row)
+            ))
+        return self._execute_batch(statements)
+
+    def bulk_update(self, table, key_column, column, values):
+        """
+        Sets `column` of every row from the {key: value} map `values` with UPDATE ... CASE statements
+        of up to BULK_BATCH_SIZE keys, in one transaction.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        items = list(values.items())
+        statements = []
+        for i in range(0, len(items), BULK_BATCH_SIZE):
+            batch = items[i:i + BULK_BATCH_SIZE]
+            statements.append((
+                f"UPDATE {table} SET {column} = CASE {key_column} {' '.join(['WHEN %s THEN %s'] * len(batch))} "
+                f"ELSE {column} END WHERE {key_column} IN ({', '.join(['%s'] * len(batch))})",
+                tuple(v for item in batch for v in item) + tuple(key for key, _ in batch)
+            ))
+        return self._execute_batch(statements)
+
+    @staticmethod
+    def increment_upsert_sql(table, key_columns, increment_columns, rows=1):
+        """
+        INSERT of `rows` rows (values ordered key_columns + increment_columns) that, when the key
+        already exists, adds the new values to the stored increment_columns instead.
+        """
+        columns = list(key_columns) + list(increment_columns)
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        updates = ', '.join(f"{c} = COALESCE({c}, 0) + VALUES({c})" for c in increment_columns)
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * rows)} ON DUPLICATE KEY UPDATE {updates}"
+
+    def _execute_batch(self, statements, many=False):
+        conn, owned = self._checkout()
+        if not conn: return False
+        cursor = conn.cursor()
+        try:
+            affected = 0
+            for query, params in statements:
+                if many: cursor.executemany(query, params)
+                else: cursor.execute(query, params or ())
+                affected += max(cursor.rowcount, 0)
+            if owned: conn.commit()
+            return affected
+        except Error as e:
+            logger.error(f"MySQL transaction failed: {e}")
+            self._statement_failed(conn, owned)
             return False
         finally:
             if cursor: cursor.close()
-            if conn: conn.close()
+            if conn and owned: conn.close()
 
     def init_database(self, schema_file):
         conn = self.get_connection()
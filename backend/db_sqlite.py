@@ -3,6 +3,8 @@ import sqlite3
 import logging
 import os
 import re
+import threading
+from contextlib import contextmanager
 
 # Configure Logging
 logging.basicConfig(
@@ -11,6 +13,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger("SQLiteManager")
 
+BULK_BATCH_SIZE = int(os.getenv('DB_BULK_BATCH_SIZE', 500)) # Rows per multi-row statement (execute_many / bulk_upsert)
+SQLITE_MAX_VARIABLES = 999 # Bound parameters per statement on older SQLite builds
+
+# === FAST MODE (single-box deployments, local benchmarks) ===
+# Persistent per-thread connections + WAL instead of a new connection per statement
+SQLITE_FAST_MODE = os.getenv('SQLITE_FAST_MODE', 'False') == 'True'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)) # Wait for a competing writer instead of "database is locked"
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL') # NORMAL is durable against app crashes in WAL mode
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536)) # Page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456)) # Bytes of the file read through mmap
+SQLITE_STATEMENT_CACHE = int(os.getenv('SQLITE_STATEMENT_CACHE', 256)) # Prepared statements kept per connection
+
+
+class PersistentConnection(sqlite3.Connection):
+    """Fast-mode connection, kept open for its thread: close() only ends an open transaction."""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def shutdown(self):
+        super().close()
+
 class SQLiteManager:
     _instance = None
     DB_FILE = 'debug_marathon.db'
@@ -24,17 +49,133 @@ class SQLiteManager:
     def _initialize(self):
         """Initialize the SQLite DB"""
         self.db_path = os.path.join(os.path.dirname(__file__), self.DB_FILE)
-        logger.info(f"SQLite Manager initialized. DB Path: {self.db_path}")
+        self._local = threading.local() # Per-thread unit of work
+        self._conns = threading.local() # Fast mode: per-thread persistent connection
+        self._conns_pid = os.getpid()
+        self._lock = threading.Lock()
+        self._metrics = {'opened': 0, 'reused': 0}
+        mode = 'fast (WAL, persistent per-thread connections)' if SQLITE_FAST_MODE else 'default'
+        logger.info(f"SQLite Manager initialized. DB Path: {self.db_path} [{mode}]")
 
     def get_connection(self):
         try:
+            if SQLITE_FAST_MODE:
+                return self._persistent_connection()
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row  # Access columns by name
+            self._count('opened')
             return conn
         except sqlite3.Error as e:
             logger.error(f"Failed to connect to SQLite: {e}")
             return None
 
+    def _persistent_connection(self):
+        if self._conns_pid != os.getpid():
+            # Forked: the parent's connections must not be used here
+            self._conns, self._conns_pid = threading.local(), os.getpid()
+        conn = getattr(self._conns, 'conn', None)
+        if conn is not None:
+            self._count('reused')
+            return conn
+
+        conn = sqlite3.connect(
+            self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            factory=PersistentConnection, cached_statements=SQLITE_STATEMENT_CACHE
+        )
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+            conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        except sqlite3.Error:
+            conn.shutdown()
+            raise
+        self._conns.conn = conn
+        self._count('opened')
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def pool_stats(self):
+        with self._lock:
+            return {
+                'mode': 'fast' if SQLITE_FAST_MODE else 'default', 'db_path': self.db_path,
+                'busy_timeout_ms': SQLITE_BUSY_TIMEOUT_MS if SQLITE_FAST_MODE else None, **self._metrics
+            }
+
+    def _checkout(self):
+        """(connection, owned): the open unit of work's connection, else a fresh one we must close."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn, False
+        return self.get_connection(), True
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        `with db_manager.unit_of_work():` - every execute_* call this thread makes inside the block
+        shares one connection and one transaction, committed once when the block exits.
+        Rolled back instead if the block raises or any statement failed. Nested blocks join the outer one.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self
+            return
+        conn = self.get_connection()
+        if not conn:
+            yield self
+            return
+        self._local.conn, self._local.failed = conn, False
+        try:
+            yield self
+            if self._local.failed: conn.rollback()
+            else: conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    @contextmanager
+    def savepoint(self, name='sp'):
+        """
+        `with db_manager.savepoint() as sp:` inside a unit of work - if a statement of the block fails,
+        only the block is rolled back (sp['ok'] becomes False) and the rest of the unit still commits.
+        Outside a unit every statement commits on its own, so the block just runs.
+        """
+        state = {'ok': True}
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            yield state
+            return
+        failed_before, self._local.failed = self._local.failed, False
+        try:
+            # A savepoint opened outside a transaction would become the transaction itself
+            if not conn.in_transaction: conn.execute("BEGIN")
+            conn.execute(f"SAVEPOINT {name}")
+            active = True
+        except sqlite3.Error as e:
+            logger.error(f"SQLite SAVEPOINT failed: {e}")
+            active, failed_before = False, True
+        try:
+            yield state
+        except sqlite3.Error as e:
+            logger.error(f"Statement inside savepoint failed (SQLite): {e}")
+            self._local.failed = True
+        finally:
+            state['ok'] = active and not self._local.failed
+            if active:
+                try:
+                    conn.execute(f"RELEASE SAVEPOINT {name}" if state['ok'] else f"ROLLBACK TO SAVEPOINT {name}")
+                except sqlite3.Error as e:
+                    logger.error(f"SQLite savepoint rollback failed: {e}")
+                    state['ok'], failed_before = False, True
+            self._local.failed = failed_before
+
     def _adapt_query(self, query):
         """
         Adapt MySQL query to SQLite.
@@ -47,7 +188,7 @@ class SQLiteManager:
         return query.replace('%s', '?')
 
     def execute_query(self, query, params=None):
-        conn = self.get_connection()
+        conn, owned = self._checkout()
         if not conn: return None
         
         cursor = conn.cursor()
@@ -58,12 +199,13 @@ class SQLiteManager:
             return result
         except sqlite3.Error as e:
             logger.error(f"SELECT Query failed (SQLite): {e}\nQuery: {query}")
+            if not owned: self._local.failed = True
             return None
         finally:
-            if conn: conn.close()
+            if conn and owned: conn.close()
 
     def execute_update(self, query, params=None, is_script=False):
-        conn = self.get_connection()
+        conn, owned = self._checkout()
         if not conn: return False
         
         cursor = conn.cursor()
@@ -85,32 +227,113 @@ class SQLiteManager:
                 cursor.execute(adapted_query, params or ())
                 affected = cursor.rowcount
                 
-            conn.commit()
+            if owned: conn.commit()
             last_id = cursor.lastrowid
             return {"last_id": last_id, "affected": affected}
         except sqlite3.Error as e:
             # logger.error(f"UPDATE Query failed (SQLite): {e}\nQuery: {query}")
             # Raise so we can catch it
+            if not owned: self._local.failed = True
             raise e
         finally:
-            if conn: conn.close()
+            if conn and owned: conn.close()
+
+    def execute_insert(self, query, params, id_column):
+        """Runs a single-row INSERT and returns the new row's `id_column` (its rowid), or None on failure."""
+        try:
+            res = self.execute_update(query, params)
+        except sqlite3.Error as e:
+            logger.error(f"INSERT failed (SQLite): {e}\nQuery: {query}")
+            return None
+        return res['last_id'] if res else None
 
     def execute_transaction(self, queries_list):
-        conn = self.get_connection()
+        return self._execute_batch([(self._adapt_query(q), p or ()) for q, p in queries_list]) is not False
+
+    def execute_many(self, query, params_list):
+        """
+        Runs `query` for every params tuple (executemany) in one transaction.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        return self._execute_batch([(self._adapt_query(query), list(params_list))], many=True)
+
+    def bulk_upsert(self, table, columns, rows, conflict_keys, update_columns=None):
+        """
+        Inserts `rows` (tuples ordered like `columns`) with multi-row INSERT ... ON CONFLICT statements,
+        in one transaction. On conflict, `update_columns` (default: every non-key column) take the new
+        values; an empty list keeps the existing row.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_keys]
+        if update_columns:
+            on_conflict = f"DO UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in update_columns)}"
+        else:
+            on_conflict = "DO NOTHING"
+        row_sql = '(' + ', '.join(['?'] * len(columns)) + ')'
+        batch_size = max(1, min(BULK_BATCH_SIZE, SQLITE_MAX_VARIABLES // len(columns)))
+        rows = list(rows)
+        statements = []
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            statements.append((
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT({', '.join(conflict_keys)}) {on_conflict}",
+                tuple(v for row in batch for v in row)
+            ))
+        return self._execute_batch(statements)
+
+    def bulk_update(self, table, key_column, column, values):
+        """
+        Sets `column` of every row from the {key: value} map `values` with UPDATE ... CASE statements,
+        in one transaction.
+        Returns the total affected row count, or False (nothing applied) on failure.
+        """
+        items = list(values.items())
+        batch_size = max(1, min(BULK_BATCH_SIZE, SQLITE_MAX_VARIABLES // 3))
+        statements = []
+        for i in range(0, len(items), batch_size):
+            batch = items[i:i + batch_size]
+            statements.append((
+                f"UPDATE {table} SET {column} = CASE {key_column} {' '.join(['WHEN ? THEN ?'] * len(batch))} "
+                f"ELSE {column} END WHERE {key_column} IN ({', '.join(['?'] * len(batch))})",
+                tuple(v for item in batch for v in item) + tuple(key for key, _ in batch)
+            ))
+        return self._execute_batch(statements)
+
+    @staticmethod
+    def increment_upsert_sql(table, key_columns, increment_columns, rows=1):
+        """
+        INSERT of `rows` rows (values ordered key_columns + increment_columns) that, when the key
+        already exists, adds the new values to the stored increment_columns instead.
+        Uses %s placeholders like every caller's SQL (adapted by execute_update / execute_transaction).
+        """
+        columns = list(key_columns) + list(increment_columns)
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        updates = ', '.join(f"{c} = COALESCE({table}.{c}, 0) + excluded.{c}" for c in increment_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * rows)} "
+                f"ON CONFLICT({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+    def _execute_batch(self, statements, many=False):
+        conn, owned = self._checkout()
         if not conn: return False
         
         cursor = conn.cursor()
         try:
-            for query, params in queries_list:
-                cursor.execute(self._adapt_query(query), params or ())
-            conn.commit()
-            return True
+            affected = 0
+            for query, params in statements:
+                if many: cursor.executemany(query, params)
+                else: cursor.execute(query, params)
+                affected += max(cursor.rowcount, 0)
+            if owned: conn.commit()
+            return affected
         except sqlite3.Error as e:
-            conn.rollback()
+            if owned: conn.rollback()
+            else: self._local.failed = True
             logger.error(f"Transaction failed: {e}")
             return False
         finally:
-            if conn: conn.close()
+            if conn and owned: conn.close()
 
     def init_database(self, schema_file):
         # Override to use sqlite_schema.sql if provided, or caller handles it
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Standalone judge worker: pulls queued submissions from the shared judge queue, runs them
+and writes the verdict back to the submissions table (plus Socket.IO pushes when
+SOCKETIO_MESSAGE_QUEUE is set). Run any number of these, on web nodes or judge-only machines.
+
+Usage: JUDGE_QUEUE_BACKEND=db python judge_worker.py [--concurrency 4] [--worker-id judge-1]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from config import Config
+from extensions import socketio
+from utils.job_queue import judge_queue, JUDGE_QUEUE_BACKEND
+from utils.judge import JUDGE_WORKERS
+from utils.submission_service import process_judge_job, fail_async_submission
+
+logger = logging.getLogger("JudgeWorker")
+
+JUDGE_POLL_INTERVAL = float(os.getenv('JUDGE_POLL_INTERVAL', 0.2)) # Seconds between polls of an empty queue
+
+stopping = threading.Event()
+
+
+def work(worker_id):
+    if hasattr(judge_queue, 'recover'):
+        judge_queue.recover(worker_id)
+    while not stopping.is_set():
+        try:
+            claimed = judge_queue.claim(worker_id)
+        except Exception as e:
+            logger.error(f"[{worker_id}] claim failed: {e}")
+            stopping.wait(JUDGE_POLL_INTERVAL * 5)
+            continue
+        if not claimed:
+            stopping.wait(JUDGE_POLL_INTERVAL)
+            continue
+
+        job_id, job = claimed
+        started = time.time()
+        try:
+            verdict = process_judge_job(job)
+            judge_queue.complete(job_id, job)
+            logger.info(f"[{worker_id}] job {job_id} (submission {job['submission_id']}): "
+                        f"{'passed' if verdict['success'] else 'failed'} in {time.time() - started:.2f}s")
+        except Exception as e:
+            # Either may fail too (database/queue down): log it, never let it end this slot's thread.
+            # A job left claimed is retried once its lease expires
+            try:
+                fail_async_submission(job['submission_id'], job['uid'], job['question']['question_id'], e)
+            except Exception as fail_error:
+                logger.error(f"[{worker_id}] could not mark submission {job['submission_id']} failed: {fail_error}")
+            try:
+                judge_queue.fail(job_id, e, job)
+            except Exception as fail_error:
+                logger.error(f"[{worker_id}] could not release job {job_id}: {fail_error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Judge worker for the shared judge queue')
+    parser.add_argument('--concurrency', type=int, default=JUDGE_WORKERS, help='Submissions judged at once')
+    parser.add_argument('--worker-id', default=socket.gethostname(),
+                        help='Stable id of this worker; jobs it held when it crashed are recovered on restart '
+                             '(or by any worker once their lease expires)')
+    args = parser.parse_args()
+
+    if judge_queue is None:
+        raise SystemExit(f"JUDGE_QUEUE_BACKEND is '{JUDGE_QUEUE_BACKEND}': set it to 'db' or 'redis' to run a judge worker")
+
+    if Config.SOCKETIO_MESSAGE_QUEUE:
+        # Write-only Socket.IO client: verdict/leaderboard events reach clients of every web node
+        socketio.init_app(None, message_queue=Config.SOCKETIO_MESSAGE_QUEUE)
+
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    threads = []
+    for i in range(max(1, args.concurrency)):
+        t = threading.Thread(target=work, args=(f"{args.worker_id}:{i}",), name=f"judge-{i}")
+        t.start()
+        threads.append(t)
+    logger.info(f"Judge worker {args.worker_id} started: {len(threads)} slots, backend '{JUDGE_QUEUE_BACKEND}'")
+
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=1)
+    logger.info("Judge worker stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Offline check of the incremental level counters (participant_level_stats.questions_solved /
+level_score) against the submissions table.
+
+Usage:
+    python reconcile_scores.py            # report drift only (exit code 1 if any)
+    python reconcile_scores.py --apply    # also rewrite the drifted rows from submissions
+
+Best run while no level is live: submissions stored during the scan may show up as drift.
+"""
+import sys
+import argparse
+from db_connection import db_manager
+
+EXPECTED_QUERY = """
+    SELECT s.user_id, s.contest_id, r.round_number AS level,
+           COUNT(*) AS questions_solved, COALESCE(SUM(s.score_awarded), 0) AS level_score
+    FROM submissions s
+    JOIN rounds r ON s.round_id = r.round_id
+    WHERE s.is_correct = TRUE
+    GROUP BY s.user_id, s.contest_id, r.round_number
+"""
+ACTUAL_QUERY = "SELECT user_id, contest_id, level, questions_solved, level_score FROM participant_level_stats"
+LEVEL_KEY = ['user_id', 'contest_id', 'level']
+REPAIR_COLUMNS = LEVEL_KEY + ['questions_solved', 'level_score']
+
+
+def load(query):
+    rows = db_manager.execute_query(query)
+    if rows is None:
+        sys.exit(f"Query failed: {query.strip().splitlines()[0]}")
+    return {
+        (r['user_id'], r['contest_id'], r['level']): (int(r['questions_solved'] or 0), round(float(r['level_score'] or 0), 2))
+        for r in rows
+    }
+
+
+def find_drift():
+    """[(key, stored, expected)] for every level row whose counters disagree with submissions."""
+    expected = load(EXPECTED_QUERY)
+    actual = load(ACTUAL_QUERY)
+    drift = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want = expected.get(key, (0, 0.0))
+        have = actual.get(key, (0, 0.0))
+        if want != have:
+            drift.append((key, have, want))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apply', action='store_true', help='rewrite drifted counters from submissions')
+    args = parser.parse_args()
+
+    drift = find_drift()
+    print(f"{'user_id':>8} {'contest':>7} {'level':>5}  {'stored (solved/score)':>22}  {'expected':>14}")
+    for (user_id, contest_id, level), have, want in drift:
+        print(f"{user_id:>8} {contest_id:>7} {level:>5}  {have[0]:>12} / {have[1]:<7.2f}  {want[0]:>4} / {want[1]:<7.2f}")
+    print(f"{len(drift)} level row(s) drifted")
+
+    if not drift:
+        return 0
+    if not args.apply:
+        print("Run with --apply to repair them.")
+        return 1
+
+    rows = [(*key, want[0], want[1]) for key, _, want in drift]
+    if db_manager.bulk_upsert('participant_level_stats', REPAIR_COLUMNS, rows, LEVEL_KEY) is False:
+        print("Repair failed: no rows changed.")
+        return 1
+    print(f"Repaired {len(rows)} level row(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,17 @@ from db_connection import db_manager
 import uuid
 from auth_middleware import admin_required
 from werkzeug.security import generate_password_hash
-from utils.contest_service import create_question_logic
+from utils.contest_service import create_question_logic, create_questions_bulk_logic
+from utils.compile_cache import compile_cache
+from utils.judge import judge_pool
+from utils.job_queue import judge_queue
+from utils.security import scan_cache
+from utils.sandbox import sandbox_pool
+from utils.question_cache import question_cache, invalidate_question
+from utils import identity
+from utils.run_counter import run_counter
+from utils.idempotency import submit_flight
+from utils.submission_service import verdict_cache, invalidate_question_verdicts
 
 bp = Blueprint('admin', __name__)
 
@@ -26,6 +36,24 @@ def get_stats():
         "questions_solved": solved_count
     })
 
+@bp.route('/judge/stats', methods=['GET'])
+@admin_required
+def get_judge_stats():
+    # Per-worker counters (each gunicorn worker reports its own view)
+    return jsonify({
+        'judge': judge_pool.stats(),
+        'compile_cache': compile_cache.stats() if compile_cache else {'enabled': False},
+        'verdict_cache': verdict_cache.stats(),
+        'security_scan_cache': scan_cache.stats(),
+        'sandbox': sandbox_pool.stats(),
+        'question_cache': question_cache.stats(),
+        'identity_cache': identity.stats(),
+        'run_counts': run_counter.stats(),
+        'submit_dedupe': submit_flight.stats(),
+        'db_pool': db_manager.pool_stats() if hasattr(db_manager, 'pool_stats') else None,
+        'queue': judge_queue.stats() if judge_queue else {'backend': 'local'}
+    })
+
 # === Participant Management ===
 
 @bp.route('/participants', methods=['GET'])
@@ -159,6 +187,7 @@ def create_participant():
         
         insert_q = f"INSERT INTO users ({col_str}) VALUES ({placeholders})"
         db_res = db_manager.execute_update(insert_q, tuple(vals))
+        identity.forget_user(username) # Drop a cached "unknown username"
         
         if not db_res:
             return jsonify({'error': 'Database insert failed. See logs.'}), 500
@@ -174,6 +203,7 @@ def create_participant():
 def delete_participant(pid):
     # pid is username key in frontend 
     db_manager.execute_update("DELETE FROM users WHERE username=%s", (pid,))
+    identity.forget_user(pid)
     return jsonify({'success': True})
 
 @bp.route('/participants', methods=['DELETE'])
@@ -182,6 +212,7 @@ def delete_all_participants():
     try:
         # Delete only participants, keep admins/leaders
         db_manager.execute_update("DELETE FROM users WHERE role='participant'")
+        identity.forget_all_users()
         # Optional: Reset submissions, violations, etc. if cascading isn't set
         # But safest is just delete users and let constraints work or keep history
         # For a "Reset", usually we want to clear everything related
@@ -253,21 +284,16 @@ def create_questions_bulk():
     data = request.get_json()
     questions = data.get('questions', [])
     
-    count = 0
-    errors = []
+    items = []
     for q in questions:
         diff_str = q.get('difficulty', 'Level 1')
         round_num = 1
         if diff_str.startswith('Level '):
             try: round_num = int(diff_str.split(' ')[1])
             except: pass
+        items.append((round_num, q))
         
-        try:
-            create_question_logic(1, round_num, q)
-            count += 1
-        except Exception as e:
-            errors.append(f"Title {q.get('title')}: {str(e)}")
-        
+    count, errors = create_questions_bulk_logic(1, items)
     return jsonify({'success': True, 'count': count, 'errors': errors})
 
 @bp.route('/questions/<qid>', methods=['GET'])
@@ -350,6 +376,8 @@ def update_question(qid):
     query = f"UPDATE questions SET {', '.join(fields)} WHERE question_id=%s"
     try:
         db_manager.execute_update(query, tuple(params))
+        invalidate_question_verdicts(qid)
+        invalidate_question(qid)
         return jsonify({'success': True, 'message': 'Question updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -358,6 +386,8 @@ def update_question(qid):
 @admin_required
 def delete_question(qid):
     db_manager.execute_update("DELETE FROM questions WHERE question_id=%s", (qid,))
+    invalidate_question_verdicts(qid)
+    invalidate_question(qid)
     return jsonify({'success': True})
 
 
@@ -423,6 +453,7 @@ def create_leader():
         query = f"INSERT INTO users ({', '.join(cols)}) VALUES ({placeholders})"
         
         db_manager.execute_update(query, tuple(vals))
+        identity.forget_user(username)
         
         return jsonify({'success': True, 'leader': {
             'leader_id': username,
@@ -438,4 +469,5 @@ def create_leader():
 @admin_required
 def delete_leader(lid):
     db_manager.execute_update("DELETE FROM users WHERE username=%s AND role='leader'", (lid,))
+    identity.forget_user(lid)
     return jsonify({'success': True})
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, make_response, current_app
 import uuid
 import datetime
 import time
@@ -10,7 +10,21 @@ import tempfile
 from db_connection import db_manager
 from auth_middleware import admin_required
 from utils.logic import execute_code_internal
+from utils.judge import judge_pool, JudgeQueueFull, PRIORITY_RUN, PRIORITY_SUBMIT, JUDGE_WAIT_TIMEOUT
+from utils.job_queue import judge_queue
+from concurrent.futures import Future, TimeoutError as JudgeTimeout
+from utils.submission_service import (
+    grade_test_cases, collect_warnings, apply_score_increment, announce_correct_submission,
+    create_queued_submission, discard_queued_submission, mark_submission_running,
+    finish_async_submission, fail_async_submission, get_submission_verdict,
+    verdict_cache_key, get_cached_results, remember_results, fail_fast_predicate, outputs_match,
+    build_judge_job, wait_for_verdict
+)
 from utils.contest_service import activate_level_logic, complete_level_logic, advance_level_logic
+from utils.question_cache import get_question, resolve_language, invalidate_all_questions
+from utils.identity import resolve_user_id, resolve_user_ids
+from utils.run_counter import run_counter
+from utils.idempotency import submit_flight, submission_key, CallInProgress
 
 bp = Blueprint('contest', __name__)
 
@@ -247,16 +261,15 @@ def update_round(contest_id, round_number):
             "UPDATE rounds SET allowed_language=%s WHERE contest_id=%s AND round_number=%s",
             (allowed_language, contest_id, round_number)
         )
+        invalidate_all_questions()
     
     # Handle Question Reordering
     # Expects: questions_order = [{'id': 123, 'number': 1}, ...]
     questions_order = data.get('questions_order')
     if questions_order:
-         for q in questions_order:
-             db_manager.execute_update(
-                 "UPDATE questions SET question_number=%s WHERE question_id=%s",
-                 (q['number'], q['id'])
-             )
+         # One UPDATE ... CASE for the whole list instead of one statement per question
+         db_manager.bulk_update('questions', 'question_id', 'question_number',
+                                {q['id']: q['number'] for q in questions_order})
 
     return jsonify({'success': True})
 
@@ -345,6 +358,13 @@ def get_questions():
         
     return jsonify({'questions': questions, 'allowed_language': allowed_lang})
 
+def judge_busy_response(e):
+    # Back-pressure: tell the client to retry instead of queueing unbounded work
+    retry_after = getattr(e, 'retry_after', 5)
+    resp = jsonify({'error': 'Judge is busy. Please retry shortly.', 'success': False, 'retry_after': retry_after})
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp, 503
+
 @bp.route('/run', methods=['POST'])
 def run_code():
     data = request.get_json()
@@ -361,31 +381,10 @@ def run_code():
 
     print(f"RUN CODE: Fetching Question ID: {question_id} (Type: {type(question_id)})")
 
-    # 1. Fetch Question & Config
-    # Join with rounds to get allowed_language STRICTLY
-    query = """
-        SELECT q.question_id, q.test_input, q.expected_output, q.test_cases, r.allowed_language
-        FROM questions q
-        LEFT JOIN rounds r ON q.round_id = r.round_id
-        WHERE q.question_id = %s
-    """
-    
-    # Attempt 1: As provided
-    q_res = db_manager.execute_query(query, (question_id,))
-    
-    # Attempt 2: If not found, try type juggle (Int <-> String)
-    if not q_res:
-        try:
-            if str(question_id).isdigit():
-                print(f"RUN CODE: Retrying with int conversion: {int(question_id)}")
-                q_res = db_manager.execute_query(query, (int(question_id),))
-            else:
-                print(f"RUN CODE: Retrying with string: {str(question_id)}")
-                q_res = db_manager.execute_query(query, (str(question_id),))
-        except Exception as retry_err:
-            print(f"RUN CODE: Retry failed: {retry_err}")
+    # 1. Fetch Question & Config (cached: test cases parsed, round language joined in)
+    question = get_question(question_id)
         
-    if not q_res:
+    if not question:
         # Enhanced error message with debugging info
         print(f"RUN CODE ERROR: Question ID {question_id} NOT FOUND in DB.")
         print(f"  - Contest ID: {contest_id}, Level: {level}")
@@ -416,58 +415,25 @@ def run_code():
             }
         }), 404
     
-    question = q_res[0]
     print(f"RUN CODE: Found question ID {question['question_id']}")
-    
-    question = q_res[0]
 
-    # Enforce Allowed Language STRICTLY
-    allowed = question.get('allowed_language')
-    if allowed:
-        language = allowed.lower()
-    else:
-        language = requested_language # Fallback only if DB empty
-
-    # Normalize Language String
-    if language in ['c', 'gcc']: language = 'c'
-    if language in ['cpp', 'g++']: language = 'cpp'
-    if language in ['py', 'python3']: language = 'python'
-    if language in ['java', 'jdk']: language = 'java'
-    if language in ['javascript', 'js', 'node']: language = 'javascript'
+    # Enforce Allowed Language STRICTLY (requested language only if the round has none)
+    language = resolve_language(question, requested_language)
     
     # 2. Determine input/expected (Inputs)
-    inputs = []
-    if question.get('test_input') is not None:
-        inputs.append({
-            'input': question['test_input'], 
-            'expected': question['expected_output']
-        })
-    elif question.get('test_cases'):
-        try:
-            tcs = json.loads(question['test_cases'])
-            inputs = tcs if isinstance(tcs, list) else []
-        except: pass
+    inputs = question['test_cases']
+    expected = question['expected_lines']
         
     if not inputs:
         # Fallback for RUN only - warn user
         inputs = [{'input': '', 'expected': ''}] 
+        expected = [()]
         print(f"WARN: No inputs found for QID {question_id}, running with empty input.")
 
-    # 2. Track Execution (Run Count)
-    if user_id:
-        uid = user_id
-        if isinstance(user_id, str) and not user_id.isdigit():
-             u_res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (user_id,))
-             if u_res: uid = u_res[0]['user_id']
-        
-        try:
-            track_query = """
-                INSERT INTO participant_level_stats (user_id, contest_id, level, run_count)
-                VALUES (%s, %s, %s, 1)
-                ON DUPLICATE KEY UPDATE run_count = run_count + 1
-            """
-            db_manager.execute_update(track_query, (uid, contest_id, level))
-        except: pass
+    # 2. Track Execution (Run Count) - buffered, written in batches every few seconds
+    uid = resolve_user_id(user_id) if user_id else None
+    if uid:
+        run_counter.record(uid, contest_id, level)
 
     # 3. Execute Code (Sandbox Interface)
     test_results = []
@@ -475,23 +441,21 @@ def run_code():
     # Run first 3 sample cases
     sample_inputs = inputs[:3] 
     
-    for i, case in enumerate(sample_inputs):
+    # Compile once, run every sample case (queued behind submissions in the judge pool)
+    try:
+        results = judge_pool.execute(code, language, [case.get('input', '') for case in sample_inputs], priority=PRIORITY_RUN)
+    except (JudgeQueueFull, JudgeTimeout) as e:
+        return judge_busy_response(e)
+    
+    for case, case_expected, result in zip(sample_inputs, expected, results):
         inp = case.get('input', '')
         exp = case.get('expected', '')
+        duration = result.get('duration', 0)
         
-        start_t = time.time()
-        result = execute_code_internal(code, language, inp)
-        duration = time.time() - start_t
-        
-        # Normalize for comparison
-        def normalize(s):
-            if not s: return ""
-            return "\n".join([line.strip() for line in s.splitlines() if line.strip()])
-
         passed = False
         if result['success']:
             output = result['output'].replace('\r\n', '\n').strip()
-            passed = (normalize(output) == normalize(exp))
+            passed = outputs_match(result['output'], case_expected)
         else:
             output = result['error']
             
@@ -502,7 +466,9 @@ def run_code():
             'expected': exp,
             'error': result.get('error') if not result['success'] else None,
             'duration': duration,
-            'warnings': result.get('warnings')
+            'warnings': result.get('warnings'),
+            'cpu_time': result.get('cpu_time'),
+            'memory_kb': result.get('max_rss_kb')
         })
 
     # Summary Execution Time
@@ -533,35 +499,44 @@ def submit_question():
     if code is None: return jsonify({'error': 'Code missing'}), 400
 
     # User ID Resolution
-    uid = user_id
-    if isinstance(user_id, str) and not user_id.isdigit():
-         u_res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (user_id,))
-         if u_res: uid = u_res[0]['user_id']
-         else: return jsonify({'error': 'User not found'}), 404
-
-    # 1. Authoritative Question Lookup (Left Join to be safe)
-    query = """
-        SELECT q.question_id, q.round_id, q.test_input, q.expected_output, q.test_cases, q.points, r.allowed_language
-        FROM questions q
-        LEFT JOIN rounds r ON q.round_id = r.round_id
-        WHERE q.question_id = %s
-    """
-    
-    # Robust ID Handling (Int/Str)
-    q_res = db_manager.execute_query(query, (question_id,))
-    if not q_res:
-        # Try type conversion retry
-        try:
-            if str(question_id).isdigit():
-                q_res = db_manager.execute_query(query, (int(question_id),))
-            else:
-                q_res = db_manager.execute_query(query, (str(question_id),))
-        except: pass
-
-    if not q_res: 
+    uid = resolve_user_id(user_id)
+    if uid is None: return jsonify({'error': 'User not found'}), 404
+
+    # Double-clicks and retries of the same submit share one judge run and one response
+    # (2xx responses are also replayed to retries for IDEMPOTENCY_TTL seconds, until the question changes)
+    question = get_question(question_id)
+    key = submission_key(uid, question_id, code, variant=f"{data.get('language')}:{bool(data.get('async'))}",
+                         client_key=request.headers.get('Idempotency-Key'),
+                         version=question['tc_digest'] if question else '')
+    try:
+        snapshot, shared = submit_flight.do(
+            key, lambda: snapshot_response(submit_question_once(data, uid, user_id, question_id, code, contest_id)),
+            remember=lambda snap: snap[1] < 300
+        )
+    except CallInProgress:
+        # The original of this duplicate is still being judged: its response goes to the first request
+        resp = jsonify({'error': 'This submission is still being evaluated. Please retry shortly.', 'success': False, 'retry_after': 5})
+        resp.headers['Retry-After'] = '5'
+        return resp, 409
+    return replay_response(snapshot, shared)
+
+def snapshot_response(rv):
+    resp = make_response(rv)
+    headers = [(k, v) for k, v in resp.headers if k not in ('Content-Length', 'Set-Cookie')]
+    return resp.get_data(), resp.status_code, headers
+
+def replay_response(snapshot, shared):
+    body, status, headers = snapshot
+    resp = current_app.response_class(body, status=status, headers=headers)
+    if shared: resp.headers['Idempotent-Replayed'] = 'true'
+    return resp
+
+def submit_question_once(data, uid, user_id, question_id, code, contest_id):
+    # 1. Authoritative Question Lookup (cached, Int/Str id handling included)
+    question = get_question(question_id)
+
+    if not question: 
         return jsonify({'error': f'Question {question_id} not found in database'}), 404
-        
-    question = q_res[0]
     
     # 2. Check for Duplicate Submission (Success Only)
     check_query = "SELECT is_correct FROM submissions WHERE user_id=%s AND question_id=%s AND is_correct=TRUE"
@@ -570,63 +545,44 @@ def submit_question():
          return jsonify({'error': 'Already submitted successfully', 'submitted': True}), 400
 
     # 3. Language Handling
-    allowed = question.get('allowed_language')
-    if allowed:
-        language = allowed.lower()
-    else:
-        language = data.get('language', 'python')
-
-    if language in ['c', 'gcc']: language = 'c'
-    if language in ['cpp', 'g++']: language = 'cpp'
-    if language in ['py', 'python3']: language = 'python'
-    if language in ['java', 'jdk']: language = 'java'
-    if language in ['javascript', 'js', 'node']: language = 'javascript'
+    language = resolve_language(question, data.get('language', 'python'))
 
     # 4. Input Preparation
-    inputs = []
-    if question.get('test_input') is not None:
-        inputs.append({'input': question['test_input'], 'expected': question['expected_output']})
-    elif question.get('test_cases'):
-        try:
-            tcs = json.loads(question['test_cases'])
-            inputs = tcs if isinstance(tcs, list) else []
-        except: pass
+    inputs = question['test_cases']
     
     if not inputs:
         # Critical Data Error
         return jsonify({'error': 'System Error: Question has no test cases configured'}), 500
 
+    # Scores count towards the question's own round (client-sent level only if it has none)
+    level = question['level'] or data.get('level', 1)
+    test_inputs = [str(tc.get('input', '')) for tc in inputs]
+
+    # Identical code against identical test cases: reuse the earlier judge results
+    cache_key = verdict_cache_key(question['question_id'], inputs, language, code, question['tc_digest'])
+
+    # 5a. Shared judge queue: a judge_worker.py process (any machine) evaluates and persists it
+    if judge_queue and get_cached_results(cache_key) is None:
+        return submit_question_remote(uid, user_id, contest_id, level, question, code, language, inputs, wait=not data.get('async'))
+
+    # 5b. Async Mode: enqueue, answer with a submission id, push the verdict over Socket.IO
+    if data.get('async'):
+        return submit_question_async(uid, user_id, contest_id, level, question, code, language, inputs, test_inputs, cache_key)
+
     # 5. Execution (Strict)
-    all_passed = True
-    test_results = []
     start_time = time.time()
     
-    for tc in inputs:
-        inp = str(tc.get('input', ''))
-        exp = str(tc.get('expected', '')).replace('\r\n', '\n').strip()
-        
-        res = execute_code_internal(code, language, inp)
-        
-        if res['success']:
-            actual = res['output'].replace('\r\n', '\n').strip()
-        else:
-            actual = ""
-        
-        def normalize(s):
-            if not s: return ""
-            return "\n".join([line.strip() for line in s.splitlines() if line.strip()])
-        
-        passed = False
-        if res['success']:
-             passed = (normalize(actual) == normalize(exp))
-             
-        if not passed: all_passed = False
-        
-        test_results.append({
-            'input': inp, 'expected': exp, 'output': actual, 'passed': passed, 
-            'error': res['error'] if not res['success'] else None,
-            'warnings': res.get('warnings')
-        })
+    results = get_cached_results(cache_key)
+    if results is None:
+        # Compile once, run every test case
+        try:
+            results = judge_pool.execute(code, language, test_inputs, priority=PRIORITY_SUBMIT,
+                                         stop=fail_fast_predicate(inputs, question['expected_lines']))
+        except (JudgeQueueFull, JudgeTimeout) as e:
+            return judge_busy_response(e)
+        remember_results(cache_key, results)
+    
+    all_passed, test_results = grade_test_cases(inputs, results, question['expected_lines'])
 
     execution_duration = int(time.time() - start_time)
 
@@ -637,8 +593,7 @@ def submit_question():
     score = score_val if all_passed else 0.0
     
     # Collect Warnings
-    warnings = list(set([r['warnings'] for r in test_results if r.get('warnings')]))
-    warnings_str = "\n".join(warnings) if warnings else None
+    warnings_str = collect_warnings(test_results)
 
     save_query = """
         INSERT INTO submissions 
@@ -651,9 +606,14 @@ def submit_question():
     final_qid = question['question_id']
     
     try:
-        insert_res = db_manager.execute_update(save_query, (
-            uid, contest_id, final_round_id, final_qid, code, status, is_correct, json.dumps(test_results), score, execution_duration
-        ))
+        # Submission row and level counters: one connection, one commit. A failed counter update
+        # only rolls back to its savepoint - the submission is stored regardless
+        with db_manager.unit_of_work():
+            insert_res = db_manager.execute_update(save_query, (
+                uid, contest_id, final_round_id, final_qid, code, status, is_correct, json.dumps(test_results), score, execution_duration
+            ))
+            if insert_res and all_passed:
+                apply_score_increment(uid, contest_id, level, score)
         
         if not insert_res:
             print(f"SUBMIT DATA LOSS: Insert returned False for UID {uid} QID {final_qid}")
@@ -664,30 +624,9 @@ def submit_question():
         print(f"SUBMIT EXCEPTION: {e}")
         return jsonify({'error': f'Submission Persistence Failed: {str(e)}'}), 500
 
-    # 7. Level Stats Update
+    # 7. Real-time Broadcast
     if all_passed:
-        level = data.get('level', 1)
-        # Update Participant Stats
-        recalc_query = """
-            UPDATE participant_level_stats ps
-            SET 
-                questions_solved = (SELECT COUNT(*) FROM submissions s WHERE s.user_id=ps.user_id AND s.is_correct=TRUE),
-                level_score = (SELECT SUM(score_awarded) FROM submissions s WHERE s.user_id=ps.user_id)
-            WHERE ps.user_id=%s AND ps.contest_id=%s AND ps.level=%s
-        """
-        db_manager.execute_update("INSERT IGNORE INTO participant_level_stats (user_id, contest_id, level) VALUES (%s, %s, %s)", (uid, contest_id, level))
-        db_manager.execute_update(recalc_query, (uid, contest_id, level))
-
-        # Real-time Broadcast
-        from extensions import socketio
-        socketio.emit('admin:stats_update', {'user_id': uid, 'contest_id': contest_id})
-        socketio.emit('participant:submitted', {
-            'participant_id': uid,
-            'name': user_id,
-            'question': f"Q{question_id}",
-            'contest_id': contest_id
-        })
-        socketio.emit('leaderboard:update', {'contest_id': contest_id})
+        announce_correct_submission(uid, user_id, contest_id, final_qid)
         
     return jsonify({
         'success': all_passed,
@@ -698,6 +637,110 @@ def submit_question():
         'execution_time': f"{execution_duration}s"
     })
 
+def submit_question_async(uid, user_id, contest_id, level, question, code, language, inputs, test_inputs, cache_key):
+    """
+    Lifecycle: row inserted as 'queued' -> 'running' when a judge worker picks it up
+    -> 'evaluated' with the verdict. The HTTP request returns right after enqueueing.
+    """
+    try:
+        submission_id = create_queued_submission(uid, contest_id, question, code)
+    except Exception as e:
+        print(f"SUBMIT EXCEPTION: {e}")
+        submission_id = None
+    if not submission_id:
+        return jsonify({'error': 'Database Error: Submission could not be queued. Please retry.'}), 500
+
+    started_at = time.time()
+    cached = get_cached_results(cache_key)
+    if cached is not None:
+        # Memoized verdict: nothing to run, the callback below fires immediately
+        future = Future()
+        future.set_result(cached)
+    else:
+        try:
+            future = judge_pool.submit(code, language, test_inputs, priority=PRIORITY_SUBMIT,
+                                       on_start=lambda: mark_submission_running(submission_id),
+                                       stop=fail_fast_predicate(inputs, question['expected_lines']))
+        except JudgeQueueFull as e:
+            discard_queued_submission(submission_id)
+            return judge_busy_response(e)
+
+    def on_done(f):
+        try:
+            results = f.result()
+            if cached is None:
+                remember_results(cache_key, results)
+            finish_async_submission(submission_id, uid, user_id, contest_id, level, question, inputs, results, started_at)
+        except Exception as e:
+            fail_async_submission(submission_id, uid, question['question_id'], e)
+
+    future.add_done_callback(on_done)
+
+    return queued_submission_response(submission_id, user_id, 'Submission queued for evaluation')
+
+def queued_submission_response(submission_id, user_id, message):
+    return jsonify({
+        'success': True,
+        'status': 'queued',
+        'submission_id': submission_id,
+        'poll_url': f"/api/contest/submissions/{submission_id}?user_id={user_id}",
+        'message': message
+    }), 202
+
+def submit_question_remote(uid, user_id, contest_id, level, question, code, language, inputs, wait):
+    """
+    Hands the submission to the shared judge queue (JUDGE_QUEUE_BACKEND=db|redis).
+    Async clients get 202 right away; sync clients wait here for the worker's verdict.
+    """
+    try:
+        submission_id = create_queued_submission(uid, contest_id, question, code)
+    except Exception as e:
+        print(f"SUBMIT EXCEPTION: {e}")
+        submission_id = None
+    if not submission_id:
+        return jsonify({'error': 'Database Error: Submission could not be queued. Please retry.'}), 500
+
+    try:
+        judge_queue.enqueue(build_judge_job(submission_id, uid, user_id, contest_id, level, question, code, language, inputs),
+                            priority=PRIORITY_SUBMIT)
+    except Exception as e:
+        print(f"JUDGE QUEUE EXCEPTION: {e}")
+        discard_queued_submission(submission_id)
+        return judge_busy_response(e)
+
+    if not wait:
+        return queued_submission_response(submission_id, user_id, 'Submission queued for evaluation')
+
+    verdict = wait_for_verdict(submission_id, uid, JUDGE_WAIT_TIMEOUT, getattr(judge_queue, 'wait_done', None))
+    if not verdict:
+        return queued_submission_response(submission_id, user_id, 'Still evaluating. Check back shortly.')
+    if verdict['status'] == 'failed':
+        return jsonify({'error': 'Evaluation failed. Please resubmit.'}), 500
+
+    # Same shape as the in-process sync response
+    return jsonify({
+        'success': verdict['success'],
+        'status': verdict['status'],
+        'warnings': verdict['warnings'],
+        'message': verdict['message'],
+        'score': verdict['score'],
+        'execution_time': verdict['execution_time']
+    })
+
+@bp.route('/submissions/<int:submission_id>', methods=['GET'])
+def get_submission_status(submission_id):
+    # Polling fallback for async submits (when the Socket.IO verdict push is missed)
+    user_id = request.args.get('user_id')
+    if not user_id: return jsonify({'error': 'User ID missing'}), 400
+
+    uid = resolve_user_id(user_id)
+    if uid is None: return jsonify({'error': 'User not found'}), 404
+
+    verdict = get_submission_verdict(submission_id, uid)
+    if not verdict:
+        return jsonify({'error': 'Submission not found'}), 404
+    return jsonify(verdict)
+
 def execute_code_secure(code, language, input_data):
     ext_map = {'python': '.py', 'javascript': '.js'}
     ext = ext_map.get(language, '.txt')
@@ -743,118 +786,117 @@ def get_participant_state():
         user_id = data.get('user_id')
         contest_id = data.get('contest_id', 1)
         
-        uid = user_id
-        if isinstance(user_id, str) and not user_id.isdigit():
-             u_res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (user_id,))
-             if u_res: uid = u_res[0]['user_id']
-             else: return jsonify({'error': 'User not found'}), 404
+        # Every read below shares one pooled connection (one checkout, one consistent snapshot)
+        with db_manager.unit_of_work():
+            uid = resolve_user_id(user_id)
+            if uid is None: return jsonify({'error': 'User not found'}), 404
              
-        # 1. Fetch Participant and Proctoring State in one go
-        state_query = """
-            SELECT 
-                pls.level, pls.violation_count, pls.questions_solved, pls.start_time, pls.status,
-                pp.total_violations, pp.is_disqualified, pp.disqualification_reason
-            FROM participant_level_stats pls
-            LEFT JOIN participant_proctoring pp ON pls.user_id = pp.user_id AND pls.contest_id = pp.contest_id
-            WHERE pls.user_id = %s AND pls.contest_id = %s
-            ORDER BY pls.level DESC LIMIT 1
-        """
-        state_res = db_manager.execute_query(state_query, (uid, contest_id))
-        current_state = state_res[0] if state_res else None
+            # 1. Fetch Participant and Proctoring State in one go
+            state_query = """
+                SELECT 
+                    pls.level, pls.violation_count, pls.questions_solved, pls.start_time, pls.status,
+                    pp.total_violations, pp.is_disqualified, pp.disqualification_reason
+                FROM participant_level_stats pls
+                LEFT JOIN participant_proctoring pp ON pls.user_id = pp.user_id AND pls.contest_id = pp.contest_id
+                WHERE pls.user_id = %s AND pls.contest_id = %s
+                ORDER BY pls.level DESC LIMIT 1
+            """
+            state_res = db_manager.execute_query(state_query, (uid, contest_id))
+            current_state = state_res[0] if state_res else None
         
-        # 2. Fetch Global Contest State (Rounds & Admin Flags)
-        # Using a union or multiple keys to minimize queries
-        global_query = """
-            SELECT round_number, status, time_limit_minutes 
-            FROM rounds 
-            WHERE contest_id = %s 
-            ORDER BY round_number ASC
-        """
-        rounds_res = db_manager.execute_query(global_query, (contest_id,))
-        rounds_map = {r['round_number']: r['status'] for r in rounds_res} if rounds_res else {1: 'active'}
+            # 2. Fetch Global Contest State (Rounds & Admin Flags)
+            # Using a union or multiple keys to minimize queries
+            global_query = """
+                SELECT round_number, status, time_limit_minutes 
+                FROM rounds 
+                WHERE contest_id = %s 
+                ORDER BY round_number ASC
+            """
+            rounds_res = db_manager.execute_query(global_query, (contest_id,))
+            rounds_map = {r['round_number']: r['status'] for r in rounds_res} if rounds_res else {1: 'active'}
         
-        global_active_level = 1
-        level_duration = 20 # Default
+            global_active_level = 1
+            level_duration = 20 # Default
         
-        for r in (rounds_res or []):
-            if r['status'] == 'active':
-                global_active_level = r['round_number']
-                break
+            for r in (rounds_res or []):
+                if r['status'] == 'active':
+                    global_active_level = r['round_number']
+                    break
         
-        # Determine duration for user's current level
-        curr_lvl_num = current_state['level'] if current_state else 1
-        for r in rounds_res:
-            if r['round_number'] == curr_lvl_num:
-                if r['time_limit_minutes'] and r['time_limit_minutes'] > 0:
-                    level_duration = r['time_limit_minutes']
-                break
-
-        # 3. Fetch Admin State Keys (Released flags, Countdown)
-        admin_keys = [f"contest_{contest_id}_level_{curr_lvl_num}_released", f"contest_{contest_id}_countdown"]
-        admin_res = db_manager.execute_query("SELECT key_name, value FROM admin_state WHERE key_name IN (%s, %s)", (admin_keys[0], admin_keys[1]))
-        admin_map = {r['key_name']: r['value'] for r in admin_res}
+            # Determine duration for user's current level
+            curr_lvl_num = current_state['level'] if current_state else 1
+            for r in rounds_res:
+                if r['round_number'] == curr_lvl_num:
+                    if r['time_limit_minutes'] and r['time_limit_minutes'] > 0:
+                        level_duration = r['time_limit_minutes']
+                    break
+
+            # 3. Fetch Admin State Keys (Released flags, Countdown)
+            admin_keys = [f"contest_{contest_id}_level_{curr_lvl_num}_released", f"contest_{contest_id}_countdown"]
+            admin_res = db_manager.execute_query("SELECT key_name, value FROM admin_state WHERE key_name IN (%s, %s)", (admin_keys[0], admin_keys[1]))
+            admin_map = {r['key_name']: r['value'] for r in admin_res}
         
-        results_released = admin_map.get(admin_keys[0]) == 'true'
-        countdown_data = {'active': False}
-        if admin_map.get(admin_keys[1]):
-            try: countdown_data = json.loads(admin_map[admin_keys[1]])
-            except: pass
-
-        # 4. Solved Question IDs (Aggregated)
-        # Could be slow with many submissions, but usually fine for one user
-        s_query = "SELECT CAST(question_id AS CHAR) as qid FROM submissions WHERE user_id=%s AND contest_id=%s AND is_correct=TRUE"
-        s_res = db_manager.execute_query(s_query, (uid, contest_id))
-        solved_ids = [r['qid'] for r in s_res] if s_res else []
-
-        # 5. Qualification / Disqualification Logic
-        total_violations = current_state['total_violations'] if current_state and current_state['total_violations'] is not None else 0
-        is_disqualified_state = bool(current_state['is_disqualified']) if current_state else False
-        disq_reason = current_state['disqualification_reason'] if current_state else None
-
-        # Qualification Check
-        if not is_disqualified_state and global_active_level > 1:
-            q_check = "SELECT is_allowed FROM shortlisted_participants WHERE contest_id=%s AND level=%s AND user_id=%s AND is_allowed=1"
-            q_res = db_manager.execute_query(q_check, (contest_id, global_active_level, uid))
-            if not q_res:
-                if current_state and (current_state['level'] >= global_active_level or (current_state['level'] == global_active_level - 1 and current_state['status'] == 'COMPLETED')):
-                    is_disqualified_state = True
-                    disq_reason = f"Not selected for Level {global_active_level}"
-
-        is_shortlisted_next = False
-        if results_released:
-            next_lvl = curr_lvl_num + 1
-            sl_q = "SELECT 1 FROM shortlisted_participants WHERE contest_id=%s AND level=%s AND user_id=%s AND is_allowed=1"
-            sl_chk = db_manager.execute_query(sl_q, (contest_id, next_lvl, uid))
-            is_shortlisted_next = bool(sl_chk)
-
-        # Handle Clamp
-        if current_state and current_state['level'] > global_active_level:
-            current_state['level'] = global_active_level
-            current_state['status'] = 'NOT_STARTED'
-
-        # Helper for UTC formatting
-        def format_utc(dt):
-            if not dt: return None
-            return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        return jsonify({
-            'success': True,
-            'level': current_state['level'] if current_state else 1,
-            'level_duration_minutes': level_duration,
-            'violations': total_violations,
-            'solved': current_state['questions_solved'] if current_state else 0,
-            'solved_ids': solved_ids,
-            'status': current_state['status'] or 'NOT_STARTED' if current_state else 'NOT_STARTED',
-            'start_time': format_utc(current_state['start_time']) if current_state else None,
-            'global_level': global_active_level,
-            'global_level_status': rounds_map.get(global_active_level, 'active'),
-            'rounds_map': rounds_map,
-            'countdown': countdown_data,
-            'is_eliminated': is_disqualified_state,
-            'disqualification_reason': disq_reason,
-            'results_released': results_released,
-            'is_shortlisted_next': is_shortlisted_next
-        })
+            results_released = admin_map.get(admin_keys[0]) == 'true'
+            countdown_data = {'active': False}
+            if admin_map.get(admin_keys[1]):
+                try: countdown_data = json.loads(admin_map[admin_keys[1]])
+                except: pass
+
+            # 4. Solved Question IDs (Aggregated)
+            # Could be slow with many submissions, but usually fine for one user
+            s_query = "SELECT CAST(question_id AS CHAR) as qid FROM submissions WHERE user_id=%s AND contest_id=%s AND is_correct=TRUE"
+            s_res = db_manager.execute_query(s_query, (uid, contest_id))
+            solved_ids = [r['qid'] for r in s_res] if s_res else []
+
+            # 5. Qualification / Disqualification Logic
+            total_violations = current_state['total_violations'] if current_state and current_state['total_violations'] is not None else 0
+            is_disqualified_state = bool(current_state['is_disqualified']) if current_state else False
+            disq_reason = current_state['disqualification_reason'] if current_state else None
+
+            # Qualification Check
+            if not is_disqualified_state and global_active_level > 1:
+                q_check = "SELECT is_allowed FROM shortlisted_participants WHERE contest_id=%s AND level=%s AND user_id=%s AND is_allowed=1"
+                q_res = db_manager.execute_query(q_check, (contest_id, global_active_level, uid))
+                if not q_res:
+                    if current_state and (current_state['level'] >= global_active_level or (current_state['level'] == global_active_level - 1 and current_state['status'] == 'COMPLETED')):
+                        is_disqualified_state = True
+                        disq_reason = f"Not selected for Level {global_active_level}"
+
+            is_shortlisted_next = False
+            if results_released:
+                next_lvl = curr_lvl_num + 1
+                sl_q = "SELECT 1 FROM shortlisted_participants WHERE contest_id=%s AND level=%s AND user_id=%s AND is_allowed=1"
+                sl_chk = db_manager.execute_query(sl_q, (contest_id, next_lvl, uid))
+                is_shortlisted_next = bool(sl_chk)
+
+            # Handle Clamp
+            if current_state and current_state['level'] > global_active_level:
+                current_state['level'] = global_active_level
+                current_state['status'] = 'NOT_STARTED'
+
+            # Helper for UTC formatting
+            def format_utc(dt):
+                if not dt: return None
+                return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+            return jsonify({
+                'success': True,
+                'level': current_state['level'] if current_state else 1,
+                'level_duration_minutes': level_duration,
+                'violations': total_violations,
+                'solved': current_state['questions_solved'] if current_state else 0,
+                'solved_ids': solved_ids,
+                'status': current_state['status'] or 'NOT_STARTED' if current_state else 'NOT_STARTED',
+                'start_time': format_utc(current_state['start_time']) if current_state else None,
+                'global_level': global_active_level,
+                'global_level_status': rounds_map.get(global_active_level, 'active'),
+                'rounds_map': rounds_map,
+                'countdown': countdown_data,
+                'is_eliminated': is_disqualified_state,
+                'disqualification_reason': disq_reason,
+                'results_released': results_released,
+                'is_shortlisted_next': is_shortlisted_next
+            })
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -873,11 +915,8 @@ def start_level():
         if not user_id or not level: return jsonify({'error': 'Missing fields'}), 400
         
         # 1. Resolve User ID
-        uid = user_id
-        if isinstance(user_id, str) and not user_id.isdigit():
-             u_res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (user_id,))
-             if u_res: uid = u_res[0]['user_id']
-             else: return jsonify({'error': f'User {user_id} not found'}), 404
+        uid = resolve_user_id(user_id)
+        if uid is None: return jsonify({'error': f'User {user_id} not found'}), 404
         
         # 2. Ensure Row Exists
         # Use Python UTC time for consistency across systems
@@ -941,10 +980,7 @@ def submit_level():
     if not user_id: return jsonify({'success': True})
 
     # Get User INT ID
-    uid = user_id
-    if isinstance(user_id, str) and not user_id.isdigit():
-         u_res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (user_id,))
-         if u_res: uid = u_res[0]['user_id']
+    uid = resolve_user_id(user_id) or user_id
     
     # 1. Update Status to COMPLETED
     # Set completion time
@@ -1014,25 +1050,29 @@ def qualify_participants(contest_id):
          # Need better logic: find NEXT level. For now, try manual or default
          level = 2 
 
-    # 1. Reset selection for this level (Requirement: Uncheck others)
-    # We set all is_allowed=0 for this contest+level first
-    db_manager.execute_update("UPDATE shortlisted_participants SET is_allowed=0 WHERE contest_id=%s AND level=%s", (contest_id, level))
-
-    count = 0
-    for pid in participant_ids:
-        # pid could be int or string
-        uid = pid
-        if isinstance(pid, str) and not pid.isdigit():
-             res = db_manager.execute_query("SELECT user_id FROM users WHERE username=%s", (pid,))
-             if res: uid = res[0]['user_id']
-        
-        db_manager.execute_update(
-            "INSERT INTO shortlisted_participants (contest_id, level, user_id, is_allowed) VALUES (%s, %s, %s, 1) ON DUPLICATE KEY UPDATE is_allowed=1",
-            (contest_id, level, uid)
-        )
-        count += 1
-
-    return jsonify({'success': True, 'count': count})
+    # pid could be int or string (usernames resolved in batches). Unknown usernames are left out
+    # and reported: one of them in the INT user_id column would fail the whole shortlist
+    resolved = resolve_user_ids(participant_ids)
+    uids = [uid for uid in resolved if uid is not None]
+    unresolved = [pid for pid, uid in zip(participant_ids, resolved) if uid is None]
+
+    # Reset + shortlist in one transaction: a few multi-row statements, whatever the list size.
+    # A failed statement rolls the whole unit back, so both results must be checked
+    with db_manager.unit_of_work():
+        # 1. Reset selection for this level (Requirement: Uncheck others)
+        # We set all is_allowed=0 for this contest+level first
+        reset = db_manager.execute_update("UPDATE shortlisted_participants SET is_allowed=0 WHERE contest_id=%s AND level=%s", (contest_id, level))
+
+        # 2. Allow the selected participants
+        allowed = db_manager.bulk_upsert(
+            'shortlisted_participants', ['contest_id', 'level', 'user_id', 'is_allowed'],
+            [(contest_id, level, uid, 1) for uid in uids],
+            conflict_keys=['contest_id', 'level', 'user_id'], update_columns=['is_allowed']
+        ) if reset else False
+
+    if allowed is False:
+        return jsonify({'error': 'Database Error: Shortlist could not be saved. Please retry.', 'success': False}), 500
+    return jsonify({'success': True, 'count': len(uids), 'unresolved': unresolved})
 
 @bp.route('/<contest_id>/shortlisted-participants', methods=['GET'])
 @admin_required
@@ -1,6 +1,7 @@
 
 from flask import Blueprint, jsonify, request
 from db_connection import db_manager
+from utils.identity import resolve_user
 import datetime
 import uuid
 
@@ -151,12 +152,12 @@ def report_violation():
     level = data.get('level')
     
     # 1. Resolve User ID
-    u_res = db_manager.execute_query("SELECT user_id, username FROM users WHERE username=%s", (participant_id_str,))
-    if not u_res:
+    user = resolve_user(participant_id_str)
+    if not user:
         return jsonify({'error': 'User not found'}), 404
         
-    user_id = u_res[0]['user_id']
-    username = u_res[0]['username']
+    user_id = user['user_id']
+    username = user['username']
     
     # 2. Log Raw Violation (Source of Truth for Audit)
     query_log = """
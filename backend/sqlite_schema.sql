@@ -83,6 +83,21 @@ CREATE TABLE IF NOT EXISTS submissions (
   submission_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS judge_jobs (
+  job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  submission_id INTEGER,
+  priority INTEGER NOT NULL DEFAULT 0,
+  payload TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'queued',
+  worker_id TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  error TEXT,
+  enqueued_at REAL NOT NULL,
+  claimed_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_judge_jobs_claim ON judge_jobs(status, priority, job_id);
+
 CREATE TABLE IF NOT EXISTS participant_level_stats (
   stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
   user_id INTEGER NOT NULL,
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('USE_SQLITE', 'True') # Never reach for a MySQL/PostgreSQL server from the tests
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """The SQLite manager pointed at a fresh database built from sqlite_schema.sql."""
+    from db_sqlite import sqlite_manager
+    monkeypatch.setattr(sqlite_manager, 'db_path', str(tmp_path / 'test.db'))
+    assert sqlite_manager.init_database(os.path.join(BACKEND_DIR, 'sqlite_schema.sql'))
+    return sqlite_manager
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip('dotenv')
+
+CASES = [{'input': '1', 'expected': '2'}]
+PASSED = [{'success': True, 'output': '2', 'error': None}]
+QUESTION = {'question_id': 7, 'round_id': 1, 'points': 10}
+
+
+@pytest.fixture
+def service(sqlite_db, monkeypatch):
+    from utils import submission_service
+    if submission_service.db_manager is not sqlite_db:
+        pytest.skip('tests run against the SQLite manager')
+    events = []
+    monkeypatch.setattr(submission_service, 'emit_event', lambda event, payload, to=None: events.append((event, to)))
+    monkeypatch.setattr(submission_service, 'events', events, raising=False) # Recorded emits, for the asserts
+    return submission_service
+
+
+def level_counters(db):
+    rows = db.execute_query("SELECT questions_solved, level_score FROM participant_level_stats")
+    return [(r['questions_solved'], r['level_score']) for r in rows]
+
+
+def test_queued_submission_gets_an_id(service):
+    first = service.create_queued_submission(1, 1, QUESTION, 'print(2)')
+    assert first and service.create_queued_submission(1, 1, QUESTION, 'print(2)') == first + 1
+
+
+def test_duplicate_finish_counts_once(service, sqlite_db):
+    submission_id = service.create_queued_submission(1, 1, QUESTION, 'print(2)')
+    first = service.finish_async_submission(submission_id, 1, 'P1', 1, 1, QUESTION, CASES, PASSED, 0)
+    again = service.finish_async_submission(submission_id, 1, 'P1', 1, 1, QUESTION, CASES, PASSED, 0)
+    assert first['success'] and again['status'] == 'evaluated' and again['success']
+    assert level_counters(sqlite_db) == [(1, 10.0)]
+    assert [e for e in service.events if e[0] == 'submission:verdict'] == [('submission:verdict', 'user:1')]
+
+
+def test_failure_after_evaluation_keeps_the_verdict(service):
+    submission_id = service.create_queued_submission(1, 1, QUESTION, 'print(2)')
+    service.finish_async_submission(submission_id, 1, 'P1', 1, 1, QUESTION, CASES, PASSED, 0)
+    service.fail_async_submission(submission_id, 1, QUESTION['question_id'], 'lease expired')
+    assert service.get_submission_verdict(submission_id, 1)['status'] == 'evaluated'
+
+
+def test_wait_for_verdict_wakes_on_completion_signal(service):
+    submission_id = service.create_queued_submission(1, 1, QUESTION, 'print(2)')
+
+    def wait_done(sid, timeout):
+        service.finish_async_submission(sid, 1, 'P1', 1, 1, QUESTION, CASES, PASSED, 0) # The remote worker
+        return True
+
+    assert service.wait_for_verdict(submission_id, 1, 5, wait_done)['success']
+
+
+def test_wait_for_verdict_times_out(service):
+    submission_id = service.create_queued_submission(1, 1, QUESTION, 'print(2)')
+    assert service.wait_for_verdict(submission_id, 1, 0.3) is None
@@ -0,0 +1,25 @@
+def add_round(db, round_id, minutes):
+    db.execute_update(
+        "INSERT INTO rounds (round_id, contest_id, round_name, round_number, time_limit_minutes, total_questions) "
+        "VALUES (%s, 1, 'Level', %s, %s, 1)", (round_id, round_id, minutes)
+    )
+
+
+def minutes(db):
+    return {r['round_id']: r['time_limit_minutes'] for r in db.execute_query("SELECT round_id, time_limit_minutes FROM rounds")}
+
+
+def test_bulk_update_sets_each_key_and_leaves_others(sqlite_db):
+    for round_id in (1, 2, 3):
+        add_round(sqlite_db, round_id, 30)
+    assert sqlite_db.bulk_update('rounds', 'round_id', 'time_limit_minutes', {1: 45, 3: 60, 9: 5}) == 2
+    assert minutes(sqlite_db) == {1: 45, 2: 30, 3: 60}
+
+
+def test_bulk_update_splits_large_maps(sqlite_db, monkeypatch):
+    import db_sqlite
+    monkeypatch.setattr(db_sqlite, 'BULK_BATCH_SIZE', 2)
+    for round_id in range(1, 6):
+        add_round(sqlite_db, round_id, 30)
+    assert sqlite_db.bulk_update('rounds', 'round_id', 'time_limit_minutes', {r: r * 10 for r in range(1, 6)}) == 5
+    assert minutes(sqlite_db) == {r: r * 10 for r in range(1, 6)}
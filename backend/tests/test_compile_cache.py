@@ -0,0 +1,48 @@
+import os
+
+from utils.compile_cache import CompileCache
+
+
+def make_cache(tmp_path):
+    return CompileCache(str(tmp_path / 'cache'), 1024 * 1024)
+
+
+def test_put_then_get(tmp_path):
+    cache = make_cache(tmp_path)
+    exe = tmp_path / 'main.exe'
+    exe.write_bytes(b'binary')
+    key = cache.make_key('cpp', ['g++'], 'int main(){}')
+    entry = cache.put(key, [str(exe)], warnings='unused variable')
+    assert open(os.path.join(entry, 'main.exe'), 'rb').read() == b'binary'
+    assert cache.get(key) == {'path': entry, 'warnings': 'unused variable', 'error': None}
+
+
+def test_failed_copy_publishes_nothing(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key('cpp', ['g++'], 'int main(){}')
+    assert cache.put(key, [str(tmp_path / 'missing.exe')]) is None
+    assert cache.get(key) is None
+    assert cache.stats()['store_failures'] == 1
+    assert not [name for name in os.listdir(cache.root) if name.startswith('.staging-')]
+
+
+def test_entries_are_private(tmp_path):
+    cache = make_cache(tmp_path)
+    exe = tmp_path / 'main.exe'
+    exe.write_bytes(b'binary')
+    exe.chmod(0o777)
+    entry = cache.put(cache.make_key('cpp', ['g++'], 'int main(){}'), [str(exe)])
+    assert os.stat(cache.root).st_mode & 0o777 == 0o700
+    assert os.stat(os.path.dirname(entry)).st_mode & 0o077 == 0
+    assert os.stat(os.path.join(entry, 'main.exe')).st_mode & 0o022 == 0
+
+
+def test_writable_entry_is_not_served(tmp_path):
+    cache = make_cache(tmp_path)
+    exe = tmp_path / 'main.exe'
+    exe.write_bytes(b'binary')
+    key = cache.make_key('cpp', ['g++'], 'int main(){}')
+    entry = cache.put(key, [str(exe)])
+    os.chmod(os.path.join(entry, 'main.exe'), 0o777) # Anyone could swap the binary
+    assert cache.get(key) is None
+    assert cache.stats()['untrusted'] == 1
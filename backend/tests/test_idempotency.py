@@ -0,0 +1,44 @@
+import threading
+import pytest
+
+from utils.idempotency import SingleFlight, CallInProgress, submission_key
+
+
+def test_duplicate_shares_the_running_call():
+    flight = SingleFlight(16, 60, wait_timeout=5)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'verdict'
+
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do('k', lambda: 'second run')))
+    follower.start()
+    release.set()
+    leader.join(); follower.join()
+    assert sorted(results) == [('verdict', False), ('verdict', True)]
+
+
+def test_duplicate_wait_timeout_raises_call_in_progress():
+    flight = SingleFlight(16, 60, wait_timeout=0.1)
+    started, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=lambda: flight.do('k', lambda: (started.set(), release.wait(5))))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(CallInProgress):
+        flight.do('k', lambda: 'second run')
+    release.set()
+    leader.join()
+    assert flight.stats()['wait_timeouts'] == 1
+
+
+def test_question_edit_changes_the_key():
+    for client_key in (None, 'retry-1'):
+        before = submission_key(1, 7, 'print(2)', 'python:False', client_key, version='digest-a')
+        assert before == submission_key(1, 7, 'print(2)', 'python:False', client_key, version='digest-a')
+        assert before != submission_key(1, 7, 'print(2)', 'python:False', client_key, version='digest-b')
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('dotenv')
+
+ADD_USER = "INSERT INTO users (user_id, username, email, password_hash) VALUES (%s, %s, %s, 'x')"
+
+
+@pytest.fixture
+def identity(sqlite_db, tmp_path, monkeypatch):
+    from utils import identity
+    if identity.db_manager is not sqlite_db:
+        pytest.skip('tests run against the SQLite manager')
+    monkeypatch.setattr(identity.identity_epoch, 'path', str(tmp_path / 'identity_epoch'))
+    identity.forget_all_users()
+    return identity
+
+
+def recreate_user(db, user_id):
+    db.execute_update("DELETE FROM users WHERE username='PART001'")
+    db.execute_update(ADD_USER, (user_id, 'PART001', f'p{user_id}@example.com'))
+
+
+def test_lookup_is_cached(identity, sqlite_db):
+    sqlite_db.execute_update(ADD_USER, (1, 'PART001', 'p1@example.com'))
+    assert identity.resolve_user_id('PART001') == 1
+    recreate_user(sqlite_db, 2)
+    assert identity.resolve_user_id('PART001') == 1
+
+
+def test_invalidation_by_another_worker_is_seen(identity, sqlite_db):
+    sqlite_db.execute_update(ADD_USER, (1, 'PART001', 'p1@example.com'))
+    assert identity.resolve_user_id('PART001') == 1
+    recreate_user(sqlite_db, 2)
+    identity.identity_epoch.bump() # What forget_user() does in the worker that handled the admin request
+    assert identity.resolve_user_id('PART001') == 2
+    assert identity.resolve_user_ids(['PART001', 'nobody']) == [2, None]
@@ -0,0 +1,29 @@
+import subprocess
+import time
+
+from utils.java_service import JavaHelper
+
+
+def helper_with(cmd):
+    """A JavaHelper around an arbitrary process: exercises the startup handshake without a JDK."""
+    helper = JavaHelper.__new__(JavaHelper)
+    helper.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, start_new_session=True)
+    return helper
+
+
+def test_port_line_is_read_across_partial_writes():
+    helper = helper_with(['sh', '-c', 'printf "PO"; sleep 0.1; echo "RT 4242"; sleep 5'])
+    try:
+        assert helper._read_line(time.monotonic() + 5) == 'PORT 4242'
+    finally:
+        helper.close()
+
+
+def test_silent_jvm_does_not_block_startup():
+    helper = helper_with(['sleep', '5'])
+    started = time.monotonic()
+    try:
+        assert helper._read_line(time.monotonic() + 0.3) == ''
+    finally:
+        helper.close()
+    assert time.monotonic() - started < 2
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from utils import judge
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-worker pool whose jobs take 50ms per case and honour `stop`."""
+    ran = []
+
+    def fake_batch(code, language, inputs, stop=None):
+        ran.append(code)
+        results = []
+        for i, _ in enumerate(inputs):
+            time.sleep(0.05)
+            results.append({'success': True, 'output': ''})
+            if stop and stop(i, results[-1]):
+                break
+        return results
+
+    monkeypatch.setattr(judge, 'execute_code_batch', fake_batch)
+    monkeypatch.setattr(judge, 'JUDGE_WAIT_TIMEOUT', 0.3)
+    pool = judge.JudgePool(1, 10)
+    pool.ran = ran
+    return pool
+
+
+def test_timed_out_job_is_not_judged_later(pool):
+    blocker = pool.submit('blocker', 'python', [''] * 20)
+    with pytest.raises(FutureTimeout):
+        pool.execute('late', 'python', ['1'])
+    assert blocker.result(timeout=5)
+    pool.execute('next', 'python', ['1']) # Served after the cancelled job was skipped
+    assert pool.ran == ['blocker', 'next']
+    assert pool.stats()['abandoned'] == 1
+
+
+def test_timed_out_running_job_is_stopped(pool):
+    with pytest.raises(FutureTimeout):
+        pool.execute('slow', 'python', [''] * 100) # ~5s of cases, abandoned after 0.3s
+    pool.execute('next', 'python', ['1']) # Would time out too if 'slow' kept the worker
+    assert pool.ran == ['slow', 'next']
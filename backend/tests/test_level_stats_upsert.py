@@ -0,0 +1,61 @@
+import pytest
+
+KEY = ('user_id', 'contest_id', 'level')
+COUNTERS = ('questions_solved', 'level_score')
+
+
+def level_row(db, user_id=1, contest_id=1, level=1):
+    rows = db.execute_query(
+        "SELECT questions_solved, level_score FROM participant_level_stats WHERE user_id=%s AND contest_id=%s AND level=%s",
+        (user_id, contest_id, level)
+    )
+    return (rows[0]['questions_solved'], rows[0]['level_score']) if rows else None
+
+
+def test_sqlite_increment_inserts_then_adds(sqlite_db):
+    query = sqlite_db.increment_upsert_sql('participant_level_stats', KEY, COUNTERS)
+    sqlite_db.execute_update(query, (1, 1, 1, 1, 10.0))
+    sqlite_db.execute_update(query, (1, 1, 1, 1, 15.0))
+    sqlite_db.execute_update(query, (1, 1, 2, 1, 5.0))
+    assert level_row(sqlite_db) == (2, 25.0)
+    assert level_row(sqlite_db, level=2) == (1, 5.0)
+
+
+def test_sqlite_increment_keeps_other_columns(sqlite_db):
+    sqlite_db.execute_update(
+        "INSERT INTO participant_level_stats (user_id, contest_id, level, status, run_count) VALUES (%s, %s, %s, 'IN_PROGRESS', 4)",
+        (1, 1, 1)
+    )
+    query = sqlite_db.increment_upsert_sql('participant_level_stats', KEY, COUNTERS)
+    sqlite_db.execute_transaction([(query, (1, 1, 1, 1, 10.0))])
+    rows = sqlite_db.execute_query("SELECT status, run_count, questions_solved, level_score FROM participant_level_stats")
+    assert rows == [{'status': 'IN_PROGRESS', 'run_count': 4, 'questions_solved': 1, 'level_score': 10.0}]
+
+
+def test_sqlite_multi_row_increment(sqlite_db):
+    query = sqlite_db.increment_upsert_sql('participant_level_stats', KEY, ('run_count',), rows=2)
+    sqlite_db.execute_update(query, (1, 1, 1, 3, 2, 1, 1, 1))
+    sqlite_db.execute_update(query, (1, 1, 1, 2, 2, 1, 1, 5))
+    rows = sqlite_db.execute_query("SELECT user_id, run_count FROM participant_level_stats ORDER BY user_id")
+    assert rows == [{'user_id': 1, 'run_count': 5}, {'user_id': 2, 'run_count': 6}]
+
+
+def test_postgres_increment_sql():
+    db_connection = pytest.importorskip('db_connection')
+    query = db_connection.PostgreSQLManager.increment_upsert_sql('participant_level_stats', KEY, COUNTERS)
+    assert query == (
+        "INSERT INTO participant_level_stats (user_id, contest_id, level, questions_solved, level_score) "
+        "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (user_id, contest_id, level) DO UPDATE SET "
+        "questions_solved = COALESCE(participant_level_stats.questions_solved, 0) + EXCLUDED.questions_solved, "
+        "level_score = COALESCE(participant_level_stats.level_score, 0) + EXCLUDED.level_score"
+    )
+
+
+def test_mysql_increment_sql():
+    db_connection = pytest.importorskip('db_connection')
+    query = db_connection.MySQLManager.increment_upsert_sql('participant_level_stats', KEY, ('run_count',), rows=2)
+    assert query == (
+        "INSERT INTO participant_level_stats (user_id, contest_id, level, run_count) "
+        "VALUES (%s, %s, %s, %s), (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE run_count = COALESCE(run_count, 0) + VALUES(run_count)"
+    )
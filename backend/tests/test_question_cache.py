@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+
+@pytest.fixture
+def questions(sqlite_db, tmp_path, monkeypatch):
+    from utils import question_cache
+    if question_cache.db_manager is not sqlite_db:
+        pytest.skip('tests run against the SQLite manager')
+    monkeypatch.setattr(question_cache.question_epoch, 'path', str(tmp_path / 'question_epoch'))
+    question_cache.question_cache.clear()
+    sqlite_db.execute_update(
+        "INSERT INTO rounds (round_id, contest_id, round_name, round_number, time_limit_minutes, total_questions) "
+        "VALUES (1, 1, 'Level 1', 1, 30, 1)"
+    )
+    sqlite_db.execute_update(
+        "INSERT INTO questions (question_id, round_id, question_number, question_title, question_description, "
+        "buggy_code, test_cases, difficulty_level) VALUES (7, 1, 1, 'Q', 'Q', '', %s, 'easy')",
+        (json.dumps([{'input': '1', 'expected': '2'}]),)
+    )
+    return question_cache
+
+
+def edit_expected(db, expected):
+    db.execute_update("UPDATE questions SET test_cases=%s WHERE question_id=7",
+                      (json.dumps([{'input': '1', 'expected': expected}]),))
+
+
+def test_edit_on_another_worker_is_seen(questions, sqlite_db):
+    before = questions.get_question(7)
+    edit_expected(sqlite_db, '3')
+    assert questions.get_question(7) is before # Cached
+    questions.question_epoch.bump() # What invalidate_question() does in the worker that served the edit
+    after = questions.get_question(7)
+    assert after['test_cases'] == [{'input': '1', 'expected': '3'}]
+    assert after['tc_digest'] != before['tc_digest']
+
+
+def test_invalidate_question_bumps_the_epoch(questions, sqlite_db, tmp_path):
+    questions.get_question(7)
+    edit_expected(sqlite_db, '4')
+    questions.invalidate_question(7)
+    assert (tmp_path / 'question_epoch').exists()
+    assert questions.get_question(7)['test_cases'][0]['expected'] == '4'
+
+
+def test_edit_on_another_worker_drops_memoized_verdicts(questions):
+    from utils import submission_service
+    question = questions.get_question(7)
+    key = submission_service.verdict_cache_key(7, question['test_cases'], 'python', 'print(2)', question['tc_digest'])
+    submission_service.remember_results(key, [{'success': True, 'output': '2'}])
+    assert submission_service.get_cached_results(key)
+    questions.question_epoch.bump()
+    assert submission_service.get_cached_results(key) is None
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip('dotenv')
+
+
+@pytest.fixture
+def buffer(sqlite_db):
+    from utils import run_counter
+    if run_counter.db_manager is not sqlite_db:
+        pytest.skip('tests run against the SQLite manager')
+    sqlite_db.execute_update("""
+        CREATE TRIGGER reject_user_666 BEFORE INSERT ON participant_level_stats WHEN NEW.user_id = 666
+        BEGIN SELECT RAISE(ABORT, 'rejected'); END
+    """)
+    return run_counter.RunCountBuffer(interval=60, batch=500)
+
+
+def run_counts(db):
+    return {r['user_id']: r['run_count'] for r in db.execute_query("SELECT user_id, run_count FROM participant_level_stats")}
+
+
+def test_flush_sums_presses(buffer, sqlite_db):
+    for _ in range(3):
+        buffer.record(1, 1, 1)
+    buffer.record('2', '1', '1')
+    buffer.flush()
+    buffer.record(1, 1, 1)
+    buffer.flush()
+    assert run_counts(sqlite_db) == {1: 4, 2: 1}
+
+
+def test_invalid_ids_are_not_buffered(buffer):
+    buffer.record('alice', 1, 1)
+    buffer.record(1, 'latest', 1)
+    buffer.record(1, 1, None)
+    assert buffer.stats()['pending_rows'] == 0
+    assert buffer.stats()['rejected'] == 3
+
+
+def test_bad_row_does_not_block_the_batch(buffer, sqlite_db):
+    buffer.record(1, 1, 1)
+    buffer.record(666, 1, 1)
+    buffer.record(2, 1, 1)
+    buffer.flush()
+    assert run_counts(sqlite_db) == {1: 1, 2: 1}
+    assert buffer.stats()['pending_rows'] == 1 # The bad row waits for a retry
+
+    for _ in range(3):
+        buffer.flush()
+    stats = buffer.stats()
+    assert stats['pending_rows'] == 0 and stats['retrying_rows'] == 0
+    assert stats['dropped_runs'] == 1
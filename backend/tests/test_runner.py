@@ -0,0 +1,20 @@
+import time
+
+from utils.runner import run_limited
+
+# Closes its output at once, then keeps running: collect() has to wait for the exit itself
+QUIET_SLEEPER = ['sh', '-c', 'echo done; exec >&- 2>&-; sleep {}']
+
+
+def test_waits_for_exit_after_output_closes():
+    result = run_limited([c.format(0.3) for c in QUIET_SLEEPER], 'native', '', 5)
+    assert result['success'] and result['output'] == 'done\n'
+
+
+def test_wait_does_not_spin():
+    cpu = time.process_time()
+    started = time.monotonic()
+    result = run_limited([c.format(5) for c in QUIET_SLEEPER], 'native', '', 1)
+    assert result['error'] == 'Time Limit Exceeded'
+    assert time.monotonic() - started < 3
+    assert time.process_time() - cpu < 0.02 # Polling at 2 kHz costs ~50ms of CPU per second waited
@@ -0,0 +1,62 @@
+import pytest
+import sqlite3
+
+INSERT_SUBMISSION = "INSERT INTO submissions (user_id, contest_id, round_id, question_id, is_correct, score_awarded) VALUES (%s, %s, %s, %s, %s, %s)"
+
+
+def count(db, table):
+    return db.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n']
+
+
+def increment(db):
+    query = db.increment_upsert_sql('participant_level_stats', ('user_id', 'contest_id', 'level'), ('questions_solved', 'level_score'))
+    return db.execute_update(query, (1, 1, 1, 1, 10.0))
+
+
+def test_unit_commits_submission_and_counters(sqlite_db):
+    with sqlite_db.unit_of_work():
+        sqlite_db.execute_update(INSERT_SUBMISSION, (1, 1, 1, 1, True, 10.0))
+        with sqlite_db.savepoint() as sp:
+            increment(sqlite_db)
+    assert sp['ok']
+    assert count(sqlite_db, 'submissions') == 1
+    assert count(sqlite_db, 'participant_level_stats') == 1
+
+
+def test_failed_increment_keeps_submission(sqlite_db):
+    sqlite_db.execute_update("DROP TABLE participant_level_stats")
+    with sqlite_db.unit_of_work():
+        sqlite_db.execute_update(INSERT_SUBMISSION, (1, 1, 1, 1, True, 10.0))
+        with sqlite_db.savepoint() as sp:
+            increment(sqlite_db)
+        sqlite_db.execute_update(INSERT_SUBMISSION, (2, 1, 1, 1, False, 0))
+    assert not sp['ok']
+    assert count(sqlite_db, 'submissions') == 2
+
+
+def test_failure_outside_savepoint_rolls_back_unit(sqlite_db):
+    with pytest.raises(sqlite3.Error):
+        with sqlite_db.unit_of_work():
+            sqlite_db.execute_update(INSERT_SUBMISSION, (1, 1, 1, 1, True, 10.0))
+            sqlite_db.execute_update("INSERT INTO no_such_table VALUES (1)")
+    assert count(sqlite_db, 'submissions') == 0
+
+
+def test_apply_score_increment_keeps_submission(sqlite_db):
+    pytest.importorskip('dotenv')
+    from utils import submission_service
+    if submission_service.db_manager is not sqlite_db:
+        pytest.skip('tests run against the SQLite manager')
+
+    sqlite_db.execute_update("DROP TABLE participant_level_stats")
+    with sqlite_db.unit_of_work():
+        saved = sqlite_db.execute_update(INSERT_SUBMISSION, (1, 1, 1, 1, True, 10.0))
+        assert saved and not submission_service.apply_score_increment(1, 1, 1, 10.0)
+    assert count(sqlite_db, 'submissions') == 1
+
+
+def test_execute_insert_returns_new_id(sqlite_db):
+    first = sqlite_db.execute_insert(INSERT_SUBMISSION, (1, 1, 1, 1, False, 0), 'submission_id')
+    second = sqlite_db.execute_insert(INSERT_SUBMISSION, (1, 1, 1, 2, False, 0), 'submission_id')
+    assert first and second == first + 1
+    assert sqlite_db.execute_insert("INSERT INTO no_such_table VALUES (%s)", (1,), 'id') is None
@@ -0,0 +1,33 @@
+import os
+import time
+import pytest
+
+from utils.zygote import PythonZygote
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='the zygote needs fork()')
+
+
+@pytest.fixture
+def zygote():
+    z = PythonZygote()
+    yield z
+    z.close()
+
+
+def test_run_returns_output(zygote):
+    result = zygote.run("print(input() * 2)", "ab\n", 2)
+    assert result['success'] and result['output'] == 'abab\n'
+
+
+def test_closed_output_does_not_escape_the_deadline(zygote):
+    start = time.monotonic()
+    result = zygote.run("import os, time\nos.close(1); os.close(2)\ntime.sleep(20)", "", 1)
+    assert result['error'] == "Time Limit Exceeded"
+    assert time.monotonic() - start < 5
+    assert zygote.run("print(1)", "", 2)['output'] == '1\n' # Still usable afterwards
+
+
+def test_run_happens_in_the_given_directory(zygote, tmp_path):
+    result = zygote.run("import os\nopen('out.txt', 'w').write('x')\nprint(os.getcwd())", "", 2, cwd=str(tmp_path))
+    assert result['output'].strip() == str(tmp_path)
+    assert (tmp_path / 'out.txt').read_text() == 'x'
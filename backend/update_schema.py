@@ -24,5 +24,52 @@ def update_schema():
     else:
         print(" -> 'phone' column might already exist or error occurred.")
 
+    # 3. Async submission lifecycle statuses (queued -> running -> evaluated / failed)
+    print("Widening submissions.status...")
+    res = db_manager.execute_update(
+        "ALTER TABLE submissions MODIFY status ENUM('pending', 'queued', 'running', 'evaluated', 'failed') NOT NULL DEFAULT 'pending'"
+    )
+    if not res:
+        # PostgreSQL: replace the CHECK constraint instead
+        db_manager.execute_update("ALTER TABLE submissions DROP CONSTRAINT IF EXISTS submissions_status_check")
+        db_manager.execute_update(
+            "ALTER TABLE submissions ADD CONSTRAINT submissions_status_check CHECK (status IN ('pending', 'queued', 'running', 'evaluated', 'failed'))"
+        )
+
+    # 4. Shared judge queue (JUDGE_QUEUE_BACKEND=db)
+    print("Creating judge_jobs table...")
+    res = db_manager.execute_update("""
+        CREATE TABLE IF NOT EXISTS judge_jobs (
+          job_id INT(11) NOT NULL AUTO_INCREMENT PRIMARY KEY,
+          submission_id INT(11) DEFAULT NULL,
+          priority INT(11) NOT NULL DEFAULT 0,
+          payload LONGTEXT NOT NULL,
+          status ENUM('queued', 'claimed', 'failed') NOT NULL DEFAULT 'queued',
+          worker_id VARCHAR(255) DEFAULT NULL,
+          attempts INT(11) NOT NULL DEFAULT 0,
+          error TEXT DEFAULT NULL,
+          enqueued_at DOUBLE NOT NULL,
+          claimed_at DOUBLE DEFAULT NULL,
+          KEY idx_judge_jobs_claim (status, priority, job_id)
+        )
+    """)
+    if not res:
+        # PostgreSQL dialect
+        db_manager.execute_update("""
+            CREATE TABLE IF NOT EXISTS judge_jobs (
+              job_id SERIAL PRIMARY KEY,
+              submission_id INTEGER DEFAULT NULL,
+              priority INTEGER NOT NULL DEFAULT 0,
+              payload TEXT NOT NULL,
+              status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'claimed', 'failed')),
+              worker_id VARCHAR(255) DEFAULT NULL,
+              attempts INTEGER NOT NULL DEFAULT 0,
+              error TEXT DEFAULT NULL,
+              enqueued_at DOUBLE PRECISION NOT NULL,
+              claimed_at DOUBLE PRECISION DEFAULT NULL
+            )
+        """)
+        db_manager.execute_update("CREATE INDEX IF NOT EXISTS idx_judge_jobs_claim ON judge_jobs(status, priority, job_id)")
+
 if __name__ == "__main__":
     update_schema()
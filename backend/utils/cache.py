@@ -0,0 +1,117 @@
+import os
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU map with an optional TTL (seconds).
+    Each gunicorn worker holds its own instance; hit/miss counters are per worker.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def invalidate(self, predicate):
+        """Drops every entry whose key matches predicate(key). Returns the number removed."""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+class SharedEpoch:
+    """
+    Cross-worker invalidation for per-worker caches: `bump()` replaces a small file, and every
+    worker on the host that calls `sync()` before a lookup sees the new file and clears the
+    caches it `watch`es (one stat() per sync). Workers on other hosts do not share the file:
+    keep the TTLs of watched caches short enough to bound what they may serve.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._caches = []
+        self._seen = None
+
+    def watch(self, *caches):
+        self._caches.extend(caches)
+
+    def _current(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def sync(self):
+        """Clears the watched caches if any worker bumped the epoch since this worker's last sync."""
+        epoch = self._current()
+        if epoch != self._seen:
+            for cache in self._caches:
+                cache.clear()
+            self._seen = epoch
+
+    def bump(self):
+        try:
+            fd, tmp = tempfile.mkstemp(prefix='.epoch-', dir=os.path.dirname(self.path))
+            os.close(fd)
+            os.replace(tmp, self.path) # New inode: never mistaken for the previous epoch
+        except OSError:
+            pass # Other workers fall back to the TTLs of their caches
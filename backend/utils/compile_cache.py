@@ -0,0 +1,227 @@
+import os
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: no cross-process lock, cache still works per worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+COMPILE_CACHE_ENABLED = os.getenv('COMPILE_CACHE', 'True') == 'True'
+COMPILE_CACHE_DIR = os.getenv('COMPILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'marathon_compile_cache'))
+COMPILE_CACHE_MAX_MB = int(os.getenv('COMPILE_CACHE_MAX_MB', 256))
+
+# Entries used this recently are never evicted (a binary may still be running from them)
+EVICTION_GRACE_SEC = 60
+
+
+class CompileCache:
+    """
+    On-disk, content-addressed cache of compiled artifacts.
+
+    Layout: <root>/<key[:2]>/<key>/ holds the artifacts (main.exe, *.class) plus
+    optional 'warnings.txt' / 'error.txt'. Entries are published with an atomic
+    rename, so concurrent gunicorn workers either see a complete entry or none.
+    The entry directory mtime is the LRU clock; eviction runs under an flock.
+    Cached binaries run in place, so the tree is private to the server's user (0700)
+    and `get` refuses any entry another user owns or could have written to.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'store_failures': 0, 'evictions': 0, 'untrusted': 0}
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        try:
+            st = os.lstat(self.root)
+            if stat.S_ISDIR(st.st_mode) and (not hasattr(os, 'geteuid') or st.st_uid == os.geteuid()):
+                os.chmod(self.root, 0o700) # Created by an older version, or under a permissive umask
+            else:
+                logger.error(f"Compile cache root {self.root} is not a directory of this user: every lookup will miss")
+        except OSError:
+            pass
+
+    @staticmethod
+    def make_key(language, flags, code):
+        h = hashlib.sha256()
+        h.update(language.encode())
+        h.update(b'\0')
+        h.update(' '.join(flags).encode())
+        h.update(b'\0')
+        h.update(code.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key):
+        """
+        Returns a dict {'path', 'warnings', 'error'} for a cached compile, or None.
+        A hit refreshes the entry's LRU timestamp.
+        """
+        path = self._entry_path(key)
+        if not os.path.isdir(path):
+            self._count('misses')
+            return None
+        if not self._trusted(path):
+            logger.warning(f"Compile cache entry {path} is writable by another user: ignored")
+            self._count('untrusted')
+            self._count('misses')
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # Evicted between isdir() and utime()
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return {
+            'path': path,
+            'warnings': self._read_text(os.path.join(path, 'warnings.txt')),
+            'error': self._read_text(os.path.join(path, 'error.txt')),
+        }
+
+    def put(self, key, artifacts, warnings=None, error=None):
+        """
+        Publishes a compile result. `artifacts` is a list of file paths to copy in.
+        Returns the entry path (which may belong to a concurrent writer that won the race),
+        or None when the entry could not be stored - callers then keep using their own build.
+        """
+        final_path = self._entry_path(key)
+        staging = None
+        try:
+            os.makedirs(os.path.dirname(final_path), mode=0o700, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root) # Created 0700
+            for src in artifacts:
+                dst = os.path.join(staging, os.path.basename(src))
+                shutil.copy2(src, dst)
+                os.chmod(dst, stat.S_IMODE(os.stat(dst).st_mode) & ~0o022)
+            if warnings:
+                self._write_text(os.path.join(staging, 'warnings.txt'), warnings)
+            if error:
+                self._write_text(os.path.join(staging, 'error.txt'), error)
+        except OSError as e:
+            # e.g. disk full or an artifact missing: never publish a partial entry
+            logger.warning(f"Compile cache store failed: {e}")
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+            self._count('store_failures')
+            return None
+        try:
+            os.rename(staging, final_path)
+            self._count('stores')
+        except OSError:
+            # Another worker published the same key first - theirs is identical
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(final_path):
+                self._count('store_failures')
+                return None
+        self._evict_if_needed()
+        return final_path
+
+    def _trusted(self, path):
+        """True if the root, the shard, the entry and every file in it belong to us and nobody else can write them."""
+        try:
+            dirs = [self.root, os.path.dirname(path), path]
+            files = [os.path.join(path, name) for name in os.listdir(path)]
+            return all(_owned(os.lstat(p), directory=p in dirs) for p in dirs + files)
+        except OSError:
+            return False
+
+    def _evict_if_needed(self):
+        with self._file_lock():
+            entries = []
+            total = 0
+            for shard in os.scandir(self.root):
+                if not shard.is_dir() or shard.name.startswith('.'):
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                        entries.append((entry.stat().st_mtime, size, entry.path))
+                        total += size
+                    except OSError:
+                        continue
+
+            if total <= self.max_bytes:
+                return
+
+            now = time.time()
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if now - mtime < EVICTION_GRACE_SEC:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                self._count('evictions')
+
+    def _file_lock(self):
+        return _FileLock(os.path.join(self.root, '.lock'))
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 3) if lookups else 0.0
+        data['max_bytes'] = self.max_bytes
+        data['root'] = self.root
+        return data
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_text(path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+
+def _owned(st, directory=False):
+    """A real file (or directory) of this process's user, not writable by group or others."""
+    if not hasattr(os, 'geteuid'):
+        return True # Windows dev boxes: no ownership model to check
+    kind_ok = stat.S_ISDIR(st.st_mode) if directory else stat.S_ISREG(st.st_mode)
+    return kind_ok and st.st_uid == os.geteuid() and not st.st_mode & 0o022
+
+
+class _FileLock:
+    """Exclusive flock held for the duration of a `with` block (no-op without fcntl)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl:
+            self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+compile_cache = CompileCache(COMPILE_CACHE_DIR, COMPILE_CACHE_MAX_MB * 1024 * 1024) if COMPILE_CACHE_ENABLED else None
@@ -3,9 +3,36 @@ import logging
 import json
 from datetime import datetime, timedelta
 from db_connection import db_manager
+from utils.question_cache import invalidate_question, invalidate_all_questions
 
 logger = logging.getLogger(__name__)
 
+QUESTION_INSERT = """
+    INSERT INTO questions 
+    (round_id, question_number, question_title, question_description, expected_output, buggy_code, difficulty_level, points, test_cases, test_input)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def question_values(round_id, question_number, allowed_lang, data):
+    """QUESTION_INSERT parameters for one question payload."""
+    boilerplate_raw = data.get('boilerplate', {})
+    if isinstance(boilerplate_raw, dict):
+        boilerplate = boilerplate_raw.get(allowed_lang, '') or boilerplate_raw.get('python', '')
+    else:
+        boilerplate = str(boilerplate_raw)
+
+    return (
+        round_id, question_number,
+        data.get('title'),
+        data.get('description', ''),
+        data.get('expected_output'),
+        boilerplate,
+        data.get('difficulty', 'Level 1'),
+        data.get('points', 20),
+        json.dumps(data.get('test_cases', [])),
+        data.get('test_input') or data.get('input') or data.get('expected_input')
+    )
+
 def create_question_logic(contest_id, round_number, data):
     """
     Core logic to create a question.
@@ -25,16 +52,6 @@ def create_question_logic(contest_id, round_number, data):
         if dup_check:
             raise ValueError(f"Question '{title}' already exists in Level {round_number}.")
         
-        q_query = """
-            INSERT INTO questions 
-            (round_id, question_number, question_title, question_description, expected_output, buggy_code, difficulty_level, points, test_cases, test_input)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        points = data.get('points', 20)
-        test_cases = json.dumps(data.get('test_cases', []))
-        difficulty = data.get('difficulty', 'Level 1')
-        
         allowed_lang = r_res[0].get('allowed_language') or data.get('language', 'python')
         time_limit = data.get('time_limit')
         
@@ -48,27 +65,14 @@ def create_question_logic(contest_id, round_number, data):
         count_res = db_manager.execute_query(count_query, (round_id,))
         next_num = (count_res[0]['max_num'] or 0) + 1
         
-        boilerplate_raw = data.get('boilerplate', {})
-        if isinstance(boilerplate_raw, dict):
-            boilerplate = boilerplate_raw.get(allowed_lang, '') or boilerplate_raw.get('python', '')
-        else:
-            boilerplate = str(boilerplate_raw)
-        
-        res = db_manager.execute_update(q_query, (
-            round_id, next_num, 
-            title, 
-            data.get('description', ''), 
-            data.get('expected_output'),
-            boilerplate, 
-            difficulty, 
-            points, 
-            test_cases,
-            data.get('test_input') or data.get('input') or data.get('expected_input')
-        ))
+        res = db_manager.execute_update(QUESTION_INSERT, question_values(round_id, next_num, allowed_lang, data))
         
         if not res:
             logger.error(f"DB Insert Failed for Question: {title}")
             raise Exception("Failed to insert question into database.")
+
+        # SQLite may hand out the id of a deleted question again: drop any cached copy
+        invalidate_question(res.get('last_id'))
             
         return {'success': True, 'question_number': next_num, 'id': res.get('last_id')}
 
@@ -76,6 +80,67 @@ def create_question_logic(contest_id, round_number, data):
         logger.error(f"Create Question Logic Error: {e}")
         raise e
 
+def create_questions_bulk_logic(contest_id, items):
+    """
+    Bulk variant of create_question_logic for [(round_number, data), ...]: the same checks,
+    but rounds, titles and numbering are read once and all rows are inserted in one transaction.
+    Returns (created_count, errors).
+    """
+    errors = []
+    rounds = db_manager.execute_query(
+        "SELECT round_id, round_number, allowed_language FROM rounds WHERE contest_id=%s", (contest_id,)
+    ) or []
+    rounds = {r['round_number']: r for r in rounds}
+    round_ids = [r['round_id'] for r in rounds.values()]
+
+    titles, next_num = set(), {}
+    if round_ids:
+        in_rounds = ', '.join(['%s'] * len(round_ids))
+        for q in db_manager.execute_query(f"SELECT round_id, question_title FROM questions WHERE round_id IN ({in_rounds})", tuple(round_ids)) or []:
+            titles.add((q['round_id'], q['question_title']))
+        for q in db_manager.execute_query(f"SELECT round_id, MAX(question_number) as max_num FROM questions WHERE round_id IN ({in_rounds}) GROUP BY round_id", tuple(round_ids)) or []:
+            next_num[q['round_id']] = q['max_num'] or 0
+
+    rows, time_limits = [], {}
+    for round_number, data in items:
+        title = data.get('title')
+        r = rounds.get(round_number)
+        if not r:
+            errors.append(f"Title {title}: Round {round_number} for Contest {contest_id} not found.")
+            continue
+        round_id = r['round_id']
+        if (round_id, title) in titles:
+            errors.append(f"Title {title}: Question '{title}' already exists in Level {round_number}.")
+            continue
+        try:
+            time_limit = int(data.get('time_limit') or 0)
+        except (TypeError, ValueError) as e:
+            errors.append(f"Title {title}: {e}")
+            continue
+        if time_limit > 0:
+            time_limits[round_id] = time_limit
+        titles.add((round_id, title))
+
+        next_num[round_id] = next_num.get(round_id, 0) + 1
+        allowed_lang = r.get('allowed_language') or data.get('language', 'python')
+        rows.append(question_values(round_id, next_num[round_id], allowed_lang, data))
+
+    if not rows:
+        return 0, errors
+
+    with db_manager.unit_of_work():
+        if time_limits:
+            db_manager.bulk_update('rounds', 'round_id', 'time_limit_minutes', time_limits)
+        inserted = db_manager.execute_many(QUESTION_INSERT, rows)
+
+    if inserted is False:
+        logger.error(f"DB Bulk Insert Failed for {len(rows)} questions")
+        return 0, errors + ["Failed to insert questions into database."]
+
+    # SQLite may hand out ids of deleted questions again: drop any cached copies
+    invalidate_all_questions()
+    return len(rows), errors
+
 def activate_level_logic(contest_id, level, wait_time=0):
     start_time = datetime.utcnow()
     if wait_time > 0:
@@ -0,0 +1,92 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from utils.cache import LRUCache
+
+# === CONFIGURATION ===
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 60)) # Seconds a finished submit is replayed to retries
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 4096))
+IDEMPOTENCY_WAIT_TIMEOUT = int(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 120)) # Max wait for a duplicate's leader
+
+
+def submission_key(uid, question_id, code, variant='', client_key=None, version=''):
+    """
+    Idempotency key of a submit: the client's Idempotency-Key header when sent, else the hash
+    of user + question + code. Scoped to the user either way. `variant` separates requests
+    that must not share a response (e.g. sync vs async) even with identical code. `version`
+    (the question's test-case digest) keeps a retry after a question edit from replaying
+    the verdict judged against the old test cases.
+    """
+    if client_key:
+        material = f"key\0{uid}\0{version}\0{client_key}"
+    else:
+        material = f"code\0{uid}\0{question_id}\0{version}\0{variant}\0{code}"
+    return hashlib.sha256(material.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class CallInProgress(Exception):
+    """A duplicate waited `wait_timeout` seconds and the original call is still running."""
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller runs the work,
+    identical calls arriving meanwhile wait for and share its result. Results accepted by
+    `remember` are also replayed for `ttl` seconds afterwards (client retries).
+    In-process: each gunicorn worker deduplicates the requests it serves.
+    """
+
+    def __init__(self, maxsize, ttl, wait_timeout):
+        self.wait_timeout = wait_timeout
+        self._done = LRUCache(maxsize, ttl)
+        self._calls = {} # key -> Future of the running call
+        self._lock = threading.Lock()
+        self._metrics = {'executed': 0, 'collapsed': 0, 'replayed': 0, 'wait_timeouts': 0}
+
+    def do(self, key, fn, remember=lambda result: True):
+        """
+        Returns (result, shared): shared=True when the result came from another call.
+        Raises CallInProgress if a duplicate's wait for the running call times out.
+        """
+        with self._lock:
+            result = self._done.get(key)
+            if result is not None:
+                self._metrics['replayed'] += 1
+                return result, True
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self._metrics['executed'] += 1
+            else:
+                self._metrics['collapsed'] += 1
+
+        if not leader:
+            try:
+                return call.result(timeout=self.wait_timeout), True
+            except FutureTimeout:
+                with self._lock:
+                    self._metrics['wait_timeouts'] += 1
+                raise CallInProgress(key)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.set_exception(e)
+            raise
+        with self._lock:
+            if remember(result):
+                self._done.set(key, result)
+            self._calls.pop(key, None)
+        call.set_result(result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'remembered': len(self._done), 'ttl': self._done.ttl, **self._metrics}
+
+
+submit_flight = SingleFlight(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL, IDEMPOTENCY_WAIT_TIMEOUT)
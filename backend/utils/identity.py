@@ -0,0 +1,93 @@
+import os
+import tempfile
+from db_connection import db_manager
+from utils.cache import LRUCache, SharedEpoch
+
+# === CONFIGURATION ===
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+# Upper bound on serving a deleted/recreated account from another machine's cache
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))
+# Replaced on every forget_user / forget_all_users: the other workers on this host see the new
+# file on their next lookup and drop their caches (one stat() per lookup)
+IDENTITY_EPOCH_FILE = os.getenv('IDENTITY_EPOCH_FILE', os.path.join(tempfile.gettempdir(), 'marathon_identity_epoch'))
+# Unknown usernames are remembered briefly: a client retrying with a bad id does not hit the DB
+# every time, and an account created on another worker becomes visible within this window
+IDENTITY_NEGATIVE_TTL = int(os.getenv('IDENTITY_NEGATIVE_TTL', 10))
+IDENTITY_BATCH_SIZE = 500 # Usernames per IN (...) lookup in resolve_user_ids
+
+identity_cache = LRUCache(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL)
+unknown_identities = LRUCache(IDENTITY_CACHE_SIZE, IDENTITY_NEGATIVE_TTL)
+identity_epoch = SharedEpoch(IDENTITY_EPOCH_FILE)
+identity_epoch.watch(identity_cache, unknown_identities)
+
+
+def resolve_user(username):
+    """{'user_id', 'username'} of the account with this username, or None if there is none."""
+    identity_epoch.sync()
+    key = str(username)
+    user = identity_cache.get(key)
+    if user is not None:
+        return user
+    if unknown_identities.get(key) is not None:
+        return None
+
+    res = db_manager.execute_query("SELECT user_id, username FROM users WHERE username=%s", (username,))
+    if not res:
+        unknown_identities.set(key, True)
+        return None
+    user = {'user_id': res[0]['user_id'], 'username': res[0]['username']}
+    identity_cache.set(key, user)
+    return user
+
+
+def resolve_user_id(user_id):
+    """
+    Participant endpoints accept either the numeric user_id or the username ("PART001").
+    Numeric ids are returned unchanged; usernames are resolved. None = unknown username.
+    """
+    if isinstance(user_id, str) and not user_id.isdigit():
+        user = resolve_user(user_id)
+        return user['user_id'] if user else None
+    return user_id
+
+
+def resolve_user_ids(user_ids):
+    """resolve_user_id for a whole list: uncached usernames are looked up with batched IN queries."""
+    identity_epoch.sync()
+    names = {u for u in user_ids if isinstance(u, str) and not u.isdigit()}
+    missing = [n for n in names if identity_cache.get(n) is None and unknown_identities.get(n) is None]
+    for i in range(0, len(missing), IDENTITY_BATCH_SIZE):
+        batch = missing[i:i + IDENTITY_BATCH_SIZE]
+        res = db_manager.execute_query(
+            f"SELECT user_id, username FROM users WHERE username IN ({', '.join(['%s'] * len(batch))})", tuple(batch)
+        )
+        if res is None:
+            continue # Query failed: leave these to the one-by-one lookup below
+        exact = {r['username']: r for r in res}
+        folded = {r['username'].lower(): r for r in res} # MySQL matched case-insensitively
+        for name in batch:
+            row = exact.get(name) or folded.get(name.lower())
+            if row:
+                identity_cache.set(name, {'user_id': row['user_id'], 'username': row['username']})
+            else:
+                unknown_identities.set(name, True)
+    return [resolve_user_id(u) for u in user_ids]
+
+
+def forget_user(username):
+    """Called when an account is created, renamed or deleted. Other workers drop their whole cache."""
+    # MySQL compares usernames case-insensitively: 'part001' may be cached for 'PART001'
+    folded = str(username).lower()
+    identity_cache.invalidate(lambda key: key.lower() == folded)
+    unknown_identities.invalidate(lambda key: key.lower() == folded)
+    identity_epoch.bump()
+
+
+def forget_all_users():
+    identity_cache.clear()
+    unknown_identities.clear()
+    identity_epoch.bump()
+
+
+def stats():
+    return {'known': identity_cache.stats(), 'unknown': unknown_identities.stats()}
@@ -0,0 +1,272 @@
+import javax.tools.*;
+import java.io.*;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.lang.management.ThreadMXBean;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.security.MessageDigest;
+import java.util.*;
+
+/**
+ * Long-lived Java compile-and-run helper for the judge (see utils/java_service.py).
+ *
+ * Listens on 127.0.0.1 (port printed as "PORT <n>" on stdout) and serves one request at a time.
+ * The first line on stdin is a per-start token; connections that do not open with it are dropped:
+ *   request : byte[64] token, int timeoutMs, int maxOutputBytes, bytes source, int n, n x bytes input
+ *   response: int 1 + bytes compileErrors                      (compile failure), or
+ *             int 0 + per case: int kind, int exitCode, bytes stdout, bytes stderr, long cpuNanos, long heapPeak
+ * kind: 0 = finished, 1 = uncaught exception, 2 = time limit (helper halts afterwards),
+ *       3 = program called System.exit (helper exits with that status afterwards),
+ *       4 = stdout or stderr exceeded maxOutputBytes (helper halts afterwards).
+ * Strings ("bytes") are int length + UTF-8. Every run loads Main in a fresh classloader,
+ * so static state never leaks between test cases. heapPeak is the peak heap use (bytes) while
+ * the case ran: the shared JVM has no per-run RSS, and the heap is what -Xmx caps.
+ */
+public class JudgeServer {
+    static final int KIND_OK = 0, KIND_EXCEPTION = 1, KIND_TIMEOUT = 2, KIND_EXIT = 3, KIND_OUTPUT_LIMIT = 4;
+
+    static final Object responseLock = new Object();
+    static volatile DataOutputStream currentOut;
+    static volatile CappedOutputStream runStdout, runStderr;
+    static volatile boolean caseOpen = false;
+    static final ThreadMXBean threads = ManagementFactory.getThreadMXBean();
+    static final List<MemoryPoolMXBean> heapPools = new ArrayList<>();
+    static {
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) heapPools.add(pool);
+        }
+    }
+
+    static void resetHeapPeak() {
+        for (MemoryPoolMXBean pool : heapPools) pool.resetPeakUsage();
+    }
+
+    static long heapPeak() {
+        long bytes = 0;
+        for (MemoryPoolMXBean pool : heapPools) bytes += pool.getPeakUsage().getUsed();
+        return bytes;
+    }
+
+    /** Output buffer that ends the run (and the helper) as soon as it grows past the cap. */
+    static class CappedOutputStream extends ByteArrayOutputStream {
+        final int cap;
+        CappedOutputStream(int cap) { this.cap = cap; }
+        @Override public synchronized void write(int b) {
+            if (count + 1 > cap) overflow();
+            super.write(b);
+        }
+        @Override public synchronized void write(byte[] b, int off, int len) {
+            if (count + len > cap) overflow();
+            super.write(b, off, len);
+        }
+        void overflow() {
+            try {
+                writeCase(KIND_OUTPUT_LIMIT, 0, 0);
+            } catch (IOException ignored) { }
+            Runtime.getRuntime().halt(0); // Like a timeout: the runaway program cannot be stopped safely
+        }
+    }
+
+    // --- In-memory compilation ---
+
+    static class SourceFile extends SimpleJavaFileObject {
+        final String code;
+        SourceFile(String code) {
+            super(URI.create("string:///Main.java"), Kind.SOURCE);
+            this.code = code;
+        }
+        @Override public CharSequence getCharContent(boolean ignoreEncodingErrors) { return code; }
+    }
+
+    static class ClassFile extends SimpleJavaFileObject {
+        final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+        ClassFile(String name) {
+            super(URI.create("mem:///" + name.replace('.', '/') + Kind.CLASS.extension), Kind.CLASS);
+        }
+        @Override public OutputStream openOutputStream() { return bytes; }
+    }
+
+    static class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ClassFile> classes = new HashMap<>();
+        MemoryFileManager(StandardJavaFileManager fm) { super(fm); }
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className, JavaFileObject.Kind kind, FileObject sibling) {
+            ClassFile f = new ClassFile(className);
+            classes.put(className, f);
+            return f;
+        }
+    }
+
+    static class MemoryClassLoader extends ClassLoader {
+        final Map<String, byte[]> classes;
+        MemoryClassLoader(Map<String, byte[]> classes) {
+            // Platform loader as parent: user code cannot see the helper's own classes
+            super(ClassLoader.getPlatformClassLoader());
+            this.classes = classes;
+        }
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            byte[] b = classes.get(name);
+            if (b == null) throw new ClassNotFoundException(name);
+            return defineClass(name, b, 0, b.length);
+        }
+    }
+
+    static final JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+
+    /** Returns compiled class bytes, or null with the diagnostics appended to `errors`. */
+    static Map<String, byte[]> compile(String source, StringBuilder errors) throws IOException {
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        try (MemoryFileManager fm = new MemoryFileManager(compiler.getStandardFileManager(diagnostics, null, StandardCharsets.UTF_8))) {
+            JavaCompiler.CompilationTask task = compiler.getTask(
+                null, fm, diagnostics, Arrays.asList("--release", "8", "-proc:none"), null,
+                Collections.singletonList(new SourceFile(source)));
+            if (!task.call()) {
+                for (Diagnostic<? extends JavaFileObject> d : diagnostics.getDiagnostics()) {
+                    if (d.getKind() != Diagnostic.Kind.ERROR) continue;
+                    errors.append("Main.java:").append(d.getLineNumber()).append(": error: ")
+                          .append(d.getMessage(Locale.ROOT)).append('\n');
+                }
+                return null;
+            }
+            Map<String, byte[]> out = new HashMap<>();
+            for (Map.Entry<String, ClassFile> e : fm.classes.entrySet()) {
+                out.put(e.getKey(), e.getValue().bytes.toByteArray());
+            }
+            return out;
+        }
+    }
+
+    // --- Wire helpers ---
+
+    static byte[] readBytes(DataInputStream in) throws IOException {
+        byte[] b = new byte[in.readInt()];
+        in.readFully(b);
+        return b;
+    }
+
+    static void writeBytes(DataOutputStream out, byte[] b) throws IOException {
+        out.writeInt(b.length);
+        out.write(b);
+    }
+
+    static void writeCase(int kind, int exitCode, long cpuNanos) throws IOException {
+        synchronized (responseLock) {
+            if (!caseOpen) return; // Already answered (e.g. by the System.exit hook)
+            caseOpen = false;
+            currentOut.writeInt(kind);
+            currentOut.writeInt(exitCode);
+            writeBytes(currentOut, kind == KIND_OUTPUT_LIMIT ? new byte[0] : runStdout.toByteArray());
+            writeBytes(currentOut, kind == KIND_OUTPUT_LIMIT ? new byte[0] : runStderr.toByteArray());
+            currentOut.writeLong(cpuNanos);
+            currentOut.writeLong(heapPeak());
+            currentOut.flush();
+        }
+    }
+
+    // --- Execution ---
+
+    static void runCase(Map<String, byte[]> classes, byte[] input, long timeoutMs, int maxOutput) throws Exception {
+        runStdout = new CappedOutputStream(maxOutput);
+        runStderr = new CappedOutputStream(maxOutput);
+        System.setIn(new ByteArrayInputStream(input));
+        System.setOut(new PrintStream(runStdout, true, "UTF-8"));
+        System.setErr(new PrintStream(runStderr, true, "UTF-8"));
+        resetHeapPeak();
+        caseOpen = true;
+
+        final int[] kind = {KIND_OK};
+        final long[] cpu = {0};
+        ThreadGroup group = new ThreadGroup("judge-run");
+        Thread t = new Thread(group, () -> {
+            try {
+                Method main = new MemoryClassLoader(classes).loadClass("Main").getMethod("main", String[].class);
+                main.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                System.err.print("Exception in thread \"main\" ");
+                e.getCause().printStackTrace();
+                kind[0] = KIND_EXCEPTION;
+            } catch (Throwable e) {
+                e.printStackTrace();
+                kind[0] = KIND_EXCEPTION;
+            } finally {
+                cpu[0] = threads.getCurrentThreadCpuTime();
+            }
+        }, "main");
+        t.start();
+
+        // Like the `java` launcher: wait for main and any non-daemon threads it started
+        long deadline = System.currentTimeMillis() + timeoutMs;
+        t.join(timeoutMs);
+        while (!t.isAlive() && group.activeCount() > 0 && System.currentTimeMillis() < deadline) {
+            Thread.sleep(5);
+        }
+        if (t.isAlive() || group.activeCount() > 0) {
+            writeCase(KIND_TIMEOUT, 0, 0);
+            Runtime.getRuntime().halt(0); // Runaway thread cannot be stopped safely - restart the helper
+        }
+        writeCase(kind[0], kind[0] == KIND_OK ? 0 : 1, cpu[0]);
+    }
+
+    public static void main(String[] args) throws Exception {
+        if (compiler == null) {
+            System.err.println("JudgeServer requires a JDK (no system Java compiler found)");
+            System.exit(2);
+        }
+        final PrintStream realOut = System.out;
+        String tokenLine = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.US_ASCII)).readLine();
+        if (tokenLine == null || tokenLine.trim().isEmpty()) {
+            System.err.println("JudgeServer expects its access token on stdin");
+            System.exit(2);
+        }
+        final byte[] token = tokenLine.trim().getBytes(StandardCharsets.US_ASCII);
+
+        // A program calling System.exit still gets its output reported; the helper then exits
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> {
+            try { writeCase(KIND_EXIT, 0, 0); } catch (IOException ignored) { }
+        }));
+
+        try (ServerSocket server = new ServerSocket(0, 1, InetAddress.getLoopbackAddress())) {
+            realOut.println("PORT " + server.getLocalPort());
+            realOut.flush();
+            while (true) {
+                try (Socket sock = server.accept()) {
+                    DataInputStream in = new DataInputStream(new BufferedInputStream(sock.getInputStream()));
+                    sock.setSoTimeout(5000); // A silent client cannot hold the helper
+                    byte[] presented = new byte[token.length];
+                    in.readFully(presented);
+                    if (!MessageDigest.isEqual(presented, token)) continue;
+                    sock.setSoTimeout(0);
+                    currentOut = new DataOutputStream(new BufferedOutputStream(sock.getOutputStream()));
+
+                    int timeoutMs = in.readInt();
+                    int maxOutput = in.readInt();
+                    String source = new String(readBytes(in), StandardCharsets.UTF_8);
+                    int n = in.readInt();
+                    List<byte[]> inputs = new ArrayList<>();
+                    for (int i = 0; i < n; i++) inputs.add(readBytes(in));
+
+                    StringBuilder errors = new StringBuilder();
+                    Map<String, byte[]> classes = compile(source, errors);
+                    if (classes == null) {
+                        currentOut.writeInt(1);
+                        writeBytes(currentOut, errors.toString().getBytes(StandardCharsets.UTF_8));
+                        currentOut.flush();
+                        continue;
+                    }
+                    currentOut.writeInt(0);
+                    currentOut.flush();
+                    for (byte[] input : inputs) {
+                        runCase(classes, input, timeoutMs, maxOutput);
+                    }
+                } catch (EOFException | SocketException | SocketTimeoutException e) {
+                    // Client went away mid-request; wait for the next one
+                }
+            }
+        }
+    }
+}
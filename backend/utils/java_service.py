@@ -0,0 +1,232 @@
+import os
+import queue
+import select
+import shutil
+import socket
+import struct
+import hashlib
+import logging
+import resource
+import secrets
+import tempfile
+import time
+import threading
+import subprocess
+
+from utils.runner import RUN_MAX_OUTPUT_KB, rlimits, apply_rlimits, memory_flags
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# 'process' = javac + java per submission (default), 'service' = persistent JudgeServer JVMs
+JAVA_MODE = os.getenv('JAVA_MODE', 'process')
+JAVA_SERVICE_POOL_SIZE = int(os.getenv('JAVA_SERVICE_POOL_SIZE', 2))
+# The heap cap comes from memory_flags('java'), as for a cold `java` run
+JAVA_SERVICE_OPTS = os.getenv('JAVA_SERVICE_OPTS', '-XX:+UseSerialGC -XX:TieredStopAtLevel=1').split()
+JAVA_SERVICE_START_TIMEOUT = int(os.getenv('JAVA_SERVICE_START_TIMEOUT', 30)) # Seconds a JVM gets to report its port
+
+HELPER_SOURCE = os.path.join(os.path.dirname(__file__), 'java', 'JudgeServer.java')
+
+KIND_OK, KIND_EXCEPTION, KIND_TIMEOUT, KIND_EXIT, KIND_OUTPUT_LIMIT = 0, 1, 2, 3, 4
+
+
+class JavaServiceError(Exception):
+    """The helper JVM is unavailable or died unexpectedly (not the user's program)."""
+
+
+def _build_helper():
+    """Compiles JudgeServer.java once per source revision. Returns the class directory."""
+    with open(HELPER_SOURCE, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    class_dir = os.path.join(tempfile.gettempdir(), f'marathon_java_helper_{digest}')
+    if os.path.exists(os.path.join(class_dir, 'JudgeServer.class')):
+        return class_dir
+
+    staging = tempfile.mkdtemp(prefix='.java_helper-', dir=tempfile.gettempdir())
+    try:
+        proc = subprocess.run(['javac', '-d', staging, HELPER_SOURCE], capture_output=True, text=True, timeout=60)
+        if proc.returncode != 0:
+            raise JavaServiceError(f"Could not build JudgeServer: {proc.stderr}")
+        try:
+            os.rename(staging, class_dir)
+        except OSError:
+            pass # Another worker built it first
+    finally:
+        shutil.rmtree(staging, ignore_errors=True) # Gone already when the rename succeeded
+    return class_dir
+
+
+def _helper_limits():
+    # The per-run limits minus RLIMIT_CPU: the JVM outlives many runs, each one is bounded by its timeout
+    limits = [(res, value) for res, value in rlimits('java') if res != resource.RLIMIT_CPU]
+    return lambda: apply_rlimits(limits)
+
+
+class JavaHelper:
+    """
+    One JudgeServer JVM. Serves a single request at a time, only to clients presenting the
+    random token it was given on stdin at start (any local process can reach its port).
+    Runs under the same file/process/output-size rlimits as a cold `java` run.
+    """
+
+    def __init__(self, class_dir):
+        self.token = secrets.token_hex(32)
+        self.proc = subprocess.Popen(
+            ['java'] + JAVA_SERVICE_OPTS + memory_flags('java') + ['-cp', class_dir, 'JudgeServer'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            preexec_fn=_helper_limits(), start_new_session=True
+        )
+        try:
+            self.proc.stdin.write(self.token.encode('ascii') + b'\n')
+            self.proc.stdin.close()
+        except OSError:
+            pass # Died at startup: reported below
+        line = self._read_line(time.monotonic() + JAVA_SERVICE_START_TIMEOUT)
+        if not line.startswith('PORT '):
+            self.close()
+            raise JavaServiceError("JudgeServer did not start")
+        self.port = int(line.split()[1])
+        self.proc.stdout.close()
+
+    def _read_line(self, deadline):
+        """First stdout line of the JVM, '' if it exits or stays silent past `deadline`."""
+        fd, buf = self.proc.stdout.fileno(), b''
+        while b'\n' not in buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return ''
+            chunk = os.read(fd, 256)
+            if not chunk:
+                return ''
+            buf += chunk
+        return buf.split(b'\n', 1)[0].decode('ascii', 'replace').strip()
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def close(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=2)
+        except Exception:
+            pass
+
+    def run_batch(self, code, inputs, timeout):
+        """
+        Returns (results, helper_still_usable). results covers a prefix of `inputs`:
+        after a timeout, output overflow or System.exit the helper dies and the rest must be re-run elsewhere.
+        """
+        try:
+            sock = socket.create_connection(('127.0.0.1', self.port), timeout=timeout + 15)
+        except OSError as e:
+            raise JavaServiceError(f"connect failed: {e}")
+
+        with sock:
+            stream = sock.makefile('rwb')
+            try:
+                stream.write(self.token.encode('ascii'))
+                stream.write(struct.pack('!i', int(timeout * 1000)))
+                stream.write(struct.pack('!i', RUN_MAX_OUTPUT_KB * 1024))
+                _write_bytes(stream, code.encode('utf-8'))
+                stream.write(struct.pack('!i', len(inputs)))
+                for inp in inputs:
+                    _write_bytes(stream, inp.encode('utf-8'))
+                stream.flush()
+
+                if _read_int(stream) == 1:
+                    error = "Compilation Error:\n" + _read_bytes(stream).decode('utf-8', 'replace')
+                    return [{'success': False, 'output': '', 'error': error} for _ in inputs], True
+
+                results = []
+                for _ in inputs:
+                    kind = _read_int(stream)
+                    exit_code = _read_int(stream)
+                    stdout = _read_bytes(stream).decode('utf-8', 'replace')
+                    stderr = _read_bytes(stream).decode('utf-8', 'replace')
+                    cpu_ns, heap_peak = struct.unpack('!qq', _read_exact(stream, 16))
+                    usage = {'cpu_time': cpu_ns / 1e9, 'max_rss_kb': heap_peak // 1024}
+
+                    if kind == KIND_TIMEOUT:
+                        results.append({'success': False, 'output': '', 'error': "Time Limit Exceeded", **usage})
+                        return results, False
+                    if kind == KIND_OUTPUT_LIMIT:
+                        results.append({'success': False, 'output': '', 'error': "Output Limit Exceeded", **usage})
+                        return results, False
+                    if kind == KIND_EXIT:
+                        exit_code = self.proc.wait(timeout=5) # The program's System.exit status
+                    if exit_code != 0:
+                        results.append({'success': False, 'output': stdout, 'error': stderr or "Runtime Error", **usage})
+                    else:
+                        results.append({'success': True, 'output': stdout, 'error': None, **usage})
+                    if kind == KIND_EXIT:
+                        return results, False
+                return results, True
+            except (OSError, EOFError, struct.error, subprocess.TimeoutExpired) as e:
+                raise JavaServiceError(f"helper failed mid-request: {e}")
+
+
+class JavaService:
+    """Pool of persistent JudgeServer JVMs; crashed or timed-out helpers are replaced automatically."""
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._helpers = None
+        self._class_dir = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._class_dir = _build_helper()
+            self._helpers = queue.Queue()
+            for _ in range(self.size):
+                self._helpers.put(None) # JVMs are started lazily
+            self._pid = os.getpid()
+
+    def run_batch(self, code, inputs, timeout):
+        self._ensure_started()
+        results = []
+        while len(results) < len(inputs):
+            helper = self._helpers.get()
+            try:
+                if helper is None or not helper.alive():
+                    helper = JavaHelper(self._class_dir)
+                chunk, usable = helper.run_batch(code, inputs[len(results):], timeout)
+                results.extend(chunk)
+                if not usable:
+                    # Timed out / output overflow / System.exit: the JVM is gone (or going) - restart on next use
+                    helper.close()
+                    helper = None
+            except (JavaServiceError, OSError) as e:
+                logger.warning(f"Java helper failed, restarting: {e}")
+                if helper:
+                    helper.close()
+                helper = None
+                raise JavaServiceError(str(e))
+            finally:
+                self._helpers.put(helper)
+        return results
+
+
+def _write_bytes(stream, data):
+    stream.write(struct.pack('!i', len(data)))
+    stream.write(data)
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    if data is None or len(data) < n:
+        raise EOFError("helper closed the connection")
+    return data
+
+def _read_int(stream):
+    return struct.unpack('!i', _read_exact(stream, 4))[0]
+
+def _read_bytes(stream):
+    return _read_exact(stream, _read_int(stream))
+
+
+java_service = JavaService(JAVA_SERVICE_POOL_SIZE) if JAVA_MODE == 'service' else None
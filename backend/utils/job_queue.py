@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import logging
+import threading
+from db_connection import db_manager
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# 'local' = every web node judges its own submissions in-process (default)
+# 'db'    = shared judge_jobs table, drained by judge_worker.py processes on any machine
+# 'redis' = shared Redis (or Redis-compatible) lists, drained the same way
+JUDGE_QUEUE_BACKEND = os.getenv('JUDGE_QUEUE_BACKEND', 'local')
+JUDGE_REDIS_URL = os.getenv('JUDGE_REDIS_URL', 'redis://localhost:6379/0')
+JUDGE_JOB_LEASE = int(os.getenv('JUDGE_JOB_LEASE', 120)) # Seconds before a claimed job of a dead worker is retried
+JUDGE_JOB_MAX_ATTEMPTS = int(os.getenv('JUDGE_JOB_MAX_ATTEMPTS', 3))
+JUDGE_DONE_SIGNAL_TTL = int(os.getenv('JUDGE_DONE_SIGNAL_TTL', 300)) # Seconds an unread completion signal is kept (redis)
+
+# Same ordering as utils/judge.py: lower value = served first
+PRIORITIES = (0, 1)
+
+
+class DBJobQueue:
+    """
+    judge_jobs table as the queue. Workers claim a job with a conditional UPDATE
+    (status='queued' -> 'claimed'); only the worker whose UPDATE affected the row owns it.
+    Finished jobs are deleted - the verdict lives on the submission row.
+    """
+
+    def __init__(self):
+        self._last_reap = 0.0
+        self._lock = threading.Lock()
+
+    def enqueue(self, job, priority=0):
+        job_id = db_manager.execute_insert(
+            "INSERT INTO judge_jobs (submission_id, priority, payload, status, attempts, enqueued_at) VALUES (%s, %s, %s, 'queued', 0, %s)",
+            (job.get('submission_id'), priority, json.dumps(job, default=str), time.time()), 'job_id'
+        )
+        if job_id is None:
+            raise RuntimeError("Could not enqueue judge job")
+        return job_id
+
+    def claim(self, worker_id):
+        """Returns (job_id, job) or None when the queue is empty."""
+        self._reap_expired()
+        candidates = db_manager.execute_query(
+            "SELECT job_id FROM judge_jobs WHERE status='queued' ORDER BY priority, job_id LIMIT 5"
+        ) or []
+        for row in candidates:
+            res = db_manager.execute_update(
+                "UPDATE judge_jobs SET status='claimed', worker_id=%s, claimed_at=%s, attempts=attempts+1 WHERE job_id=%s AND status='queued'",
+                (worker_id, time.time(), row['job_id'])
+            )
+            if res and res.get('affected') == 1:
+                job = db_manager.execute_query("SELECT payload FROM judge_jobs WHERE job_id=%s", (row['job_id'],))
+                if job:
+                    return row['job_id'], json.loads(job[0]['payload'])
+        return None
+
+    def complete(self, job_id, job=None):
+        db_manager.execute_update("DELETE FROM judge_jobs WHERE job_id=%s", (job_id,))
+
+    def fail(self, job_id, error, job=None):
+        db_manager.execute_update("UPDATE judge_jobs SET status='failed', error=%s WHERE job_id=%s", (str(error)[:1000], job_id))
+
+    def _reap_expired(self):
+        # Jobs held by a worker that died: retry, or give up after JUDGE_JOB_MAX_ATTEMPTS
+        with self._lock:
+            if time.time() - self._last_reap < 10:
+                return
+            self._last_reap = time.time()
+        cutoff = time.time() - JUDGE_JOB_LEASE
+        db_manager.execute_update(
+            "UPDATE submissions SET status='failed' WHERE submission_id IN "
+            "(SELECT submission_id FROM judge_jobs WHERE status='claimed' AND claimed_at < %s AND attempts >= %s)",
+            (cutoff, JUDGE_JOB_MAX_ATTEMPTS)
+        )
+        db_manager.execute_update(
+            "UPDATE judge_jobs SET status='failed', error='lease expired' WHERE status='claimed' AND claimed_at < %s AND attempts >= %s",
+            (cutoff, JUDGE_JOB_MAX_ATTEMPTS)
+        )
+        res = db_manager.execute_update(
+            "UPDATE judge_jobs SET status='queued', worker_id=NULL WHERE status='claimed' AND claimed_at < %s",
+            (cutoff,)
+        )
+        if res and res.get('affected'):
+            logger.warning(f"Requeued {res['affected']} judge jobs with expired leases")
+
+    def stats(self):
+        rows = db_manager.execute_query("SELECT status, COUNT(*) AS n FROM judge_jobs GROUP BY status") or []
+        counts = {row['status']: int(row['n']) for row in rows}
+        return {'backend': 'db', 'queued': counts.get('queued', 0), 'claimed': counts.get('claimed', 0), 'failed': counts.get('failed', 0)}
+
+
+class RedisJobQueue:
+    """
+    One Redis list per priority. A claim moves the job into the worker's own processing
+    list (LMOVE) and records the claim time in a shared sorted set. Any worker requeues
+    claims older than JUDGE_JOB_LEASE (crashed, retired or renamed workers), giving up after
+    JUDGE_JOB_MAX_ATTEMPTS; a restarting worker also recovers its own list at once.
+    A finished job pushes a completion signal that a waiting web node blocks on (wait_done).
+    """
+
+    CLAIMS_KEY = 'judge:claims' # "<worker_id>\n<raw job>" -> claimed_at
+    ATTEMPTS_KEY = 'judge:attempts' # job_id -> claims so far
+
+    # LMOVE and the claim record in one step: a worker dying in between cannot hide the job
+    CLAIM_SCRIPT = """
+        local raw = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+        if raw then redis.call('ZADD', KEYS[3], ARGV[1], ARGV[2] .. '\\n' .. raw) end
+        return raw
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("JUDGE_QUEUE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self.client.register_script(self.CLAIM_SCRIPT)
+        self._last_reap = 0.0
+        self._lock = threading.Lock()
+
+    def _queue_key(self, priority):
+        return f"judge:jobs:{priority}"
+
+    def _processing_key(self, worker_id):
+        return f"judge:processing:{worker_id}"
+
+    def enqueue(self, job, priority=0):
+        job_id = self.client.incr('judge:job_seq')
+        self.client.lpush(self._queue_key(priority), json.dumps({'job_id': job_id, 'job': job}, default=str))
+        return job_id
+
+    def recover(self, worker_id):
+        """Puts jobs left in this worker's processing list (previous crash) back in the queue."""
+        moved = 0
+        while self.client.lmove(self._processing_key(worker_id), self._queue_key(PRIORITIES[0]), 'RIGHT', 'RIGHT'):
+            moved += 1
+        if moved:
+            logger.warning(f"Recovered {moved} judge jobs from {worker_id}")
+
+    def claim(self, worker_id):
+        self._reap_expired()
+        for priority in PRIORITIES:
+            raw = self._claim(keys=[self._queue_key(priority), self._processing_key(worker_id), self.CLAIMS_KEY],
+                              args=[time.time(), worker_id])
+            if raw:
+                entry = json.loads(raw)
+                self.client.hincrby(self.ATTEMPTS_KEY, entry['job_id'], 1)
+                entry['job']['_raw'] = raw
+                entry['job']['_worker_id'] = worker_id
+                return entry['job_id'], entry['job']
+        return None
+
+    def _reap_expired(self):
+        # Claims older than the lease: the worker died, or no longer runs under that id
+        with self._lock:
+            if time.time() - self._last_reap < 10:
+                return
+            self._last_reap = time.time()
+        requeued = 0
+        for member in self.client.zrangebyscore(self.CLAIMS_KEY, '-inf', time.time() - JUDGE_JOB_LEASE):
+            if not self.client.zrem(self.CLAIMS_KEY, member):
+                continue # Reaped by another worker
+            worker_id, raw = member.split('\n', 1)
+            if not self.client.lrem(self._processing_key(worker_id), 1, raw):
+                continue # Completed, or recovered by its restarted worker, meanwhile
+            entry = json.loads(raw)
+            if int(self.client.hget(self.ATTEMPTS_KEY, entry['job_id']) or 0) >= JUDGE_JOB_MAX_ATTEMPTS:
+                self.client.hdel(self.ATTEMPTS_KEY, entry['job_id'])
+                db_manager.execute_update(
+                    "UPDATE submissions SET status='failed' WHERE submission_id=%s AND status <> 'evaluated'",
+                    (entry['job'].get('submission_id'),)
+                )
+                logger.error(f"Judge job {entry['job_id']} failed: lease expired {JUDGE_JOB_MAX_ATTEMPTS} times")
+                continue
+            self.client.rpush(self._queue_key(PRIORITIES[0]), raw) # Served next, like recover()
+            requeued += 1
+        if requeued:
+            logger.warning(f"Requeued {requeued} judge jobs with expired leases")
+
+    def _done_key(self, submission_id):
+        return f"judge:done:{submission_id}"
+
+    def complete(self, job_id, job=None):
+        if job:
+            self.client.lrem(self._processing_key(job['_worker_id']), 1, job['_raw'])
+            pipe = self.client.pipeline()
+            pipe.zrem(self.CLAIMS_KEY, f"{job['_worker_id']}\n{job['_raw']}")
+            pipe.hdel(self.ATTEMPTS_KEY, job_id)
+            pipe.lpush(self._done_key(job['submission_id']), 1)
+            pipe.expire(self._done_key(job['submission_id']), JUDGE_DONE_SIGNAL_TTL)
+            pipe.execute()
+
+    def wait_done(self, submission_id, timeout):
+        """Blocks until the submission's job completed (True) or `timeout` seconds pass (False)."""
+        return self.client.blpop(self._done_key(submission_id), timeout=max(1, int(timeout))) is not None
+
+    def fail(self, job_id, error, job=None):
+        logger.error(f"Judge job {job_id} failed: {error}")
+        self.complete(job_id, job)
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'queued': sum(self.client.llen(self._queue_key(p)) for p in PRIORITIES),
+            'claimed': self.client.zcard(self.CLAIMS_KEY)
+        }
+
+
+def _create_queue():
+    if JUDGE_QUEUE_BACKEND == 'db':
+        return DBJobQueue()
+    if JUDGE_QUEUE_BACKEND == 'redis':
+        try:
+            return RedisJobQueue(JUDGE_REDIS_URL)
+        except Exception as e:
+            logger.error(f"Redis judge queue unavailable ({e}); judging in-process instead.")
+    return None
+
+
+judge_queue = _create_queue()
@@ -0,0 +1,167 @@
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from utils.logic import execute_code_batch
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# Max programs judged at once by this app worker. Each judge worker runs up to
+# JUDGE_CASE_PARALLELISM (utils/logic.py) test-case processes of its submission at a time,
+# so the two together bound compiler/interpreter fan-out per gunicorn worker.
+JUDGE_WORKERS = int(os.getenv('JUDGE_WORKERS', os.cpu_count() or 2))
+JUDGE_QUEUE_SIZE = int(os.getenv('JUDGE_QUEUE_SIZE', 100))
+JUDGE_WAIT_TIMEOUT = int(os.getenv('JUDGE_WAIT_TIMEOUT', 90)) # Seconds a request thread waits for its verdict
+
+# Lower value = served first
+PRIORITY_SUBMIT = 0
+PRIORITY_RUN = 1
+
+
+class JudgeQueueFull(Exception):
+    """Raised when the judge queue is at capacity. Callers should answer 503 + Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Judge queue is full. Retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class JudgePool:
+    """
+    Bounded priority queue in front of a fixed set of judge worker threads.
+    Submissions are dequeued ahead of Run requests; when the queue is full new
+    work is rejected immediately instead of piling up subprocesses.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._metrics = {
+            'enqueued': 0, 'started': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'busy': 0, 'abandoned': 0,
+            'wait_total': 0.0, 'wait_max': 0.0, 'service_total': 0.0
+        }
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so (re)start lazily inside each gunicorn worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.PriorityQueue(maxsize=self.max_queue)
+            self._threads = []
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker_loop, name=f"judge-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            self._pid = os.getpid()
+            logger.info(f"Judge pool started: {self.workers} workers, queue size {self.max_queue}")
+
+    def submit(self, code, language, inputs, priority=PRIORITY_RUN, on_start=None, stop=None):
+        """
+        Queues a batch execution. Returns a Future resolving to the per-input results.
+        `on_start` (optional) is called from the judge worker right before execution begins.
+        `stop` (optional) is the fail-fast predicate passed to execute_code_batch.
+        """
+        self._ensure_started()
+        future = Future()
+        item = (priority, next(self._seq), time.time(), future, (code, language, inputs, stop), on_start)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._metrics['rejected'] += 1
+            raise JudgeQueueFull(self.retry_after())
+        with self._lock:
+            self._metrics['enqueued'] += 1
+        return future
+
+    def execute(self, code, language, inputs, priority=PRIORITY_RUN, stop=None):
+        """
+        Blocking helper for request threads: queue the job and wait for its results.
+        If the wait times out, the job is dropped from the queue, or, when it is already
+        running, told to stop after its current case: the client's retry must not find
+        the first attempt still holding a judge worker.
+        """
+        abandoned = threading.Event()
+        def stop_unless_abandoned(index, result):
+            return abandoned.is_set() or bool(stop and stop(index, result))
+
+        future = self.submit(code, language, inputs, priority, stop=stop_unless_abandoned)
+        try:
+            return future.result(timeout=JUDGE_WAIT_TIMEOUT)
+        except FutureTimeout:
+            if not future.cancel():
+                abandoned.set()
+            with self._lock:
+                self._metrics['abandoned'] += 1
+            raise
+
+    def _worker_loop(self):
+        while True:
+            priority, _, enqueued_at, future, args, on_start = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue # Abandoned by its request thread while queued
+            if on_start:
+                try:
+                    on_start()
+                except Exception as e:
+                    logger.error(f"Judge on_start hook failed: {e}")
+            started = time.time()
+            wait = started - enqueued_at
+            with self._lock:
+                self._metrics['busy'] += 1
+                self._metrics['started'] += 1
+                self._metrics['wait_total'] += wait
+                self._metrics['wait_max'] = max(self._metrics['wait_max'], wait)
+            try:
+                future.set_result(execute_code_batch(*args))
+                outcome = 'completed'
+            except Exception as e:
+                logger.error(f"Judge job failed: {e}")
+                future.set_exception(e)
+                outcome = 'failed'
+            finally:
+                with self._lock:
+                    self._metrics['busy'] -= 1
+                    self._metrics[outcome] += 1
+                    self._metrics['service_total'] += time.time() - started
+
+    def retry_after(self):
+        """Rough seconds until a queue slot frees up, based on observed service time."""
+        with self._lock:
+            done = self._metrics['completed'] + self._metrics['failed']
+            avg_service = self._metrics['service_total'] / done if done else 1.0
+        return max(1, int(avg_service * self._queue.qsize() / self.workers + 0.999))
+
+    def stats(self):
+        with self._lock:
+            m = dict(self._metrics)
+        done = m['completed'] + m['failed']
+        return {
+            'workers': self.workers,
+            'busy_workers': m['busy'],
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self.max_queue,
+            'enqueued': m['enqueued'],
+            'completed': m['completed'],
+            'failed': m['failed'],
+            'rejected': m['rejected'],
+            'abandoned': m['abandoned'],
+            'avg_wait_ms': round(m['wait_total'] / m['started'] * 1000, 1) if m['started'] else 0.0,
+            'max_wait_ms': round(m['wait_max'] * 1000, 1),
+            'avg_service_ms': round(m['service_total'] / done * 1000, 1) if done else 0.0
+        }
+
+
+judge_pool = JudgePool(JUDGE_WORKERS, JUDGE_QUEUE_SIZE)
@@ -2,9 +2,17 @@
 import logging
 import json
 import subprocess
-import tempfile
 import os
 import time
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.compile_cache import compile_cache
+from utils.zygote import interpreter_pool, ZygoteError
+from utils.java_service import java_service, JavaServiceError
+from utils import pch, security
+from utils.runner import run_limited, memory_flags
+from utils.sandbox import sandbox_pool
 
 logger = logging.getLogger(__name__)
 
@@ -15,58 +23,53 @@ EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'local_secure')
 # === SECURITY WRAPPER ===
 def validate_code_security(code, language):
     """
-    Scans the user code for potentially malicious patterns.
+    Scans the user code for potentially malicious patterns (see utils/security.py).
     Returns: (is_safe: bool, error_message: str)
     """
-    code_lower = code.lower()
-    
-    # 1. Global Blocklist
-    # Block file system access, network access, and process management
-    dangerous_globals = [
-        'rm -rf', 'wget', 'curl', 'shutdown', 'reboot'
-    ]
-    for k in dangerous_globals:
-        if k in code_lower:
-             return False, f"Security Violation: '{k}' is prohibited."
-
-    # 2. Python Specific
-    if language == 'python':
-        dangerous_py = [
-            'import os', 'from os', 'import subprocess', 'import sys', 'import pty', 'import shutil', 
-            'import requests', 'import urllib', 'import socket', 'import multiprocessing', 'import threading',
-            'open(', 'exec(', 'eval(', '__import__', 'os.system', 'os.popen', 'os.walk', 'os.remove',
-            'subprocess.run', 'subprocess.Popen', 'sys.modules'
-        ]
-        for keyword in dangerous_py:
-            if keyword in code: # Case sensitive for Python imports mostly, but safer to check strict
-                return False, f"Security Violation: usage of '{keyword}' is prohibited."
-
-    # 3. Node.js Specific
-    if language in ['javascript', 'nodejs', 'node']:
-         dangerous_js = [
-             'require("child_process")', "require('child_process')",
-             'require("fs")', "require('fs')",
-             'require("net")', "require('net')",
-             'require("http")', "require('http')",
-             'process.env', 'process.kill', 'process.exit', 'exec(', 'spawn('
-         ]
-         for keyword in dangerous_js:
-             if keyword in code:
-                 return False, f"Security Violation: usage of '{keyword}' is prohibited."
-
-    # 4. C/C++ Specific
-    if language in ['c', 'cpp']:
-        dangerous_c = [
-            'system(', 'fork(', 'popen(', 'execl(', 'execv(', 'remove(', 'rename(', 'fopen(', 'socket('
-        ]
-        for keyword in dangerous_c:
-             if keyword in code:
-                  return False, f"Security Violation: system call '{keyword}' is prohibited."
-
-    return True, None
+    return security.scan(code, language)
+
+# === WARM-UP ===
+
+def start_judge_warmup():
+    """
+    Background startup step: builds precompiled headers for the default C/C++ header
+    sets and for the include prefix of every C/C++ question template in the DB.
+    """
+    def _run():
+        sources = []
+        try:
+            from db_connection import db_manager
+            rows = db_manager.execute_query(
+                "SELECT q.buggy_code, r.allowed_language FROM questions q JOIN rounds r ON q.round_id = r.round_id"
+            ) or []
+            for row in rows:
+                lang = (row.get('allowed_language') or '').lower()
+                if lang in ['c', 'gcc']:
+                    sources.append(('c', row.get('buggy_code')))
+                elif lang in ['cpp', 'c++', 'g++']:
+                    sources.append(('cpp', row.get('buggy_code')))
+        except Exception as e:
+            logger.warning(f"Judge warm-up could not load templates: {e}")
+        try:
+            pch.warm_up(CPP_FLAGS, sources)
+        except Exception as e:
+            logger.warning(f"PCH warm-up failed: {e}")
+
+    threading.Thread(target=_run, name='judge-warmup', daemon=True).start()
 
 # === EXECUTION ENGINE ===
 
+# Common Resource Limits (Time in seconds)
+TIMEOUT_SEC = 2
+
+# Test cases of one submission run concurrently, at most this many at a time
+CASE_PARALLELISM = int(os.getenv('JUDGE_CASE_PARALLELISM', min(4, os.cpu_count() or 1)))
+SKIPPED_CASE_ERROR = "Skipped (an earlier test case failed)"
+
+# Compiler invocations (part of the compile cache key - change them and old artifacts are ignored)
+CPP_FLAGS = []
+JAVAC_FLAGS = ['--release', '8']
+
 def execute_code_internal(code, language, input_str):
     """
     Facade for code execution. Dispatches to local sandbox or docker/external service.
@@ -84,139 +87,239 @@ def execute_code_internal(code, language, input_str):
     else:
         return {'success': False, 'error': "Unknown Execution Mode"}
 
+def execute_code_batch(code, language, inputs, stop=None):
+    """
+    Batch facade: runs the same code against every input in `inputs`.
+    Compiled languages (C/C++/Java) are compiled ONCE and the binary/class is reused
+    for every case. Returns one result dict per input, in the same order.
+    `stop(index, result)` (optional) enables fail-fast, see run_cases().
+    """
+    inputs = [str(i) for i in inputs]
+    if not inputs:
+        return []
+
+    is_safe, violation_msg = validate_code_security(code, language)
+    if not is_safe:
+        return [{'success': False, 'output': '', 'error': violation_msg} for _ in inputs]
+
+    if EXECUTION_MODE == 'local_secure':
+        return execute_local_secure_batch(code, language, inputs, stop)
+    elif EXECUTION_MODE == 'docker':
+        return [{'success': False, 'error': "Docker execution not yet implemented"} for _ in inputs]
+    else:
+        return [{'success': False, 'error': "Unknown Execution Mode"} for _ in inputs]
+
 def execute_local_secure(code, language, input_str):
     """
     Executes code locally using subprocess with strict timeouts and (where possible) limits.
     """
-    input_str = str(input_str)
-    
-    # Common Resource Limits (Time in seconds)
-    TIMEOUT_SEC = 2
-    
+    return execute_local_secure_batch(code, language, [str(input_str)])[0]
+
+def execute_local_secure_batch(code, language, inputs, stop=None):
     try:
         if language == 'python':
-            return run_python(code, input_str, TIMEOUT_SEC)
+            return run_cases(lambda inp: _timed(run_python, code, inp, TIMEOUT_SEC), inputs, stop)
         elif language in ['c', 'cpp']:
-            return run_cpp(code, language, input_str, TIMEOUT_SEC)
+            return run_cpp_batch(code, language, inputs, TIMEOUT_SEC, stop)
         elif language == 'java':
-            return run_java(code, input_str, TIMEOUT_SEC)
+            return run_java_batch(code, inputs, TIMEOUT_SEC, stop)
         elif language in ['javascript', 'node']:
-            return run_node(code, input_str, TIMEOUT_SEC)
+            return run_cases(lambda inp: _timed(run_node, code, inp, TIMEOUT_SEC), inputs, stop)
         else:
-            return {'success': False, 'error': f"Language {language} not supported"}
+            return [{'success': False, 'error': f"Language {language} not supported"} for _ in inputs]
             
     except Exception as e:
         logger.error(f"Execution Error: {e}")
-        return {'success': False, 'error': "Internal Execution Error"}
+        return [{'success': False, 'error': "Internal Execution Error"} for _ in inputs]
+
+def run_cases(run_one, inputs, stop=None):
+    """
+    Runs run_one(input) for every input, up to CASE_PARALLELISM at once, and returns the
+    results in input order. Fail-fast: once stop(index, result) returns True, cases that
+    have not started yet are skipped (cases already running are left to finish).
+    """
+    skipped = {'success': False, 'output': '', 'error': SKIPPED_CASE_ERROR}
+
+    if CASE_PARALLELISM <= 1 or len(inputs) <= 1:
+        results = []
+        for i, inp in enumerate(inputs):
+            results.append(run_one(inp))
+            if stop and stop(i, results[-1]):
+                results.extend(dict(skipped) for _ in inputs[i + 1:])
+                break
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(CASE_PARALLELISM, len(inputs)), thread_name_prefix='judge-case') as pool:
+        futures = [pool.submit(run_one, inp) for inp in inputs]
+        index = {f: i for i, f in enumerate(futures)}
+        for f in as_completed(futures):
+            if stop and stop(index[f], f.result()):
+                for pending in futures:
+                    pending.cancel()
+                break
+    # Leaving the executor waited for every case that was already running
+    return [dict(skipped) if f.cancelled() else f.result() for f in futures]
+
+def _timed(runner, *args):
+    """Calls a runner and records its wall-clock time as result['duration']."""
+    start_t = time.time()
+    result = runner(*args)
+    result['duration'] = time.time() - start_t
+    return result
 
 def run_python(code, input_str, timeout):
-    try:
-        # '-u' for unbuffered output
-        p = subprocess.run(
-            ['python', '-u', '-c', code],
-            input=input_str,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        if p.returncode != 0:
-            return {'success': False, 'output': p.stdout, 'error': p.stderr or "Runtime Error"}
-        return {'success': True, 'output': p.stdout, 'error': None}
-    except subprocess.TimeoutExpired:
-        return {'success': False, 'output': '', 'error': "Time Limit Exceeded"}
+    # Warm or cold, the program runs inside its own sandbox directory
+    with sandbox_pool.workdir() as workdir:
+        if interpreter_pool:
+            try:
+                return interpreter_pool.run_python(code, input_str, timeout, cwd=workdir)
+            except ZygoteError:
+                pass # Zygote broken - fall back to a cold interpreter
+        # '-u' for unbuffered output; rlimits applied in the child, CPU/RSS measured via wait4.
+        # The source goes in a file in the run's sandbox directory, not on argv (no size limit, not in `ps`)
+        write_source(workdir, 'main.py', code)
+        return hide_workdir(run_limited(['python', '-u', 'main.py'], 'python', input_str, timeout, cwd=workdir), workdir)
+
+def write_source(workdir, name, code):
+    with open(os.path.join(workdir, name), 'w') as f:
+        f.write(code)
+
+def hide_workdir(result, workdir):
+    """Tracebacks name the source by absolute path: show participants just the file name."""
+    if result.get('error'):
+        result['error'] = result['error'].replace(workdir + os.sep, '')
+    return result
 
 def run_cpp(code, lang, input_str, timeout):
+    return run_cpp_batch(code, lang, [input_str], timeout)[0]
+
+def run_cpp_batch(code, lang, inputs, timeout, stop=None):
+    with sandbox_pool.workdir() as workdir:
+        exe_path, warnings, error = compile_cpp(code, lang, workdir)
+        if error:
+            return [dict(error) for _ in inputs]
+        return run_cases(lambda inp: _timed(run_compiled, [exe_path], inp, timeout, warnings, 'native', workdir), inputs, stop)
+
+def compile_cpp(code, lang, workdir):
+    """
+    Compiles C/C++ source inside `workdir`, or reuses a cached binary for identical source.
+    Returns: (exe_path, warnings, error_result) - error_result is None on success.
+    """
     compiler = 'gcc' if lang == 'c' else 'g++'
     ext = '.c' if lang == 'c' else '.cpp'
+    src_path = os.path.join(workdir, f'main{ext}')
+    exe_path = os.path.join(workdir, 'main.exe')
+
+    cache_key = None
+    if compile_cache:
+        cache_key = compile_cache.make_key(lang, [compiler] + CPP_FLAGS, code)
+        cached = compile_cache.get(cache_key)
+        if cached:
+            if cached['error']:
+                return None, None, {'success': False, 'output': '', 'error': cached['error']}
+            return os.path.join(cached['path'], 'main.exe'), cached['warnings'] or '', None
     
-    with tempfile.TemporaryDirectory() as tmpdir:
-        src_path = os.path.join(tmpdir, f'main{ext}')
-        exe_path = os.path.join(tmpdir, 'main.exe')
+    with open(src_path, 'w') as f:
+        f.write(code)
         
-        with open(src_path, 'w') as f:
-            f.write(code)
-            
-        # Compile
-        try:
-            c_proc = subprocess.run(
-                [compiler, src_path, '-o', exe_path],
-                capture_output=True,
-                text=True,
-                timeout=5 # Compile timeout
-            )
-            if c_proc.returncode != 0:
-                 return {'success': False, 'output': '', 'error': "Compilation Error:\n" + c_proc.stderr}
-            warnings = c_proc.stderr # Capture warnings
-        except Exception as e:
-             return {'success': False, 'output': '', 'error': "Compiler not found or failed."}
+    try:
+        c_proc = subprocess.run(
+            [compiler] + CPP_FLAGS + pch.pch_flags(code, lang, compiler, CPP_FLAGS) + [src_path, '-o', exe_path],
+            capture_output=True,
+            text=True,
+            timeout=5 # Compile timeout
+        )
+    except Exception as e:
+         return None, None, {'success': False, 'output': '', 'error': "Compiler not found or failed."}
 
-        # Run
-        try:
-            r_proc = subprocess.run(
-                [exe_path],
-                input=input_str,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            if r_proc.returncode != 0:
-                return {'success': False, 'output': r_proc.stdout, 'error': r_proc.stderr or "Runtime Error", 'warnings': warnings}
-            return {'success': True, 'output': r_proc.stdout, 'error': None, 'warnings': warnings}
-        except subprocess.TimeoutExpired:
-            return {'success': False, 'output': '', 'error': "Time Limit Exceeded"}
+    if c_proc.returncode != 0:
+        error = "Compilation Error:\n" + c_proc.stderr
+        if cache_key:
+            compile_cache.put(cache_key, [], error=error)
+        return None, None, {'success': False, 'output': '', 'error': error}
+
+    warnings = c_proc.stderr # stderr holds warnings
+    if cache_key:
+        entry = compile_cache.put(cache_key, [exe_path], warnings=warnings)
+        if entry:
+            exe_path = os.path.join(entry, 'main.exe')
+    return exe_path, warnings, None
+
+def run_compiled(cmd, input_str, timeout, warnings=None, kind='native', cwd=None):
+    """Runs an already compiled program (native binary or JVM class) against one input."""
+    return run_limited(cmd, kind, input_str, timeout, warnings, cwd)
 
 def run_java(code, input_str, timeout):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        src_path = os.path.join(tmpdir, 'Main.java')
-        # Ensure class Main exists. Simple heuristic check.
-        if 'class Main' not in code:
-             # Just a warning or auto-inject? Assuming strict 'Main' requirement.
-             pass
-
-        with open(src_path, 'w') as f:
-            f.write(code)
-            
-        # Compile
-        try:
-            c_proc = subprocess.run(
-                ['javac', '--release', '8', src_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if c_proc.returncode != 0:
-                 return {'success': False, 'output': '', 'error': "Compilation Error:\n" + c_proc.stderr}
-        except:
-             return {'success': False, 'output': '', 'error': "Java Compiler not found."}
-
-        # Run
+    return run_java_batch(code, [input_str], timeout)[0]
+
+def run_java_batch(code, inputs, timeout, stop=None):
+    if java_service:
         try:
-            r_proc = subprocess.run(
-                ['java', '-cp', tmpdir, 'Main'],
-                input=input_str,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            if r_proc.returncode != 0:
-                return {'success': False, 'output': r_proc.stdout, 'error': r_proc.stderr or "Runtime Error"}
-            return {'success': True, 'output': r_proc.stdout, 'error': None}
-        except subprocess.TimeoutExpired:
-            return {'success': False, 'output': '', 'error': "Time Limit Exceeded"}
+            # Warm JVM: in-memory javac + fresh classloader per case, no JVM boot per run.
+            # One helper runs the whole batch in order, so fail-fast does not apply here.
+            return java_service.run_batch(code, inputs, timeout)
+        except JavaServiceError:
+            pass # Helper unavailable - fall back to javac + java processes
+    with sandbox_pool.workdir() as workdir:
+        class_dir, error = compile_java(code, workdir)
+        if error:
+            return [dict(error) for _ in inputs]
+        cmd = ['java'] + memory_flags('java') + ['-cp', class_dir, 'Main']
+        return run_cases(lambda inp: _timed(run_compiled, cmd, inp, timeout, None, 'java', workdir), inputs, stop)
 
-def run_node(code, input_str, timeout):
+def compile_java(code, workdir):
+    """
+    Compiles Main.java inside `workdir`, or reuses cached classes for identical source.
+    Returns: (class_dir, error_result) - error_result is None on success.
+    """
+    src_path = os.path.join(workdir, 'Main.java')
+    # Ensure class Main exists. Simple heuristic check.
+    if 'class Main' not in code:
+         # Just a warning or auto-inject? Assuming strict 'Main' requirement.
+         pass
+
+    cache_key = None
+    if compile_cache:
+        cache_key = compile_cache.make_key('java', ['javac'] + JAVAC_FLAGS, code)
+        cached = compile_cache.get(cache_key)
+        if cached:
+            if cached['error']:
+                return None, {'success': False, 'output': '', 'error': cached['error']}
+            return cached['path'], None
+
+    with open(src_path, 'w') as f:
+        f.write(code)
+        
     try:
-        p = subprocess.run(
-            ['node', '-e', code],
-            input=input_str,
+        c_proc = subprocess.run(
+            ['javac'] + JAVAC_FLAGS + [src_path],
             capture_output=True,
             text=True,
-            timeout=timeout
+            timeout=10
         )
-        if p.returncode != 0:
-             return {'success': False, 'output': p.stdout, 'error': p.stderr}
-        return {'success': True, 'output': p.stdout, 'error': None}
-    except subprocess.TimeoutExpired:
-        return {'success': False, 'output': '', 'error': "Time Limit Exceeded"}
     except:
+         return None, {'success': False, 'output': '', 'error': "Java Compiler not found."}
+
+    if c_proc.returncode != 0:
+        error = "Compilation Error:\n" + c_proc.stderr
+        if cache_key:
+            compile_cache.put(cache_key, [], error=error)
+        return None, {'success': False, 'output': '', 'error': error}
+
+    if cache_key:
+        # Main.class plus any nested/auxiliary classes
+        return compile_cache.put(cache_key, glob.glob(os.path.join(workdir, '*.class'))) or workdir, None
+    return workdir, None
+
+def run_node(code, input_str, timeout):
+    try:
+        with sandbox_pool.workdir() as workdir:
+            if interpreter_pool:
+                try:
+                    return interpreter_pool.run_node(code, input_str, timeout, cwd=workdir)
+                except (ZygoteError, OSError):
+                    pass # No warm node available - fall back to a cold one
+            write_source(workdir, 'main.js', code)
+            return hide_workdir(run_limited(['node'] + memory_flags('node') + ['main.js'], 'node', input_str, timeout, cwd=workdir), workdir)
+    except OSError:
         return {'success': False, 'output': '', 'error': "Node.js not found."}
@@ -0,0 +1,67 @@
+/*
+ * Launcher for participant programs (see utils/runner.py).
+ *
+ *   judge_exec <status_fd> <cpu_sec> <as_bytes> <nofile> <nproc> <fsize_bytes> -- cmd [args...]
+ *
+ * Applies the rlimits (0 = leave unchanged), forks and execs cmd, waits for it and writes
+ * "<wait status> <utime sec> <stime sec> <maxrss kb>\n" to status_fd.
+ *
+ * Forking from this small process keeps ru_maxrss honest: a child forked straight from the
+ * app server inherits the server's RSS high-water mark, which exec does not reset.
+ */
+#include <errno.h>
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+
+static void limit(int resource, const char *value, rlim_t hard_extra) {
+    rlim_t v = strtoull(value, NULL, 10);
+    if (v == 0) return;
+    struct rlimit rl = { v, v + hard_extra };
+    setrlimit(resource, &rl);
+}
+
+int main(int argc, char **argv) {
+    if (argc < 9 || strcmp(argv[7], "--") != 0) {
+        fprintf(stderr, "usage: judge_exec status_fd cpu as nofile nproc fsize -- cmd...\n");
+        return 126;
+    }
+    int status_fd = atoi(argv[1]);
+    fcntl(status_fd, F_SETFD, FD_CLOEXEC);
+
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        return 126;
+    }
+    if (pid == 0) {
+        limit(RLIMIT_CPU, argv[2], 1); /* SIGXCPU at the soft limit, SIGKILL one second later */
+        limit(RLIMIT_AS, argv[3], 0);
+        limit(RLIMIT_NOFILE, argv[4], 0);
+        limit(RLIMIT_NPROC, argv[5], 0);
+        limit(RLIMIT_FSIZE, argv[6], 0);
+        execvp(argv[8], argv + 8);
+        fprintf(stderr, "judge_exec: %s: %s\n", argv[8], strerror(errno));
+        _exit(127);
+    }
+
+    /* Only the program may hold the pipes, so the reader sees EOF when it exits */
+    int devnull = open("/dev/null", O_RDWR);
+    dup2(devnull, 0);
+    dup2(devnull, 1);
+    dup2(devnull, 2);
+
+    int status;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0) {
+        if (errno != EINTR) return 126;
+    }
+    dprintf(status_fd, "%d %ld.%06ld %ld.%06ld %ld\n", status,
+            (long)ru.ru_utime.tv_sec, (long)ru.ru_utime.tv_usec,
+            (long)ru.ru_stime.tv_sec, (long)ru.ru_stime.tv_usec, ru.ru_maxrss);
+    return 0;
+}
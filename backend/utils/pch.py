@@ -0,0 +1,187 @@
+import os
+import re
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+CPP_PCH_ENABLED = os.getenv('CPP_PCH', 'True') == 'True'
+CPP_PCH_DIR = os.getenv('CPP_PCH_DIR', os.path.join(tempfile.gettempdir(), 'marathon_pch'))
+
+# Header sets built at startup (in addition to whatever the question templates include).
+# Only these and the template prefixes ever get a PCH: participant code cannot add new ones
+DEFAULT_HEADER_SETS = {
+    'c': [
+        ['stdio.h'],
+        ['stdio.h', 'stdlib.h'],
+        ['stdio.h', 'string.h'],
+        ['stdio.h', 'stdlib.h', 'string.h'],
+    ],
+    'cpp': [
+        ['bits/stdc++.h'],
+        ['iostream'],
+        ['iostream', 'vector'],
+        ['iostream', 'vector', 'algorithm'],
+        ['iostream', 'string'],
+    ],
+}
+
+_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*<([^>]+)>\s*$')
+_SKIP_RE = re.compile(r'^\s*(//.*)?$')
+
+_versions = {}
+_building = set()
+_lock = threading.Lock()
+_allowed = {(lang, tuple(headers)) for lang, sets in DEFAULT_HEADER_SETS.items() for headers in sets}
+_builder = None # Single background build thread (per process), for allowed sets missing on disk
+_builder_pid = None
+
+
+def leading_system_includes(code):
+    """
+    The run of `#include <...>` lines at the top of the source (blank lines and
+    // comments allowed in between). Anything else ends the prefix.
+    """
+    headers = []
+    for line in code.splitlines():
+        m = _INCLUDE_RE.match(line)
+        if m:
+            headers.append(m.group(1).strip())
+        elif not _SKIP_RE.match(line):
+            break
+    return headers
+
+
+def _compiler_version(compiler):
+    with _lock:
+        if compiler in _versions:
+            return _versions[compiler]
+    try:
+        out = subprocess.run([compiler, '-dumpfullversion', '-dumpmachine'], capture_output=True, text=True, timeout=5).stdout
+    except Exception:
+        out = ''
+    with _lock:
+        _versions[compiler] = out.strip()
+    return _versions[compiler]
+
+
+def _pch_dir(compiler, flags, headers):
+    h = hashlib.sha256()
+    h.update(_compiler_version(compiler).encode())
+    h.update(b'\0' + compiler.encode() + b'\0' + ' '.join(flags).encode() + b'\0')
+    h.update('\n'.join(headers).encode())
+    return os.path.join(CPP_PCH_DIR, h.hexdigest()[:24])
+
+
+def build_pch(compiler, lang, flags, headers):
+    """Builds (once) the PCH for an include set. Returns the header path to pass to -include, or None."""
+    target = _pch_dir(compiler, flags, headers)
+    header = os.path.join(target, 'pch.h')
+    if os.path.exists(header + '.gch'):
+        return header
+
+    os.makedirs(CPP_PCH_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=CPP_PCH_DIR)
+    try:
+        with open(os.path.join(staging, 'pch.h'), 'w') as f:
+            f.write(''.join(f'#include <{name}>\n' for name in headers))
+        kind = 'c-header' if lang == 'c' else 'c++-header'
+        proc = subprocess.run(
+            [compiler] + flags + ['-x', kind, os.path.join(staging, 'pch.h'), '-o', os.path.join(staging, 'pch.h.gch')],
+            capture_output=True, text=True, timeout=60
+        )
+        if proc.returncode != 0:
+            logger.warning(f"PCH build failed for {headers}: {proc.stderr.strip()[:200]}")
+            return None
+        os.rename(staging, target)
+    except OSError:
+        pass # Another worker published it first (or the build could not run)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+    return header if os.path.exists(header + '.gch') else None
+
+
+def _submit_build(fn):
+    global _builder, _builder_pid
+    with _lock:
+        if _builder_pid != os.getpid():
+            _builder, _builder_pid = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pch-build'), os.getpid()
+        _builder.submit(fn)
+
+
+def allowed_prefix(lang, headers):
+    """The longest leading part of `headers` that is an allowed header set, or None."""
+    with _lock:
+        for n in range(len(headers), 0, -1):
+            if (lang, tuple(headers[:n])) in _allowed:
+                return list(headers[:n])
+    return None
+
+
+def pch_flags(code, lang, compiler, flags):
+    """
+    Extra compiler args that reuse a PCH for the longest allowed header set this source's
+    include prefix starts with. If that PCH is missing on disk it is rebuilt on the single
+    background builder and this compile proceeds without it.
+    """
+    if not CPP_PCH_ENABLED:
+        return []
+    headers = allowed_prefix(lang, leading_system_includes(code))
+    if not headers:
+        return []
+
+    header = os.path.join(_pch_dir(compiler, flags, headers), 'pch.h')
+    if os.path.exists(header + '.gch'):
+        # Same headers, same order as the start of the source - its own includes of them become no-ops
+        return ['-include', header]
+
+    key = (compiler, tuple(flags), tuple(headers))
+    with _lock:
+        if key in _building:
+            return []
+        _building.add(key)
+
+    def _build():
+        try:
+            build_pch(compiler, lang, flags, headers)
+        finally:
+            with _lock:
+                _building.discard(key)
+
+    _submit_build(_build)
+    return []
+
+
+def warm_up(flags, sources=()):
+    """
+    Startup step: build PCHs for the default header sets plus the include prefix of
+    every (language, source) pair given (e.g. the C/C++ question templates), and allow
+    those sets in pch_flags().
+    """
+    if not CPP_PCH_ENABLED:
+        return 0
+    wanted = set()
+    for lang, sets in DEFAULT_HEADER_SETS.items():
+        for headers in sets:
+            wanted.add((lang, tuple(headers)))
+    for lang, code in sources:
+        headers = leading_system_includes(code or '')
+        if headers:
+            wanted.add((lang, tuple(headers)))
+    with _lock:
+        _allowed.update(wanted)
+
+    built = 0
+    for lang, headers in sorted(wanted):
+        compiler = 'gcc' if lang == 'c' else 'g++'
+        if build_pch(compiler, lang, flags, list(headers)):
+            built += 1
+    logger.info(f"PCH warm-up: {built}/{len(wanted)} header sets ready")
+    return built
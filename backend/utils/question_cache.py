@@ -0,0 +1,95 @@
+import os
+import json
+import logging
+from db_connection import db_manager
+from utils.cache import LRUCache
+from utils.submission_service import expected_lines, test_case_digest, question_epoch
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+QUESTION_CACHE_SIZE = int(os.getenv('QUESTION_CACHE_SIZE', 1024))
+# Upper bound on judging against an edited question's old test cases on another machine
+QUESTION_CACHE_TTL = int(os.getenv('QUESTION_CACHE_TTL', 30))
+
+question_cache = LRUCache(QUESTION_CACHE_SIZE, QUESTION_CACHE_TTL)
+question_epoch.watch(question_cache) # Admin edits clear the cached questions of every worker on this host
+
+LANGUAGE_ALIASES = {
+    'gcc': 'c', 'g++': 'cpp', 'py': 'python', 'python3': 'python',
+    'jdk': 'java', 'js': 'javascript', 'node': 'javascript'
+}
+
+QUESTION_QUERY = """
+    SELECT q.question_id, q.round_id, q.test_input, q.expected_output, q.test_cases, q.points, r.allowed_language, r.round_number
+    FROM questions q
+    LEFT JOIN rounds r ON q.round_id = r.round_id
+    WHERE q.question_id = %s
+"""
+
+def normalize_language(language):
+    return LANGUAGE_ALIASES.get(language, language)
+
+def resolve_language(question, requested):
+    """The round's language when it has one (enforced strictly), else the requested one."""
+    return question['allowed_language'] or normalize_language(requested)
+
+def get_question(question_id):
+    """
+    Judge view of a question: {question_id, round_id, level, points, allowed_language, test_cases,
+    expected_lines, tc_digest}, or None if it does not exist. Served from the cache when
+    possible. The returned dict is shared between requests: treat it as read-only.
+    """
+    question_epoch.sync()
+    key = str(question_id)
+    entry = question_cache.get(key)
+    if entry is None:
+        entry = load_question(question_id)
+        if entry is not None:
+            question_cache.set(key, entry)
+    return entry
+
+def load_question(question_id):
+    q_res = db_manager.execute_query(QUESTION_QUERY, (question_id,))
+    if not q_res:
+        # Ids arrive as int or str depending on the client: retry with the other type
+        try:
+            alt_id = int(question_id) if str(question_id).isdigit() else str(question_id)
+            q_res = db_manager.execute_query(QUESTION_QUERY, (alt_id,))
+        except Exception as e:
+            logger.debug(f"Question {question_id} retry failed: {e}")
+    if not q_res:
+        return None
+
+    row = q_res[0]
+    test_cases = []
+    if row.get('test_input') is not None:
+        test_cases.append({'input': row['test_input'], 'expected': row['expected_output']})
+    elif row.get('test_cases'):
+        try:
+            tcs = json.loads(row['test_cases'])
+            test_cases = tcs if isinstance(tcs, list) else []
+        except (TypeError, ValueError):
+            pass
+
+    allowed = row.get('allowed_language')
+    return {
+        'question_id': row['question_id'],
+        'round_id': row.get('round_id'),
+        'level': row.get('round_number'), # participant_level_stats.level
+        'points': row.get('points'),
+        'allowed_language': normalize_language(allowed.lower()) if allowed else None,
+        'test_cases': test_cases,
+        'expected_lines': [expected_lines(str(tc.get('expected', ''))) for tc in test_cases],
+        'tc_digest': test_case_digest(test_cases)
+    }
+
+def invalidate_question(question_id):
+    """Called when a question is created, edited or deleted. Other workers drop their whole cache."""
+    question_cache.pop(str(question_id))
+    question_epoch.bump()
+
+def invalidate_all_questions():
+    """Called when a round changes (language) - affects every question in it."""
+    question_cache.clear()
+    question_epoch.bump()
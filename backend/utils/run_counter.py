@@ -0,0 +1,131 @@
+import os
+import atexit
+import logging
+import threading
+from collections import Counter
+from db_connection import db_manager
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# Seconds between flushes of the buffered Run counts (0 = write every Run straight through)
+RUN_COUNT_FLUSH_INTERVAL = float(os.getenv('RUN_COUNT_FLUSH_INTERVAL', 5))
+RUN_COUNT_FLUSH_BATCH = int(os.getenv('RUN_COUNT_FLUSH_BATCH', 500)) # Rows per multi-row upsert
+RUN_COUNT_MAX_ATTEMPTS = int(os.getenv('RUN_COUNT_MAX_ATTEMPTS', 3)) # Flushes a failing row gets before it is dropped
+
+LEVEL_KEY = ('user_id', 'contest_id', 'level')
+
+
+class RunCountBuffer:
+    """
+    Write-behind buffer for participant_level_stats.run_count.
+    Run presses are summed in memory per (user, contest, level) and written every
+    RUN_COUNT_FLUSH_INTERVAL seconds as batched multi-row upserts, so a burst of Runs on one
+    participant row costs one write instead of one per press. Counts are flushed at exit too.
+    A failed batch is retried row by row so one bad row cannot block the others; a row that
+    keeps failing is dropped after RUN_COUNT_MAX_ATTEMPTS flushes.
+    """
+
+    def __init__(self, interval, batch):
+        self.interval = interval
+        self.batch = max(1, batch)
+        self._pending = Counter()
+        self._attempts = {} # (user, contest, level) -> failed flushes so far
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._metrics = {'recorded': 0, 'flushes': 0, 'rows_written': 0, 'runs_written': 0, 'failures': 0, 'rejected': 0, 'dropped_runs': 0}
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so (re)start lazily inside each gunicorn worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending, self._attempts = Counter(), {} # The parent flushes its own counts
+            threading.Thread(target=self._flush_loop, name='run-count-flush', daemon=True).start()
+            self._pid = os.getpid()
+
+    def record(self, user_id, contest_id, level):
+        """Counts one Run press. Non-integer ids (unresolved usernames, bad client input) are ignored."""
+        try:
+            key = (int(user_id), int(contest_id), int(level))
+        except (TypeError, ValueError):
+            with self._lock:
+                self._metrics['rejected'] += 1
+            return
+        if self.interval <= 0:
+            self._write([(key, 1)])
+            return
+        self._ensure_started()
+        with self._lock:
+            self._pending[key] += 1
+            self._metrics['recorded'] += 1
+
+    def _flush_loop(self):
+        while not self._wakeup.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Writes every buffered count. Safe to call from any thread (and at exit)."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                rows = list(self._pending.items())
+                self._pending = Counter()
+                self._metrics['flushes'] += 1
+            for i in range(0, len(rows), self.batch):
+                self._write(rows[i:i + self.batch])
+
+    def _write(self, rows):
+        if self._upsert(rows):
+            return
+        if len(rows) > 1:
+            # One bad row (e.g. a deleted participant) fails the whole statement: retry row by row
+            for row in rows:
+                self._write([row])
+            return
+        key, count = rows[0]
+        with self._lock:
+            attempts = self._attempts.pop(key, 0) + 1
+            if self.interval > 0 and attempts < RUN_COUNT_MAX_ATTEMPTS:
+                self._attempts[key] = attempts
+                self._pending[key] += count # Retried with the next flush
+                return
+            self._metrics['dropped_runs'] += count
+        logger.warning(f"Dropped {count} run count(s) of {dict(zip(LEVEL_KEY, key))} after {attempts} failed write(s)")
+
+    def _upsert(self, rows):
+        query = db_manager.increment_upsert_sql('participant_level_stats', LEVEL_KEY, ('run_count',), rows=len(rows))
+        params = tuple(v for (user_id, contest_id, level), count in rows for v in (user_id, contest_id, level, count))
+        try:
+            ok = db_manager.execute_update(query, params)
+        except Exception as e:
+            logger.warning(f"Run count flush failed: {e}")
+            ok = False
+        with self._lock:
+            if not ok:
+                self._metrics['failures'] += 1
+                return False
+            for key, _ in rows:
+                self._attempts.pop(key, None)
+            self._metrics['rows_written'] += len(rows)
+            self._metrics['runs_written'] += sum(count for _, count in rows)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'interval': self.interval,
+                'pending_rows': len(self._pending),
+                'pending_runs': sum(self._pending.values()),
+                'retrying_rows': len(self._attempts),
+                **self._metrics
+            }
+
+
+run_counter = RunCountBuffer(RUN_COUNT_FLUSH_INTERVAL, RUN_COUNT_FLUSH_BATCH)
+atexit.register(run_counter.flush)
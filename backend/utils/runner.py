@@ -0,0 +1,300 @@
+import os
+import time
+import shutil
+import signal
+import hashlib
+import logging
+import resource
+import tempfile
+import selectors
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# Hard per-run limits applied to every child process that executes participant code
+RUN_LIMITS = os.getenv('RUN_LIMITS', 'True') == 'True'
+RUN_CPU_SEC = int(os.getenv('RUN_CPU_SEC', 3))
+RUN_MEMORY_MB = int(os.getenv('RUN_MEMORY_MB', 256))
+RUN_MAX_FILES = int(os.getenv('RUN_MAX_FILES', 64))
+RUN_MAX_FILE_MB = int(os.getenv('RUN_MAX_FILE_MB', 16))
+# Cap per stream (stdout / stderr) on what is read back from a run; beyond it the run is killed
+RUN_MAX_OUTPUT_KB = int(os.getenv('RUN_MAX_OUTPUT_KB', 1024))
+# RLIMIT_NPROC counts every task of the server's uid (app threads included), so keep headroom
+RUN_MAX_PROCS = int(os.getenv('RUN_MAX_PROCS', 1024))
+
+# Runtimes that reserve large virtual address ranges at boot: their heap is capped with
+# runtime flags (see memory_flags) instead of RLIMIT_AS
+NO_AS_LIMIT = {'java', 'node'}
+
+LAUNCHER_SOURCE = os.path.join(os.path.dirname(__file__), 'native', 'judge_exec.c')
+
+_launcher = None # Path of the built launcher, '' when it cannot be built
+_launcher_lock = threading.Lock()
+
+
+def limit_values(kind):
+    """Per-run limits for `kind` ('python', 'node', 'java', 'native'); 0 = not limited."""
+    if not RUN_LIMITS:
+        return {'cpu': 0, 'as': 0, 'nofile': 0, 'nproc': 0, 'fsize': 0}
+    return {
+        'cpu': RUN_CPU_SEC,
+        'as': 0 if kind in NO_AS_LIMIT else RUN_MEMORY_MB * 1024 * 1024,
+        'nofile': RUN_MAX_FILES,
+        'nproc': RUN_MAX_PROCS,
+        'fsize': RUN_MAX_FILE_MB * 1024 * 1024,
+    }
+
+
+def rlimits(kind):
+    """[(resource, (soft, hard))] for a run of `kind`."""
+    v = limit_values(kind)
+    limits = [
+        (resource.RLIMIT_CPU, (v['cpu'], v['cpu'] + 1)), # SIGXCPU, then SIGKILL
+        (resource.RLIMIT_AS, (v['as'], v['as'])),
+        (resource.RLIMIT_NOFILE, (v['nofile'], v['nofile'])),
+        (resource.RLIMIT_NPROC, (v['nproc'], v['nproc'])),
+        (resource.RLIMIT_FSIZE, (v['fsize'], v['fsize'])),
+    ]
+    return [(res, value) for res, value in limits if value[0]]
+
+
+def _build_launcher():
+    """Compiles judge_exec.c once per source revision. Returns its path, or None."""
+    with open(LAUNCHER_SOURCE, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), f'marathon_judge_exec_{digest}')
+    if os.path.exists(path):
+        return path
+
+    staging = f'{path}.{os.getpid()}.tmp'
+    try:
+        proc = subprocess.run(['gcc', '-O2', '-o', staging, LAUNCHER_SOURCE], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not build judge_exec launcher: {e}")
+        return None
+    if proc.returncode != 0:
+        logger.warning(f"Could not build judge_exec launcher: {proc.stderr.strip()[:200]}")
+        return None
+    os.replace(staging, path)
+    return path
+
+
+def launcher_path():
+    global _launcher
+    if _launcher is None:
+        with _launcher_lock:
+            if _launcher is None:
+                _launcher = _build_launcher() or ''
+    return _launcher or None
+
+
+def apply_rlimits(limits):
+    for res, value in limits:
+        try:
+            resource.setrlimit(res, value)
+        except (ValueError, OSError):
+            pass # Never raise above the inherited hard limit
+
+
+def limit_preexec(kind):
+    """preexec_fn for subprocess: applies the rlimits inside the child, before exec."""
+    limits = rlimits(kind)
+    if not limits:
+        return None
+    return lambda: apply_rlimits(limits)
+
+
+def memory_flags(kind):
+    """Heap caps for runtimes exempt from RLIMIT_AS."""
+    if not RUN_LIMITS:
+        return []
+    if kind == 'node':
+        return [f'--max-old-space-size={RUN_MEMORY_MB}']
+    if kind == 'java':
+        return [f'-Xmx{RUN_MEMORY_MB}m']
+    return []
+
+
+def pump(stdin_fd, stdout_fd, stderr_fd, input_bytes, timeout, max_output=None):
+    """
+    Feeds stdin and drains stdout/stderr concurrently until both hit EOF, the timeout, or
+    either stream exceeds max_output bytes (default RUN_MAX_OUTPUT_KB). Closes all three fds.
+    Returns: (stdout_bytes, stderr_bytes, timed_out, output_exceeded)
+    """
+    if max_output is None:
+        max_output = RUN_MAX_OUTPUT_KB * 1024
+    sel = selectors.DefaultSelector()
+    out, err = [], []
+    received = {stdout_fd: 0, stderr_fd: 0}
+    pending = memoryview(input_bytes)
+    if pending:
+        os.set_blocking(stdin_fd, False)
+        sel.register(stdin_fd, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_fd)
+    sel.register(stdout_fd, selectors.EVENT_READ, out)
+    sel.register(stderr_fd, selectors.EVENT_READ, err)
+
+    deadline = time.monotonic() + timeout
+    timed_out = output_exceeded = False
+    try:
+        while sel.get_map() and not output_exceeded:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in sel.select(remaining):
+                if key.fd == stdin_fd:
+                    try:
+                        written = os.write(stdin_fd, pending[:65536])
+                        pending = pending[written:]
+                    except BrokenPipeError:
+                        pending = pending[:0]
+                    if not pending:
+                        sel.unregister(stdin_fd)
+                        os.close(stdin_fd)
+                    continue
+                chunk = os.read(key.fd, 65536)
+                if chunk:
+                    received[key.fd] += len(chunk)
+                    if received[key.fd] > max_output:
+                        output_exceeded = True # Stop reading now: the caller kills the run
+                        break
+                    key.data.append(chunk)
+                else:
+                    sel.unregister(key.fd)
+                    os.close(key.fd)
+    finally:
+        for key in list(sel.get_map().values()):
+            sel.unregister(key.fd)
+            os.close(key.fd)
+        sel.close()
+    return b''.join(out), b''.join(err), timed_out, output_exceeded
+
+
+def spawn(cmd, kind, pass_fds=(), cwd=None):
+    """
+    Starts `cmd` under the limits for `kind`, in its own process group (and in `cwd`, if given) -
+    through the judge_exec launcher when available, else with a preexec_fn.
+    Returns: (proc, (stdin_w, stdout_r, stderr_r), status_r) - hand all three to collect().
+    """
+    if shutil.which(cmd[0]) is None:
+        raise FileNotFoundError(cmd[0])
+
+    stdin_r, stdin_w = os.pipe()
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    status_r = status_w = None
+    launcher = launcher_path()
+    preexec = None
+    if launcher:
+        status_r, status_w = os.pipe()
+        v = limit_values(kind)
+        cmd = [launcher, str(status_w), str(v['cpu']), str(v['as']), str(v['nofile']), str(v['nproc']), str(v['fsize']), '--'] + cmd
+        pass_fds = tuple(pass_fds) + (status_w,)
+    else:
+        preexec = limit_preexec(kind)
+    try:
+        proc = subprocess.Popen(
+            cmd, stdin=stdin_r, stdout=out_w, stderr=err_w, pass_fds=pass_fds, cwd=cwd,
+            preexec_fn=preexec, start_new_session=True
+        )
+    except Exception:
+        for fd in (stdin_w, out_r, err_r, status_r):
+            if fd is not None:
+                os.close(fd)
+        raise
+    finally:
+        for fd in (stdin_r, out_w, err_w, status_w):
+            if fd is not None:
+                os.close(fd)
+    return proc, (stdin_w, out_r, err_r), status_r
+
+
+def wait_exit(pid, deadline):
+    """
+    Blocks until child `pid` exits or `deadline` (time.monotonic()) passes, without reaping it.
+    Returns True if it exited. Sleeps on a pidfd where the kernel has them (Linux 5.3+).
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    if pidfd is not None:
+        try:
+            with selectors.DefaultSelector() as sel:
+                sel.register(pidfd, selectors.EVENT_READ)
+                return bool(sel.select(max(0, deadline - time.monotonic())))
+        finally:
+            os.close(pidfd)
+    # No pidfd: poll, backing off so a long-running program costs few wakeups
+    delay = 0.0005
+    while os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+    return True
+
+
+def collect(proc, fds, status_r, input_str, timeout, warnings=None):
+    """
+    Feeds the input, waits for the process (killing its whole group on timeout) and
+    records the program's CPU time and peak RSS. Returns a judge result dict.
+    """
+    deadline = time.monotonic() + timeout
+    stdout, stderr, timed_out, output_exceeded = pump(*fds, input_str.encode('utf-8'), timeout)
+    # Output closed; the process still has the rest of its time slot to exit
+    if not (timed_out or output_exceeded) and not wait_exit(proc.pid, deadline):
+        timed_out = True
+    # The leader is not reaped yet, so the group id is still ours: no background child outlives the run
+    kill_group(proc.pid)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    if status_r is None:
+        # Forked straight from this server: ru_maxrss would report the server's own peak
+        exit_code, cpu_time, max_rss_kb = proc.returncode, usage.ru_utime + usage.ru_stime, None
+    else:
+        report = os.read(status_r, 256).split()
+        os.close(status_r)
+        if len(report) == 4:
+            exit_code = os.waitstatus_to_exitcode(int(report[0]))
+            cpu_time, max_rss_kb = float(report[1]) + float(report[2]), int(report[3])
+        else:
+            exit_code, cpu_time, max_rss_kb = -signal.SIGKILL, None, None # Launcher killed (timeout / output cap)
+
+    return make_result(
+        exit_code, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace'),
+        timed_out, cpu_time, max_rss_kb, warnings, output_exceeded
+    )
+
+
+def run_limited(cmd, kind, input_str, timeout, warnings=None, cwd=None):
+    proc, fds, status_r = spawn(cmd, kind, cwd=cwd)
+    return collect(proc, fds, status_r, input_str, timeout, warnings)
+
+
+def kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def make_result(exit_code, stdout, stderr, timed_out, cpu_time, max_rss_kb, warnings=None, output_exceeded=False):
+    """Maps an exit status (plus limit signals) to the judge's result dict."""
+    usage = {'cpu_time': round(cpu_time, 4) if cpu_time is not None else None, 'max_rss_kb': max_rss_kb}
+    if output_exceeded:
+        return {'success': False, 'output': '', 'error': "Output Limit Exceeded", 'warnings': warnings, **usage}
+    cpu_exceeded = exit_code == -signal.SIGXCPU or (exit_code == -signal.SIGKILL and (cpu_time or 0) >= RUN_CPU_SEC)
+    if timed_out or cpu_exceeded:
+        return {'success': False, 'output': '', 'error': "Time Limit Exceeded", 'warnings': warnings, **usage}
+    if exit_code == -signal.SIGXFSZ:
+        return {'success': False, 'output': '', 'error': "Output Limit Exceeded", 'warnings': warnings, **usage}
+    if exit_code != 0:
+        return {'success': False, 'output': stdout, 'error': stderr or "Runtime Error", 'warnings': warnings, **usage}
+    return {'success': True, 'output': stdout, 'error': None, 'warnings': warnings, **usage}
@@ -0,0 +1,119 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# RAM-backed by default: sources, binaries and any files a program writes never touch a disk
+SANDBOX_DIR = os.getenv('SANDBOX_DIR') or (
+    '/dev/shm/marathon_sandbox' if os.access('/dev/shm', os.W_OK) else os.path.join(tempfile.gettempdir(), 'marathon_sandbox')
+)
+SANDBOX_POOL_SIZE = int(os.getenv('SANDBOX_POOL_SIZE', 16)) # Idle working directories kept per worker process
+
+
+class SandboxPool:
+    """
+    Pool of pre-created working directories under SANDBOX_DIR, recycled between runs.
+    A released directory is emptied (not deleted) and handed to the next run, so a run costs
+    a few unlinks instead of mkdtemp + rmtree. Each process owns <root>/<pid>/: gunicorn
+    workers forked from one master never share directories, and the trees of dead
+    processes are swept when a new process starts using the pool.
+    """
+
+    def __init__(self, root, size):
+        self.root = root
+        self.size = max(0, size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._seq = 0
+        self._counters = {'created': 0, 'reused': 0, 'discarded': 0, 'in_use': 0}
+
+    def _ensure_started(self):
+        # Per-process state: a forked worker must not reuse its parent's directories
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._idle = []
+        self._seq = 0
+        self._counters['in_use'] = 0
+        self.base = os.path.join(self.root, str(self._pid))
+        shutil.rmtree(self.base, ignore_errors=True) # Left by an earlier process with the same pid
+        os.makedirs(self.base, exist_ok=True)
+        self._sweep()
+        for _ in range(self.size):
+            self._idle.append(self._create())
+
+    def _sweep(self):
+        for name in os.listdir(self.root):
+            if not name.isdigit() or int(name) == self._pid:
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            except PermissionError:
+                pass # Alive, owned by someone else
+
+    def _create(self):
+        self._seq += 1
+        path = os.path.join(self.base, f'w{self._seq}')
+        os.mkdir(path, 0o700)
+        self._counters['created'] += 1
+        return path
+
+    def acquire(self):
+        """Returns an empty working directory reserved for the caller."""
+        with self._lock:
+            self._ensure_started()
+            self._counters['in_use'] += 1
+            if self._idle:
+                self._counters['reused'] += 1
+                return self._idle.pop()
+            return self._create()
+
+    def release(self, path):
+        """Empties `path` and returns it to the pool (or deletes it when the pool is full or the reset fails)."""
+        clean = self._reset(path)
+        with self._lock:
+            self._counters['in_use'] -= 1
+            if clean and len(self._idle) < self.size and os.path.dirname(path) == self.base:
+                self._idle.append(path)
+                return
+            self._counters['discarded'] += 1
+        shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _reset(path):
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
+            return True
+        except OSError as e:
+            # e.g. the program chmod-ed a subdirectory: drop the whole directory instead
+            logger.warning(f"Sandbox reset failed for {path}: {e}")
+            return False
+
+    @contextmanager
+    def workdir(self):
+        """`with sandbox_pool.workdir() as path:` - drop-in for tempfile.TemporaryDirectory()."""
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def stats(self):
+        with self._lock:
+            return {'root': self.root, 'idle': len(self._idle), 'pool_size': self.size, **self._counters}
+
+
+sandbox_pool = SandboxPool(SANDBOX_DIR, SANDBOX_POOL_SIZE)
@@ -0,0 +1,197 @@
+import io
+import os
+import re
+import ast
+import hashlib
+import tokenize
+from utils.cache import LRUCache
+
+# === CONFIGURATION ===
+SECURITY_SCAN_CACHE_SIZE = int(os.getenv('SECURITY_SCAN_CACHE_SIZE', 4096)) # Verdicts kept per worker, keyed by source hash
+
+# Shell-style commands, blocked in every language (case-insensitive)
+GLOBAL_BLOCKLIST = ['rm -rf', 'wget', 'curl', 'shutdown', 'reboot']
+
+# Keyword scan for Python sources the AST check cannot parse
+PYTHON_BLOCKLIST = [
+    'import os', 'from os', 'import subprocess', 'import sys', 'import pty', 'import shutil',
+    'import requests', 'import urllib', 'import socket', 'import multiprocessing', 'import threading',
+    'open(', 'exec(', 'eval(', '__import__', 'os.system', 'os.popen', 'os.walk', 'os.remove',
+    'subprocess.run', 'subprocess.Popen', 'sys.modules'
+]
+JS_BLOCKLIST = [
+    'require("child_process")', "require('child_process')",
+    'require("fs")', "require('fs')",
+    'require("net")', "require('net')",
+    'require("http")', "require('http')",
+    'process.env', 'process.kill', 'process.exit', 'exec(', 'spawn('
+]
+C_BLOCKLIST = ['system(', 'fork(', 'popen(', 'execl(', 'execv(', 'remove(', 'rename(', 'fopen(', 'socket(']
+
+# AST rules for Python: modules that may not be imported, names that may not be referenced
+PYTHON_BLOCKED_MODULES = {
+    'os', 'subprocess', 'sys', 'pty', 'shutil', 'requests', 'urllib', 'socket', 'multiprocessing', 'threading'
+}
+PYTHON_BLOCKED_NAMES = {'open', 'exec', 'eval', '__import__'}
+
+
+def _trie_regex(words):
+    """Alternation of `words` factored by common prefixes (far less backtracking than a flat a|b|c)."""
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(node[ch]) for ch in sorted(k for k in node if k)]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(root)
+
+
+class PatternSet:
+    """
+    Every blocked keyword of a language compiled into one prefix-factored regex, so a
+    source is scanned in a single pass however long the list is. The scan runs over the
+    lowercased source; case-sensitive keywords are then confirmed against the original.
+    """
+
+    def __init__(self, keywords, message, ignore_case=()):
+        self.message = message # keyword -> error message
+        self._keywords = {} # lowercased keyword -> [(keyword, case_insensitive)]
+        for k, folded in [(k, True) for k in ignore_case] + [(k, False) for k in keywords]:
+            self._keywords.setdefault(k.lower(), []).append((k, folded))
+        self._regex = re.compile(_trie_regex(self._keywords))
+
+    def search(self, text):
+        """Returns the error message of the first blocked keyword in `text`, or None."""
+        lowered = text.lower()
+        pos = 0
+        while True:
+            m = self._regex.search(lowered, pos)
+            if not m:
+                return None
+            for keyword, folded in self._keywords[m.group(0)]:
+                if folded or text[m.start():m.end()] == keyword:
+                    return self.message(keyword)
+            pos = m.start() + 1
+
+
+def _global_message(k):
+    return f"Security Violation: '{k}' is prohibited."
+
+def _usage_message(k):
+    return f"Security Violation: usage of '{k}' is prohibited."
+
+def _language_set(keywords, message):
+    return PatternSet(keywords, lambda k: _global_message(k) if k in GLOBAL_BLOCKLIST else message(k), GLOBAL_BLOCKLIST)
+
+GLOBAL_PATTERNS = PatternSet([], _global_message, GLOBAL_BLOCKLIST)
+PYTHON_PATTERNS = _language_set(PYTHON_BLOCKLIST, _usage_message)
+LANGUAGE_PATTERNS = {
+    'javascript': _language_set(JS_BLOCKLIST, _usage_message),
+    'c': _language_set(C_BLOCKLIST, lambda k: f"Security Violation: system call '{k}' is prohibited."),
+}
+LANGUAGE_PATTERNS['nodejs'] = LANGUAGE_PATTERNS['node'] = LANGUAGE_PATTERNS['javascript']
+LANGUAGE_PATTERNS['cpp'] = LANGUAGE_PATTERNS['c']
+
+# Python sources containing none of these words (nor a global keyword) cannot break a rule: no parse needed
+PYTHON_PREFILTER = re.compile(r'\b' + _trie_regex(sorted(PYTHON_BLOCKED_MODULES | PYTHON_BLOCKED_NAMES)) + r'\b')
+
+scan_cache = LRUCache(SECURITY_SCAN_CACHE_SIZE)
+
+
+def scan(code, language):
+    """
+    Scans the user code for blocked patterns. Verdicts are cached by (language, source hash),
+    so re-running unchanged code skips the scan.
+    Returns: (is_safe: bool, error_message: str)
+    """
+    key = (language, hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest())
+    verdict = scan_cache.get(key)
+    if verdict is None:
+        verdict = _scan(code, language)
+        scan_cache.set(key, verdict)
+    return verdict
+
+
+def _scan(code, language):
+    if language == 'python':
+        error = _scan_python(code)
+    elif language in LANGUAGE_PATTERNS:
+        error = LANGUAGE_PATTERNS[language].search(code)
+    else:
+        error = GLOBAL_PATTERNS.search(code)
+    return (False, error) if error else (True, None)
+
+
+def _scan_python(code):
+    """
+    Checks what the code does rather than what it contains: blocked imports and names are
+    looked up in the AST, so comments and string literals never trigger a violation.
+    """
+    if not PYTHON_PREFILTER.search(code) and not GLOBAL_PATTERNS.search(code):
+        return None
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        # Does not parse here (possibly newer syntax than the server's interpreter):
+        # keyword scan over the tokens, still skipping comments and plain strings
+        return PYTHON_PATTERNS.search(_python_code_text(code))
+
+    identifiers = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                root = alias.name.split('.')[0]
+                if root in PYTHON_BLOCKED_MODULES:
+                    return _usage_message(f'import {root}')
+                identifiers.append(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            root = (node.module or '').split('.')[0]
+            if node.level == 0 and root in PYTHON_BLOCKED_MODULES:
+                return _usage_message(f'from {root}')
+            identifiers.append(node.module or '')
+        elif isinstance(node, ast.Name):
+            if node.id in PYTHON_BLOCKED_NAMES:
+                return _usage_message(node.id)
+            identifiers.append(node.id)
+        elif isinstance(node, ast.Attribute):
+            if node.attr in PYTHON_BLOCKED_NAMES:
+                return _usage_message(node.attr)
+            identifiers.append(node.attr)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            identifiers.append(node.name)
+        elif isinstance(node, ast.arg):
+            identifiers.append(node.arg)
+    # Shell keywords only count as code here, i.e. inside identifiers
+    return GLOBAL_PATTERNS.search('\n'.join(identifiers))
+
+
+def _python_code_text(code):
+    """The source with comments and plain string literals blanked out (f-strings are kept: they hold code)."""
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code
+    lines = code.splitlines(keepends=True)
+    blank = [
+        (tok.start, tok.end) for tok in tokens
+        if tok.type == tokenize.COMMENT
+        or (tok.type == tokenize.STRING and 'f' not in re.match(r'[A-Za-z]*', tok.string).group(0).lower())
+    ]
+    for (srow, scol), (erow, ecol) in reversed(blank):
+        if srow == erow:
+            line = lines[srow - 1]
+            lines[srow - 1] = line[:scol] + ' ' * (ecol - scol) + line[ecol:]
+        else:
+            lines[srow - 1] = lines[srow - 1][:scol] + '\n'
+            for row in range(srow, erow - 1):
+                lines[row] = '\n'
+            lines[erow - 1] = ' ' * ecol + lines[erow - 1][ecol:]
+    return ''.join(lines)
@@ -0,0 +1,356 @@
+import os
+import re
+import logging
+import json
+import time
+import hashlib
+import itertools
+import tempfile
+from db_connection import db_manager
+from utils.cache import LRUCache, SharedEpoch
+from utils.logic import SKIPPED_CASE_ERROR, execute_code_batch
+
+logger = logging.getLogger(__name__)
+
+# === Verdict Memoization ===
+# Judge results for byte-identical submissions against the same test cases.
+VERDICT_CACHE_SIZE = int(os.getenv('VERDICT_CACHE_SIZE', 2048))
+VERDICT_CACHE_TTL = int(os.getenv('VERDICT_CACHE_TTL', 3600))
+# Replaced on every question edit: the other workers on this host drop their memoized verdicts
+# and cached questions (utils/question_cache.py) before their next lookup
+QUESTION_EPOCH_FILE = os.getenv('QUESTION_EPOCH_FILE', os.path.join(tempfile.gettempdir(), 'marathon_question_epoch'))
+
+verdict_cache = LRUCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL)
+question_epoch = SharedEpoch(QUESTION_EPOCH_FILE)
+question_epoch.watch(verdict_cache)
+
+# Remote verdict polling (judge queues without a completion signal): first re-check, backoff cap
+VERDICT_POLL_INTERVAL = float(os.getenv('VERDICT_POLL_INTERVAL', 0.25))
+VERDICT_POLL_MAX_INTERVAL = float(os.getenv('VERDICT_POLL_MAX_INTERVAL', 2))
+
+# Fail-fast: stop judging a submission at its first failing test case
+JUDGE_FAIL_FAST = os.getenv('JUDGE_FAIL_FAST', 'False') == 'True'
+
+# Outcomes that depend on load or the host, not on the code: never memoized
+TRANSIENT_ERRORS = {
+    "Time Limit Exceeded", "Internal Execution Error", "Compiler not found or failed.",
+    "Java Compiler not found.", "Node.js not found.", SKIPPED_CASE_ERROR
+}
+
+def test_case_digest(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def verdict_cache_key(question_id, inputs, language, code, tc_digest=None):
+    """
+    (question id, test-case digest, language, source hash). The digest covers inputs and
+    expected outputs, so an edited question never matches verdicts from its old version.
+    `tc_digest` (precomputed by the question cache) saves hashing the test cases again.
+    """
+    tc_digest = tc_digest or test_case_digest(inputs)
+    code_digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    return (str(question_id), tc_digest, language, code_digest)
+
+def get_cached_results(key):
+    question_epoch.sync()
+    return verdict_cache.get(key)
+
+def remember_results(key, results):
+    if any(r.get('error') in TRANSIENT_ERRORS for r in results):
+        return
+    verdict_cache.set(key, results)
+
+def invalidate_question_verdicts(question_id):
+    """Called when a question is edited or deleted. Other workers drop all their verdicts."""
+    removed = verdict_cache.invalidate(lambda key: key[0] == str(question_id))
+    question_epoch.bump()
+    return removed
+
+# Same line boundaries as str.splitlines()
+_LINE_RE = re.compile(r'[^\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]+')
+
+def _content_lines(s):
+    """Lazily yields the stripped, non-blank lines of `s`."""
+    for m in _LINE_RE.finditer(s or ''):
+        line = m.group().strip()
+        if line:
+            yield line
+
+def expected_lines(expected):
+    """Normalized form of an expected output, as compared by outputs_match()."""
+    return tuple(_content_lines(expected))
+
+def outputs_match(actual, expected):
+    """
+    Line-by-line comparison ignoring surrounding whitespace and blank lines.
+    Stops at the first mismatching line, without building line lists of either output.
+    `expected` is the raw expected output or its expected_lines() form.
+    """
+    missing = object()
+    exp = expected if isinstance(expected, tuple) else _content_lines(expected)
+    for a, e in itertools.zip_longest(_content_lines(actual), exp, fillvalue=missing):
+        if a != e:
+            return False
+    return True
+
+def case_passed(tc, res, expected=None):
+    """`expected`: the case's expected_lines(), when already known."""
+    return bool(res['success']) and outputs_match(res['output'], expected if expected is not None else str(tc.get('expected', '')))
+
+def fail_fast_predicate(inputs, expected=None):
+    """The judge's `stop` callback when JUDGE_FAIL_FAST is on, else None."""
+    if not JUDGE_FAIL_FAST:
+        return None
+    return lambda index, res: not case_passed(inputs[index], res, expected[index] if expected else None)
+
+def grade_test_cases(inputs, results, expected=None):
+    """
+    Compares judge results with the expected outputs (`expected`: optional per-case expected_lines()).
+    Returns: (all_passed: bool, test_results: list)
+    """
+    all_passed = True
+    test_results = []
+
+    for i, (tc, res) in enumerate(zip(inputs, results)):
+        inp = str(tc.get('input', ''))
+        exp = str(tc.get('expected', '')).replace('\r\n', '\n').strip()
+
+        if res['success']:
+            actual = res['output'].replace('\r\n', '\n').strip()
+        else:
+            actual = ""
+
+        passed = case_passed(tc, res, expected[i] if expected else None)
+
+        if not passed: all_passed = False
+
+        test_results.append({
+            'input': inp, 'expected': exp, 'output': actual, 'passed': passed,
+            'error': res['error'] if not res['success'] else None,
+            'warnings': res.get('warnings'),
+            'cpu_time': res.get('cpu_time'),
+            'memory_kb': res.get('max_rss_kb')
+        })
+
+    return all_passed, test_results
+
+def collect_warnings(test_results):
+    warnings = list(set([r['warnings'] for r in test_results if r.get('warnings')]))
+    return "\n".join(warnings) if warnings else None
+
+def emit_event(event, payload, to=None):
+    """
+    Socket.IO emit that never fails the caller. A judge-only worker without
+    SOCKETIO_MESSAGE_QUEUE has no client connections; participants then get the
+    verdict from the polling endpoint instead. `to`: a room instead of every client.
+    """
+    from extensions import socketio
+    try:
+        socketio.emit(event, payload, to=to)
+    except Exception as e:
+        logger.debug(f"Socket.IO emit '{event}' skipped: {e}")
+
+def user_room(uid):
+    """Private Socket.IO room of one participant (by numeric user id)."""
+    return f"user:{uid}"
+
+def user_room_for_token(token):
+    """Room a Socket.IO connection joins on connect, from its login token (None if invalid)."""
+    import jwt
+    from config import Config
+    from utils.identity import resolve_user_id
+    if not token:
+        return None
+    try:
+        username = jwt.decode(token, Config.SECRET_KEY, algorithms=["HS256"])['sub']
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+    uid = resolve_user_id(username)
+    return user_room(uid) if uid else None
+
+# Adds one correct submission to its level's counters. Applied in the same transaction as the
+# submission write, so the counters never drift from `submissions` (reconcile_scores.py checks).
+# The upsert syntax differs per database, so the active manager builds it.
+SCORE_INCREMENT_QUERY = db_manager.increment_upsert_sql(
+    'participant_level_stats', ('user_id', 'contest_id', 'level'), ('questions_solved', 'level_score')
+)
+
+def score_increment(uid, contest_id, level, score):
+    return (SCORE_INCREMENT_QUERY, (uid, contest_id, level, 1, score))
+
+def apply_score_increment(uid, contest_id, level, score):
+    """
+    Runs the increment inside the caller's unit of work, behind a savepoint: if it fails the
+    submission write around it still commits and the counters are left to reconcile_scores.py.
+    """
+    with db_manager.savepoint() as sp:
+        if not db_manager.execute_update(*score_increment(uid, contest_id, level, score)):
+            sp['ok'] = False
+    if not sp['ok']:
+        logger.error(f"Level counters of user {uid} (contest {contest_id}, level {level}) not updated; run reconcile_scores.py")
+    return sp['ok']
+
+def announce_correct_submission(uid, user_id, contest_id, question_id):
+    """Real-time broadcast after a correct submission has been stored."""
+    emit_event('admin:stats_update', {'user_id': uid, 'contest_id': contest_id})
+    emit_event('participant:submitted', {
+        'participant_id': uid,
+        'name': user_id,
+        'question': f"Q{question_id}",
+        'contest_id': contest_id
+    })
+    emit_event('leaderboard:update', {'contest_id': contest_id})
+
+# === Async Submission Lifecycle (queued -> running -> evaluated) ===
+
+def create_queued_submission(uid, contest_id, question, code):
+    """Inserts the 'queued' submission row. Returns its submission_id, or None on failure."""
+    save_query = """
+        INSERT INTO submissions
+        (user_id, contest_id, round_id, question_id, submitted_code, status, is_correct, score_awarded)
+        VALUES (%s, %s, %s, %s, %s, 'queued', FALSE, 0)
+    """
+    return db_manager.execute_insert(save_query, (uid, contest_id, question.get('round_id'), question['question_id'], code), 'submission_id')
+
+def discard_queued_submission(submission_id):
+    db_manager.execute_update("DELETE FROM submissions WHERE submission_id=%s AND status='queued'", (submission_id,))
+
+def mark_submission_running(submission_id):
+    db_manager.execute_update("UPDATE submissions SET status='running' WHERE submission_id=%s AND status <> 'evaluated'", (submission_id,))
+
+def finish_async_submission(submission_id, uid, user_id, contest_id, level, question, inputs, results, started_at):
+    """
+    Judge-worker callback: grades the results, stores the verdict and pushes it as a
+    'submission:verdict' event to the participant's own Socket.IO room (see user_room).
+    """
+    all_passed, test_results = grade_test_cases(inputs, results)
+    score = float(question.get('points') or 10.0) if all_passed else 0.0
+    duration = int(time.time() - started_at)
+
+    with db_manager.unit_of_work():
+        saved = db_manager.execute_update(
+            "UPDATE submissions SET status='evaluated', is_correct=%s, test_results=%s, score_awarded=%s, time_taken_seconds=%s "
+            "WHERE submission_id=%s AND status <> 'evaluated'",
+            (all_passed, json.dumps(test_results), score, duration, submission_id)
+        )
+        first = bool(saved) and saved.get('affected') == 1
+        if first and all_passed:
+            apply_score_increment(uid, contest_id, level, score)
+    if not saved:
+        raise RuntimeError(f"Verdict of submission {submission_id} could not be saved")
+    if not first:
+        # Queue delivery is at-least-once: a requeued job may finish a submission twice.
+        # Only the first finish counts; later ones return the stored verdict unchanged
+        logger.info(f"Submission {submission_id} was already evaluated; duplicate finish ignored")
+        return get_submission_verdict(submission_id, uid)
+
+    if all_passed:
+        announce_correct_submission(uid, user_id, contest_id, question['question_id'])
+
+    verdict = build_verdict(submission_id, question['question_id'], 'evaluated', all_passed, score, test_results, duration)
+    emit_event('submission:verdict', verdict, to=user_room(uid))
+    return verdict
+
+def fail_async_submission(submission_id, uid, question_id, error):
+    logger.error(f"Async submission {submission_id} failed: {error}")
+    res = db_manager.execute_update("UPDATE submissions SET status='failed' WHERE submission_id=%s AND status <> 'evaluated'", (submission_id,))
+    if res and res.get('affected') == 0:
+        return # Already evaluated by an earlier delivery of the same job
+    emit_event('submission:verdict', {
+        'submission_id': submission_id, 'question_id': question_id, 'status': 'failed',
+        'success': False, 'message': 'Evaluation failed. Please resubmit.'
+    }, to=user_room(uid))
+
+def build_verdict(submission_id, question_id, status, all_passed, score, test_results, duration):
+    return {
+        'submission_id': submission_id,
+        'question_id': question_id,
+        'status': status,
+        'success': bool(all_passed),
+        'message': 'Solution Submitted' if all_passed else 'Solution Incorrect',
+        'score': float(score or 0),
+        'test_results': test_results,
+        'warnings': collect_warnings(test_results or []),
+        'execution_time': f"{duration or 0}s"
+    }
+
+def get_submission_verdict(submission_id, uid):
+    """Polling fallback: current lifecycle state (plus verdict once evaluated)."""
+    res = db_manager.execute_query(
+        "SELECT submission_id, question_id, status, is_correct, score_awarded, test_results, time_taken_seconds FROM submissions WHERE submission_id=%s AND user_id=%s",
+        (submission_id, uid)
+    )
+    if not res:
+        return None
+
+    row = res[0]
+    if row['status'] != 'evaluated':
+        return {'submission_id': row['submission_id'], 'question_id': row['question_id'], 'status': row['status']}
+
+    test_results = []
+    try:
+        if row['test_results']: test_results = json.loads(row['test_results'])
+    except: pass
+    return build_verdict(row['submission_id'], row['question_id'], row['status'], row['is_correct'],
+                         row['score_awarded'], test_results, row['time_taken_seconds'])
+
+# === Shared Judge Queue (judge_worker.py) ===
+
+def build_judge_job(submission_id, uid, user_id, contest_id, level, question, code, language, inputs):
+    """Everything a judge worker on another machine needs to evaluate and persist a submission."""
+    return {
+        'submission_id': submission_id,
+        'uid': uid,
+        'user_id': user_id,
+        'contest_id': contest_id,
+        'level': level,
+        'question': {
+            'question_id': question['question_id'],
+            'round_id': question.get('round_id'),
+            'points': question.get('points')
+        },
+        'code': code,
+        'language': language,
+        'inputs': inputs,
+        'enqueued_at': time.time()
+    }
+
+def process_judge_job(job):
+    """
+    Worker side of a queued submission: run the tests, then store and broadcast the verdict
+    exactly like an in-process async submit.
+    """
+    question, inputs = job['question'], job['inputs']
+    current = get_submission_verdict(job['submission_id'], job['uid'])
+    if current and current['status'] == 'evaluated':
+        return current # Redelivered after it was already judged: nothing to redo
+    mark_submission_running(job['submission_id'])
+
+    cache_key = verdict_cache_key(question['question_id'], inputs, job['language'], job['code'])
+    results = get_cached_results(cache_key)
+    if results is None:
+        test_inputs = [str(tc.get('input', '')) for tc in inputs]
+        results = execute_code_batch(job['code'], job['language'], test_inputs, stop=fail_fast_predicate(inputs))
+        remember_results(cache_key, results)
+
+    return finish_async_submission(job['submission_id'], job['uid'], job['user_id'], job['contest_id'],
+                                   job['level'], question, inputs, results, job['enqueued_at'])
+
+def wait_for_verdict(submission_id, uid, timeout, wait_done=None):
+    """
+    Web-node side of a synchronous submit handled by a remote worker. Blocks on the queue's
+    completion signal when it has one (`wait_done(submission_id, timeout)`), otherwise re-reads
+    the submission row with exponential backoff. Returns the verdict dict, or None on timeout.
+    """
+    deadline = time.time() + timeout
+    interval = VERDICT_POLL_INTERVAL
+    while True:
+        verdict = get_submission_verdict(submission_id, uid)
+        if verdict and verdict['status'] in ('evaluated', 'failed'):
+            return verdict
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        if wait_done and wait_done(submission_id, remaining):
+            continue
+        time.sleep(min(interval, max(0, deadline - time.time())))
+        interval = min(interval * 2, VERDICT_POLL_MAX_INTERVAL)
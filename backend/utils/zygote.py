@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import queue
+import select
+import socket
+import struct
+import logging
+import threading
+import subprocess
+
+from utils.runner import pump, spawn, collect, kill_group, rlimits, memory_flags, make_result
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURATION ===
+# 'cold' = fresh `python -c` / `node -e` per run (default), 'zygote' = pre-initialised interpreters
+INTERPRETER_MODE = os.getenv('INTERPRETER_MODE', 'cold')
+ZYGOTE_POOL_SIZE = int(os.getenv('ZYGOTE_POOL_SIZE', os.cpu_count() or 2))
+
+ZYGOTE_SERVER = os.path.join(os.path.dirname(__file__), 'zygote_server.py')
+
+# Node has no fork(): each spare is a booted `node` process parked on a code pipe (fd {fd})
+# until it receives "<sandbox dir>\0<program>"; it moves into the directory and runs the
+# program exactly like `node -e`
+NODE_BOOTSTRAP = (
+    "(function(){{const fs=require('fs');const p=fs.readFileSync({fd},'utf8');fs.closeSync({fd});"
+    "const i=p.indexOf('\\0');if(i>0)process.chdir(p.slice(0,i));"
+    "require('vm').runInThisContext(p.slice(i+1),{{filename:'[eval]'}});}})();"
+)
+
+
+class ZygoteError(Exception):
+    """The zygote infrastructure itself failed (not the user's program)."""
+
+
+class PythonZygote:
+    """One pre-initialised `python` process that forks a child per run (see zygote_server.py)."""
+
+    def __init__(self):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock = parent_sock
+        # Forked children apply the per-run rlimits themselves (the zygote stays unlimited)
+        limits = [[res, soft, hard] for res, (soft, hard) in rlimits('python')]
+        self.proc = subprocess.Popen(
+            ['python', '-u', ZYGOTE_SERVER, str(child_sock.fileno()), json.dumps(limits)],
+            pass_fds=[child_sock.fileno()],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        child_sock.close()
+        self._buf = b''
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def close(self):
+        try:
+            self.sock.close()
+            self.proc.kill()
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+
+    def _reply(self, deadline=None):
+        """Next reply line from the zygote, or None if `deadline` (time.monotonic()) passes first."""
+        while b'\n' not in self._buf:
+            if deadline is not None:
+                ready, _, _ = select.select([self.sock], [], [], max(0, deadline - time.monotonic()))
+                if not ready:
+                    return None
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ZygoteError("zygote exited")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b'\n', 1)
+        return json.loads(line)
+
+    def run(self, code, input_str, timeout, cwd=None):
+        """Runs `code` in a fresh forked child, inside `cwd` (the run's sandbox directory) if given."""
+        stdin_r, stdin_w = os.pipe()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        try:
+            payload, workdir = code.encode('utf-8'), (cwd or '').encode('utf-8')
+            socket.send_fds(self.sock, [struct.pack('!II', len(payload), len(workdir))], [stdin_r, out_w, err_w])
+            self.sock.sendall(payload + workdir)
+        except OSError as e:
+            for fd in (stdin_r, stdin_w, out_r, out_w, err_r, err_w):
+                os.close(fd)
+            raise ZygoteError(f"zygote send failed: {e}")
+        for fd in (stdin_r, out_w, err_w):
+            os.close(fd)
+
+        pid = self._reply()['pid']
+        deadline = time.monotonic() + timeout
+        stdout, stderr, timed_out, output_exceeded = pump(stdin_w, out_r, err_r, input_str.encode('utf-8'), timeout)
+        # Output closed; the child still has the rest of its time slot to exit
+        status = None if (timed_out or output_exceeded) else self._reply(deadline)
+        if status is None:
+            timed_out = timed_out or not output_exceeded
+            kill_group(pid) # Not reaped until the zygote replies, so the group id is still valid
+            status = self._reply()
+
+        return make_result(
+            status['exit_code'], stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace'),
+            timed_out, status['cpu_time'], status['max_rss_kb'], None, output_exceeded
+        )
+
+
+class InterpreterPool:
+    """
+    Pool of warm interpreters: PythonZygote instances (reused, one run at a time each)
+    and single-use Node spares that are replenished in the background.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._zygotes = None
+        self._node_spares = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._zygotes = queue.Queue()
+            self._node_spares = queue.Queue()
+            for _ in range(self.size):
+                self._zygotes.put(None) # Spawned lazily on first use
+            self._pid = os.getpid()
+            threading.Thread(target=self._refill_node_spares, daemon=True).start()
+
+    def run_python(self, code, input_str, timeout, cwd=None):
+        self._ensure_started()
+        zygote = self._zygotes.get()
+        try:
+            if zygote is None or not zygote.alive():
+                zygote = PythonZygote()
+            return zygote.run(code, input_str, timeout, cwd)
+        except (ZygoteError, OSError, ValueError) as e:
+            logger.warning(f"Python zygote failed, respawning: {e}")
+            if zygote:
+                zygote.close()
+            zygote = None
+            raise ZygoteError(str(e))
+        finally:
+            self._zygotes.put(zygote)
+
+    def _spawn_node_spare(self):
+        code_r, code_w = os.pipe()
+        try:
+            proc, fds, status_r = spawn(['node'] + memory_flags('node') + ['-e', NODE_BOOTSTRAP.format(fd=code_r)], 'node', pass_fds=[code_r])
+        except OSError:
+            os.close(code_w)
+            raise
+        finally:
+            os.close(code_r)
+        return proc, fds, status_r, code_w
+
+    def _refill_node_spares(self):
+        if not self._refill_lock.acquire(blocking=False):
+            return # Another refill is already running
+        try:
+            while self._node_spares.qsize() < self.size:
+                self._node_spares.put(self._spawn_node_spare())
+        except OSError as e:
+            logger.warning(f"Could not pre-spawn node: {e}")
+        finally:
+            self._refill_lock.release()
+
+    def run_node(self, code, input_str, timeout, cwd=None):
+        self._ensure_started()
+        try:
+            proc, fds, status_r, code_w = self._node_spares.get_nowait()
+        except queue.Empty:
+            proc, fds, status_r, code_w = self._spawn_node_spare()
+        threading.Thread(target=self._refill_node_spares, daemon=True).start()
+
+        try:
+            os.write(code_w, (cwd or '').encode('utf-8') + b'\0' + code.encode('utf-8'))
+        except OSError as e:
+            kill_group(proc.pid)
+            proc.wait()
+            for fd in fds + (status_r,):
+                if fd is not None:
+                    os.close(fd)
+            raise ZygoteError(f"node spare unusable: {e}")
+        finally:
+            os.close(code_w)
+
+        return collect(proc, fds, status_r, input_str, timeout)
+
+
+interpreter_pool = InterpreterPool(ZYGOTE_POOL_SIZE) if INTERPRETER_MODE == 'zygote' and hasattr(os, 'fork') else None
@@ -0,0 +1,117 @@
+"""
+Python zygote: a pre-initialised interpreter that forks one fresh child per run.
+
+Started by utils/zygote.py as `python -u zygote_server.py <control_fd> <rlimits_json>`.
+Each child applies the rlimits ([[resource, soft, hard], ...]) before running the code.
+Protocol on the control socket (one run at a time):
+  request : 4-byte big-endian code length and 4-byte working-directory length, sent together
+            with 3 fds (stdin, stdout, stderr) via SCM_RIGHTS, followed by the UTF-8 source and
+            the UTF-8 path of the run's sandbox directory (empty: stay in the zygote's cwd).
+  replies : {"pid": <child pid>}\\n  then, when the child exits,
+            {"exit_code": ..., "cpu_time": ..., "max_rss_kb": ...}\\n
+"""
+import io
+import os
+import sys
+import json
+import socket
+import resource
+import struct
+import traceback
+
+# Warm the imports contest programs commonly use; forked children inherit them for free
+import math, collections, itertools, functools, heapq, bisect, re, string  # noqa: F401,E401
+
+
+def recv_exact(sock, n):
+    data = b''
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise EOFError("control socket closed")
+        data += chunk
+    return data
+
+
+def send_line(sock, payload):
+    sock.sendall((json.dumps(payload) + '\n').encode())
+
+
+def run_child(code, fds, limits, cwd=None):
+    """Runs in the forked child. Mirrors `python -u -c <code>` (started in `cwd`) and never returns."""
+    os.setsid() # Own process group, like the cold runs: the timeout kill takes its children too
+    for res, soft, hard in limits:
+        try:
+            resource.setrlimit(res, (soft, hard))
+        except (ValueError, OSError):
+            pass
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+
+    sys.stdin = io.TextIOWrapper(io.BufferedReader(io.FileIO(0, 'r', closefd=False)), encoding='utf-8')
+    sys.stdout = io.TextIOWrapper(io.BufferedWriter(io.FileIO(1, 'w', closefd=False)), encoding='utf-8', write_through=True)
+    sys.stderr = io.TextIOWrapper(io.BufferedWriter(io.FileIO(2, 'w', closefd=False)), encoding='utf-8', write_through=True)
+    sys.argv = ['-c']
+
+    exit_code = 0
+    try:
+        if cwd:
+            os.chdir(cwd)
+        exec(compile(code, '<string>', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Skip this frame so the traceback looks like a plain `python -c` run
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    os._exit(exit_code & 0xFF)
+
+
+def serve(sock, limits):
+    while True:
+        try:
+            header, fds, _, _ = socket.recv_fds(sock, 8, 3)
+            if not header:
+                return
+            header += recv_exact(sock, 8 - len(header))
+        except (OSError, EOFError):
+            return
+
+        code_len, cwd_len = struct.unpack('!II', header)
+        code = recv_exact(sock, code_len).decode('utf-8')
+        cwd = recv_exact(sock, cwd_len).decode('utf-8') if cwd_len else None
+
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            run_child(code, fds, limits, cwd)
+
+        for fd in fds:
+            os.close(fd)
+        send_line(sock, {'pid': pid})
+
+        _, status, usage = os.wait4(pid, 0)
+        send_line(sock, {
+            'exit_code': os.waitstatus_to_exitcode(status),
+            'cpu_time': usage.ru_utime + usage.ru_stime,
+            'max_rss_kb': usage.ru_maxrss
+        })
+
+
+if __name__ == '__main__':
+    serve(socket.socket(fileno=int(sys.argv[1])), json.loads(sys.argv[2]) if len(sys.argv) > 2 else [])